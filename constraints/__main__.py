@@ -0,0 +1,61 @@
+"""
+Command line interface.
+
+python -m constraints classify --ecosystem NPM [FILE ...]
+    Classify constraints (one per line, or a column of CSV files with --csv)
+    read from given files or from stdin, and write their interval and labels
+    as JSON lines (or as CSV with --format csv) on stdout. With --metrics,
+    parser metrics are written to given file, as JSON or in the Prometheus
+    text format if its name ends with ".prom".
+"""
+
+import sys
+import json
+import argparse
+
+from . import parser
+from . import metrics
+from . import classify
+
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(prog='python -m constraints', description='Version constraint analysis')
+    subparsers = argparser.add_subparsers(dest='command')
+
+    p = subparsers.add_parser('classify', help='classify a stream of constraints')
+    p.add_argument('files', nargs='*', type=argparse.FileType('r'), help='input files (default to stdin)')
+    p.add_argument('--ecosystem', choices=sorted(parser.PARSERS), required=True, help='ecosystem of the constraints')
+    p.add_argument('--csv', action='store_true', help='input files are CSV files')
+    p.add_argument('--column', type=str, default=classify.COLUMN, help='column containing the constraints (with --csv)')
+    p.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl', help='output format (default to jsonl)')
+    p.add_argument('--processes', type=int, default=None, help='number of worker processes (default to the number of CPUs)')
+    p.add_argument('--chunk-size', type=int, default=classify.CHUNK_SIZE, help='number of constraints per chunk')
+    p.add_argument('--cache-size', type=int, default=classify.CACHE_SIZE, help='number of distinct constraints kept in memory')
+    p.add_argument('--metrics', type=str, help='file to store the parser metrics (JSON, or Prometheus text for .prom files)')
+
+    args = argparser.parse_args(argv)
+    if args.command is None:
+        argparser.error('a command is required')
+
+    files = args.files or [sys.stdin]
+    kwargs = dict(processes=args.processes, chunk_size=args.chunk_size, cache_size=args.cache_size)
+    try:
+        if args.csv:
+            classify.classify_csv(files, args.ecosystem, sys.stdout, args.format, args.column, **kwargs)
+        else:
+            classify.classify_lines(files, args.ecosystem, sys.stdout, args.format, **kwargs)
+    except ValueError as e:
+        argparser.error(str(e))
+    except BrokenPipeError:
+        sys.stderr.close()
+
+    if args.metrics:
+        with open(args.metrics, 'w') as f:
+            if args.metrics.endswith('.prom'):
+                f.write(metrics.REGISTRY.prometheus())
+            else:
+                json.dump(metrics.REGISTRY.as_dict(), f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,321 @@
+"""
+Benchmarks of the library and of the data scripts, based on the Cargo datasets
+of data and data-raw.
+
+python -m constraints.bench [--only PREFIX ...] [--repeat N] [--packages N]
+                            [--output FILE] [--baseline FILE] [--tolerance RATIO]
+
+Each benchmark reports its best time over "repeat" runs, the corresponding
+throughput and the peak memory allocated during an additional run (measured
+with tracemalloc). Results are stored as JSON. If a baseline (the output of a
+previous run) is given, the benchmarks that are slower or use more memory than
+in the baseline (by more than the tolerance) are reported, and the command
+exits with status 1.
+
+Data are restricted to the releases of the first "packages" packages of the
+raw dataset, so that the whole suite runs in a reasonable time.
+"""
+
+import os
+import re
+import gc
+import sys
+import json
+import time
+import argparse
+import platform
+import functools
+import tracemalloc
+import importlib.util
+
+from collections import OrderedDict
+
+import pandas
+
+from . import parser
+from . import constraints
+from .versions import Version
+
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ECOSYSTEM = 'Cargo'
+RAW_VERSIONS_PATH = os.path.join(ROOT_PATH, 'data-raw', '{}-versions.csv.gz')
+RAW_DEPENDENCIES_PATH = os.path.join(ROOT_PATH, 'data-raw', '{}-dependencies.csv.gz')
+VERSIONS_PATH = os.path.join(ROOT_PATH, 'data', '{}-versions.csv.gz')
+DEPENDENCIES_PATH = os.path.join(ROOT_PATH, 'data', '{}-dependencies.csv.gz')
+
+PACKAGES = 2000
+REPEAT = 3
+TOLERANCE = 0.25
+
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(name):
+    """
+    Register a benchmark. The decorated function receives the number of packages
+    to consider, and returns a pair (func, n) where func is the function to
+    measure and n the number of items it processes.
+    """
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return decorator
+
+
+def script(name):
+    """
+    Load given script of the data folder as a module.
+    """
+    spec = importlib.util.spec_from_file_location('data_' + name, os.path.join(ROOT_PATH, 'data', name + '.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@functools.lru_cache()
+def raw_versions(packages):
+    df = pandas.read_csv(RAW_VERSIONS_PATH.format(ECOSYSTEM)).dropna()
+    return df[df['package'].isin(df['package'].unique()[:packages])]
+
+
+@functools.lru_cache()
+def raw_dependencies(packages):
+    df = pandas.read_csv(RAW_DEPENDENCIES_PATH.format(ECOSYSTEM))
+    return df[df['package'].isin(raw_versions(packages)['package'].unique())]
+
+
+@functools.lru_cache()
+def version_strings(packages):
+    df = pandas.read_csv(VERSIONS_PATH.format(ECOSYSTEM))
+    df = df[df['package'].isin(raw_versions(packages)['package'].unique())]
+    return [v for v in df['version'] if isinstance(v, str) and re.fullmatch(Version.RE, v)]
+
+
+@functools.lru_cache()
+def constraint_strings(packages):
+    df = raw_dependencies(packages)
+    return [c for c in df['constraint'].dropna().unique()]
+
+
+@functools.lru_cache()
+def intervals(packages):
+    p = parser.PARSERS[ECOSYSTEM]()
+    return [parser.parse_or_empty(p, c) for c in constraint_strings(packages)]
+
+
+@benchmark('versions.parse')
+def _(packages):
+    strings = version_strings(packages)
+    return lambda: [Version(s) for s in strings], len(strings)
+
+
+@benchmark('versions.compare')
+def _(packages):
+    versions = [Version(s) for s in version_strings(packages)]
+    return lambda: sorted(versions), len(versions)
+
+
+@benchmark('versions.hash')
+def _(packages):
+    versions = [Version(s) for s in version_strings(packages)]
+    return lambda: set(versions), len(versions)
+
+
+def _parser_benchmark(ecosystem):
+    def setup(packages):
+        # Only the constraints of the Cargo dataset that can be parsed are used
+        p = parser.PARSERS[ecosystem]()
+        texts = []
+        for text in constraint_strings(packages):
+            try:
+                p.parse(text)
+                texts.append(text)
+            except Exception:
+                pass
+        return lambda: [p.parse(text) for text in texts], len(texts)
+    return setup
+
+
+for _ecosystem in sorted(parser.PARSERS):
+    benchmark('parser.{}'.format(_ecosystem))(_parser_benchmark(_ecosystem))
+
+
+def _predicate_benchmark(label):
+    def setup(packages):
+        predicate = getattr(constraints, label)
+        items = intervals(packages)
+        return lambda: [predicate(i) for i in items], len(items)
+    return setup
+
+
+for _label in constraints.LABELS:
+    benchmark('predicates.{}'.format(_label))(_predicate_benchmark(_label))
+
+
+@benchmark('scripts.versions.load')
+def _(packages):
+    module = script('versions')
+    return lambda: module.load(ECOSYSTEM, RAW_VERSIONS_PATH), None
+
+
+@benchmark('scripts.versions.remove_spam')
+def _(packages):
+    module, df = script('versions'), raw_versions(packages)
+    return lambda: module.remove_spam(df), len(df)
+
+
+@benchmark('scripts.versions.extract_components')
+def _(packages):
+    module, df = script('versions'), raw_versions(packages)
+    return lambda: module.extract_components(df), len(df)
+
+
+@benchmark('scripts.versions.compute_ranks')
+def _(packages):
+    module = script('versions')
+    df = module.extract_components(raw_versions(packages))
+    return lambda: module.compute_ranks(df), len(df)
+
+
+@benchmark('scripts.dependencies.load')
+def _(packages):
+    module = script('dependencies')
+    return lambda: module.load(ECOSYSTEM, VERSIONS_PATH, RAW_DEPENDENCIES_PATH), None
+
+
+@benchmark('scripts.dependencies.filter_dependencies')
+def _(packages):
+    module = script('dependencies')
+    df_versions = pandas.read_csv(VERSIONS_PATH.format(ECOSYSTEM))
+    df_dependencies = raw_dependencies(packages)
+    return lambda: module.filter_dependencies(df_dependencies, df_versions), len(df_dependencies)
+
+
+def _filtered_dependencies(module, packages):
+    return module.filter_dependencies(raw_dependencies(packages), pandas.read_csv(VERSIONS_PATH.format(ECOSYSTEM)))
+
+
+@benchmark('scripts.dependencies.convert_constraints')
+def _(packages):
+    module = script('dependencies')
+    df = _filtered_dependencies(module, packages)
+    return lambda: module.convert_constraints(df, ECOSYSTEM), len(df)
+
+
+@benchmark('scripts.dependencies.analyse_intervals')
+def _(packages):
+    module = script('dependencies')
+    df = module.convert_constraints(_filtered_dependencies(module, packages), ECOSYSTEM)
+    return lambda: module.analyse_intervals(df), len(df)
+
+
+@benchmark('scripts.dependencies.merge_results')
+def _(packages):
+    module = script('dependencies')
+    df = _filtered_dependencies(module, packages)
+    df_constraints = module.analyse_intervals(module.convert_constraints(df, ECOSYSTEM))
+    return lambda: module.merge_results(df, df_constraints), len(df)
+
+
+def measure(func, repeat=REPEAT):
+    """
+    Return the times of "repeat" runs of func, and the peak memory allocated
+    during an additional run.
+    """
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return times, peak
+
+
+def run(names=None, repeat=REPEAT, packages=PACKAGES, out=sys.stdout):
+    """
+    Run given benchmarks (default to all of them), and return their results.
+    """
+    results = OrderedDict()
+    for name in (names or BENCHMARKS):
+        func, n = BENCHMARKS[name](packages)
+        times, peak = measure(func, repeat)
+        best = min(times)
+        results[name] = OrderedDict([
+            ('time', best),
+            ('times', times),
+            ('n', n),
+            ('throughput', n / best if n is not None and best > 0 else None),
+            ('peak', peak),
+        ])
+        if out is not None:
+            out.write('{:<50} {:>10.4f}s {:>12} {:>10.1f}MB\n'.format(
+                name, best,
+                '' if n is None else '{:.0f}/s'.format(results[name]['throughput']),
+                peak / 2 ** 20,
+            ))
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """
+    Return a list of (name, metric, baseline value, value) for the results that
+    exceed the baseline by more than the tolerance. Benchmarks that are not
+    part of both results are ignored.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for metric in ['time', 'peak']:
+            if result[metric] > baseline[name][metric] * (1 + tolerance):
+                regressions.append((name, metric, baseline[name][metric], result[metric]))
+    return regressions
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description='Benchmarks')
+    argparser.add_argument('--only', type=str, nargs='+', help='only run the benchmarks starting with given prefixes')
+    argparser.add_argument('--repeat', type=int, default=REPEAT, help='number of timed runs (default to {})'.format(REPEAT))
+    argparser.add_argument('--packages', type=int, default=PACKAGES, help='number of packages to consider (default to {})'.format(PACKAGES))
+    argparser.add_argument('--output', type=str, help='file to store the results (JSON)')
+    argparser.add_argument('--baseline', type=str, help='results of a previous run to compare with')
+    argparser.add_argument('--tolerance', type=float, default=TOLERANCE, help='accepted slowdown ratio (default to {})'.format(TOLERANCE))
+    args = argparser.parse_args()
+
+    names = [n for n in BENCHMARKS if args.only is None or n.startswith(tuple(args.only))]
+    if len(names) == 0:
+        argparser.error('no benchmark matches {}'.format(args.only))
+
+    results = run(names, args.repeat, args.packages)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(OrderedDict([
+                ('python', platform.python_version()),
+                ('platform', platform.platform()),
+                ('date', time.strftime('%Y-%m-%d %H:%M:%S')),
+                ('packages', args.packages),
+                ('repeat', args.repeat),
+                ('results', results),
+            ]), f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('packages') != args.packages:
+            print('Warning: baseline was computed for {} packages'.format(baseline.get('packages')))
+
+        regressions = compare(results, baseline['results'], args.tolerance)
+        for name, metric, before, after in regressions:
+            print('REGRESSION {} {}: {:.4g} -> {:.4g} ({:+.0%})'.format(name, metric, before, after, after / before - 1))
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,193 @@
+"""
+Streaming classification of constraints, see python -m constraints classify.
+
+Constraints are read lazily, split into chunks and classified in a pool of
+processes. Constraints that were recently classified are not sent again to the
+pool, and results are yielded in input order. Memory is bounded by the number
+of chunks in flight and by the size of the cache of recent results, whatever
+the size of the input. Parser metrics of the workers are merged into
+metrics.REGISTRY (see constraints.metrics).
+"""
+
+import os
+import csv
+import json
+import itertools
+
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import intervals as I
+
+from . import parser
+from . import metrics
+from . import constraints
+
+
+CHUNK_SIZE = 1000
+CACHE_SIZE = 2 ** 16
+COLUMN = 'constraint'
+FIELDS = ['interval'] + constraints.LABELS
+
+# Parsers of the current process, created on first use
+_parsers = {}
+
+
+def classify(ecosystem, text):
+    """
+    Return an ordered dict with the interval of given constraint and its labels
+    (see constraints.LABELS). As in the datasets, constraints that cannot be
+    parsed, and missing ones (None), are converted to an empty interval.
+    """
+    if text is None:
+        interval = I.empty()
+    else:
+        if ecosystem not in _parsers:
+            _parsers[ecosystem] = metrics.metered_parser(ecosystem)
+        interval = parser.parse_or_empty(_parsers[ecosystem], text)
+
+    result = constraints.labels(interval)
+    result['interval'] = str(interval)
+    result.move_to_end('interval', last=False)
+    return result
+
+
+def _classify_all(args):
+    ecosystem, texts = args
+    return [classify(ecosystem, text) for text in texts], metrics.REGISTRY.pop()
+
+
+def _chunks(iterable, size):
+    iterable = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterable, size))
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+
+def classify_stream(texts, ecosystem, processes=None, chunk_size=CHUNK_SIZE, cache_size=CACHE_SIZE):
+    """
+    Yield (text, result) pairs for given constraints, in order (see classify).
+
+    The last "cache_size" distinct results are kept, and constraints that are
+    cached or already in flight are not classified again. At most two chunks
+    per process are in flight. If processes is 1, constraints are classified in
+    the current process.
+    """
+    processes = processes or os.cpu_count() or 1
+    cache = OrderedDict()
+    pending = set()
+    queue = deque()
+
+    def resolve(chunk, submitted, outcome):
+        results, worker_metrics = outcome
+        metrics.REGISTRY.merge(worker_metrics)
+        results = dict(zip(submitted, results))
+        pending.difference_update(submitted)
+        for text in chunk:
+            if text in results:
+                result = results[text]
+            elif text in cache:
+                result = cache[text]
+            else:
+                # Evicted before being used
+                result = classify(ecosystem, text)
+            cache[text] = result
+            cache.move_to_end(text)
+            if len(cache) > cache_size:
+                cache.popitem(last=False)
+            yield text, result
+
+    executor = ProcessPoolExecutor(max_workers=processes) if processes > 1 else None
+    try:
+        for chunk in _chunks(texts, chunk_size):
+            submitted = list(OrderedDict.fromkeys(t for t in chunk if t not in cache and t not in pending))
+            pending.update(submitted)
+            if executor is None:
+                yield from resolve(chunk, submitted, _classify_all((ecosystem, submitted)))
+                continue
+
+            queue.append((chunk, submitted, executor.submit(_classify_all, (ecosystem, submitted))))
+            while len(queue) >= 2 * processes:
+                chunk, submitted, future = queue.popleft()
+                yield from resolve(chunk, submitted, future.result())
+
+        while queue:
+            chunk, submitted, future = queue.popleft()
+            yield from resolve(chunk, submitted, future.result())
+    finally:
+        for _, _, future in queue:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+def read_lines(files):
+    """
+    Yield the constraints of given files (or of stdin), one per line. Blank
+    lines are missing constraints (None, see classify).
+    """
+    for f in files:
+        for line in f:
+            yield line.rstrip('\r\n') or None
+
+
+def classify_lines(files, ecosystem, output, output_format='jsonl', **kwargs):
+    """
+    Classify the constraints of given files (one per line) and write the
+    results to output.
+    """
+    rows = (
+        _row(OrderedDict([(COLUMN, text)]), result)
+        for text, result in classify_stream(read_lines(files), ecosystem, **kwargs)
+    )
+    _write(rows, output, output_format, [COLUMN] + FIELDS)
+
+
+def classify_csv(files, ecosystem, output, output_format='jsonl', column=COLUMN, **kwargs):
+    """
+    Classify the constraints contained in given column of CSV files, and write
+    the rows, completed with the results, to output. All files must have the
+    same columns. Missing constraints are classified as empty intervals (see
+    classify).
+    """
+    readers = [csv.DictReader(f) for f in files]
+    for reader in readers:
+        if reader.fieldnames is not None and column not in reader.fieldnames:
+            raise ValueError('Column {} not found in {}'.format(column, reader.fieldnames))
+
+    fieldnames = next((r.fieldnames for r in readers if r.fieldnames is not None), [column])
+    rows = itertools.chain.from_iterable(readers)
+    # Rows are kept aside until their constraint is classified
+    buffer = deque()
+
+    def texts():
+        for row in rows:
+            buffer.append(row)
+            # Missing constraints are not parsed ('' would accept everything)
+            yield row[column] or None
+
+    def results():
+        for text, result in classify_stream(texts(), ecosystem, **kwargs):
+            row = buffer.popleft()
+            yield _row(OrderedDict((k, row[k]) for k in fieldnames), result)
+
+    _write(results(), output, output_format, fieldnames + [f for f in FIELDS if f not in fieldnames])
+
+
+def _row(row, result):
+    for field in FIELDS:
+        row[field] = result[field]
+    return row
+
+
+def _write(rows, output, output_format, fieldnames):
+    if output_format == 'csv':
+        writer = csv.DictWriter(output, fieldnames=fieldnames, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(rows)
+    else:
+        for row in rows:
+            output.write(json.dumps(row))
+            output.write('\n')
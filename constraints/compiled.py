@@ -0,0 +1,179 @@
+"""
+Compiled membership tests for intervals of versions.
+
+Versions are packed into 64-bit keys: 21 bits for each of major, minor and
+patch, and a last bit set for releases (versions without prerelease tag), so
+that keys are ordered as versions are, except among the prereleases of the same
+major.minor.patch (ordered by their tag, see Version). compile turns an interval
+into a Compiled object, that tests keys against the inclusive bounds of the
+atomic intervals, either one at a time (a closure) or for an array of keys at
+once. matrix tests many intervals against many versions (e.g. all the releases
+of a package against all the constraints on it) with a single broadcast.
+
+Answers are the ones of the interval: versions that cannot be packed (a
+component does not fit in 21 bits), and prereleases that share their
+major.minor.patch with a prerelease bound, are checked against the interval
+itself. So are all versions if a bound of the interval cannot be packed.
+"""
+
+import numpy
+import intervals as I
+
+from .versions import Version
+
+
+BITS = 21
+LIMIT = 1 << BITS
+MAX_KEY = (1 << (3 * BITS + 1)) - 1
+
+
+def pack(version):
+    """
+    Return the key of given Version, or None if it cannot be packed.
+    """
+    if not (0 <= version.major < LIMIT and 0 <= version.minor < LIMIT and 0 <= version.patch < LIMIT):
+        return None
+    if version.misc == '':
+        # Neither equal to nor lower than the release without misc
+        return None
+    return (((version.major << BITS | version.minor) << BITS | version.patch) << 1) | (0 if version.misc else 1)
+
+
+def pack_many(versions):
+    """
+    Return an array of keys (uint64) for given Versions, and a boolean array
+    telling which ones could be packed (the keys of the others are 0).
+    """
+    keys = [pack(v) for v in versions]
+    valid = numpy.array([k is not None for k in keys], dtype=bool)
+    return numpy.array([0 if k is None else k for k in keys], dtype=numpy.uint64), valid
+
+
+def _bound(value, closed, step):
+    """
+    Return the key of given bound as an inclusive one (step is 1 for lower
+    bounds and -1 for upper bounds), or None if it cannot be packed.
+    """
+    if value == -I.inf:
+        return 0
+    if value == I.inf:
+        return MAX_KEY
+    key = pack(value) if isinstance(value, Version) else None
+    if key is None or closed:
+        return key
+    return key + step
+
+
+class Compiled:
+    """
+    Membership test for given interval, see compile. Supports "in" for a
+    Version, and contains for arrays of keys.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        # Inclusive (lower, upper) keys of the atomic intervals
+        self.bounds = []
+        self.exact = True
+        # major.minor.patch of the prerelease bounds, as key >> 1
+        self.prereleases = set()
+
+        for atomic in ([] if interval.is_empty() else interval):
+            lower = _bound(atomic.lower, atomic.left == I.CLOSED, 1)
+            upper = _bound(atomic.upper, atomic.right == I.CLOSED, -1)
+            if lower is None or upper is None:
+                self.exact = False
+                self.bounds = []
+                break
+            for value in (atomic.lower, atomic.upper):
+                if isinstance(value, Version) and value.misc:
+                    self.prereleases.add(pack(value) >> 1)
+            if lower <= upper:
+                self.bounds.append((lower, upper))
+
+        self.test = self._closure()
+
+    def _closure(self):
+        if len(self.bounds) == 0:
+            return lambda key: False
+        if len(self.bounds) == 1:
+            lower, upper = self.bounds[0]
+            return lambda key: lower <= key <= upper
+        bounds = self.bounds
+        return lambda key: any(lower <= key <= upper for lower, upper in bounds)
+
+    def __contains__(self, version):
+        key = pack(version) if self.exact else None
+        if key is None or (key & 1 == 0 and (key >> 1) in self.prereleases):
+            return version in self.interval
+        return self.test(key)
+
+    def fallback(self, keys, valid):
+        """
+        Return a boolean array telling which of given keys cannot be tested
+        without their Version.
+        """
+        if not self.exact:
+            return numpy.ones(len(keys), dtype=bool)
+        result = ~valid
+        if self.prereleases:
+            prereleases = numpy.array(sorted(self.prereleases), dtype=numpy.uint64)
+            result |= ((keys & numpy.uint64(1)) == 0) & numpy.isin(keys >> numpy.uint64(1), prereleases)
+        return result
+
+    def contains(self, keys, valid=None, versions=None):
+        """
+        Return a boolean array telling whether each of given keys (see
+        pack_many) is in the interval. Keys that are not valid, or that are
+        ambiguous (see module), are tested using given Versions.
+        """
+        keys = numpy.asarray(keys, dtype=numpy.uint64)
+        valid = numpy.ones(len(keys), dtype=bool) if valid is None else valid
+
+        result = numpy.zeros(len(keys), dtype=bool)
+        for lower, upper in self.bounds:
+            result |= (keys >= numpy.uint64(lower)) & (keys <= numpy.uint64(upper))
+        _check(result, self.fallback(keys, valid), self.interval, versions)
+        return result
+
+
+def _check(result, fallback, interval, versions):
+    """
+    Set result to the membership in given interval of the versions marked in
+    fallback.
+    """
+    if fallback.any():
+        if versions is None:
+            raise ValueError('Versions are required to test keys that cannot be compared')
+        for i in numpy.flatnonzero(fallback):
+            result[i] = versions[i] in interval
+
+
+def compile(interval):
+    """
+    Return a Compiled membership test for given interval.
+    """
+    return Compiled(interval)
+
+
+def matrix(intervals, versions):
+    """
+    Return a boolean matrix telling, for each of given intervals (rows, either
+    intervals or Compiled objects), whether each of given Versions (columns)
+    is in the interval.
+    """
+    compiled = [i if isinstance(i, Compiled) else compile(i) for i in intervals]
+    keys, valid = pack_many(versions)
+    result = numpy.zeros((len(compiled), len(keys)), dtype=bool)
+
+    rows = [i for i, c in enumerate(compiled) for _ in c.bounds]
+    if len(rows) > 0:
+        bounds = numpy.array([b for c in compiled for b in c.bounds], dtype=numpy.uint64)
+        hits = (keys >= bounds[:, 0:1]) & (keys <= bounds[:, 1:2])
+        rows = numpy.array(rows)
+        starts = numpy.flatnonzero(numpy.r_[True, rows[1:] != rows[:-1]])
+        result[rows[starts]] = numpy.logical_or.reduceat(hits, starts, axis=0)
+
+    for i, c in enumerate(compiled):
+        _check(result[i], c.fallback(keys, valid), c.interval, versions)
+    return result
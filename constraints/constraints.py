@@ -1,7 +1,40 @@
+from collections import OrderedDict
+
 import intervals as I
 from .versions import Version
 
 
+# Labels computed for each constraint in the datasets
+LABELS = [
+    'empty', 'dev', 'allows_major', 'allows_minor', 'allows_patch',
+    'allows_compatible', 'allows_incompatible', 'allows_all_compatible',
+    'allows_compatible_only', 'allows_all_compatible_only',
+    'upper_bounded', 'lower_bounded', 'strict',
+]
+
+
+def labels(interval):
+    """
+    Return an ordered dict mapping each of LABELS to its value for given interval.
+    """
+    return OrderedDict((label, globals()[label](interval)) for label in LABELS)
+
+
+def compliance(labels):
+    """
+    Return the constraint type (as defined by semver) of given labels: "compliant",
+    "permissive" or "restrictive" (in this order of precedence), or None.
+    """
+    major, minor, patch, dev = labels['allows_major'], labels['allows_minor'], labels['allows_patch'], labels['dev']
+    if (not major and minor and not dev) or (dev and not patch):
+        return 'compliant'
+    elif major or (dev and patch):
+        return 'permissive'
+    elif not minor and not dev:
+        return 'restrictive'
+    return None
+
+
 def empty(interval):
     return interval.is_empty()
     
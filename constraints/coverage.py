@@ -0,0 +1,261 @@
+"""
+Aggregation of the constraints on each package, per target and date.
+
+For each target and date, the constraints of the dependencies in force at that
+date (see history.History.in_force) are aggregated into their "intersection"
+(the versions accepted by all the dependents), their "union" (the versions
+accepted by at least one of them), and the number of dependents accepting each
+major version ([M.0.0, M+1.0.0)) of the target released at that date.
+
+Instead of folding & and | over intervals, the distinct bounds of all the
+intervals are sorted once, so that each atomic interval becomes an inclusive
+range of integer positions: position 2r is the r-th bound, and 2r+1 the
+versions strictly between it and the next one. All the targets and dates are
+then swept at once: a +1 (resp. -1) event at the start (resp. after the end) of
+each range, sorted by group and position, whose cumulative sum is the number of
+dependents accepting each segment of positions. The intersection is where this
+number is the number of dependents, and the union where it is positive.
+
+Dependencies whose interval is empty (e.g. the constraint cannot be parsed) are
+only counted ("empty"), and excluded from the aggregation.
+
+python -m constraints.coverage ECOSYSTEM [--date DATE ...] [--output FILE] [--majors FILE]
+"""
+
+import time
+import argparse
+
+from collections import OrderedDict
+
+import numpy
+import pandas
+import intervals as I
+
+from . import frames
+from . import fastpath
+from . import history as _history
+from . import parser as _parser
+from .graph import _gather
+from .versions import Version
+
+
+def _major(text):
+    """
+    Return the major of given version, or -1 (unparsable version, or major
+    that does not fit in 32 bits).
+    """
+    try:
+        major = Version(text).major
+    except Exception:
+        return -1
+    return major if major < 2 ** 31 else -1
+
+
+def _runs(selected, groups, positions):
+    """
+    Return the groups, first and last positions of the runs of consecutive
+    selected segments (see Coverage.aggregate).
+    """
+    previous = numpy.r_[False, selected[:-1]]
+    following = numpy.r_[selected[1:], False]
+    starts = numpy.flatnonzero(selected & ~previous)
+    ends = numpy.flatnonzero(selected & ~following)
+    return groups[starts], positions[starts], positions[ends + 1] - 1
+
+
+class Coverage:
+    """
+    Aggregate the constraints of given History, parsed with given parser
+    (default to the fast path parser of the ecosystem).
+    """
+
+    def __init__(self, history, parser=None):
+        self.history = history
+        self.parser = fastpath.FastParser(history.ecosystem) if parser is None else parser
+
+        categorical = pandas.Categorical(pandas.Series(history.dependency_constraint).fillna(''))
+        self.constraints = numpy.asarray(categorical.categories, dtype=object)
+        self._codes = categorical.codes.astype(numpy.int64)
+        intervals = [_parser.parse_or_empty(self.parser, text) for text in self.constraints]
+
+        # Majors, and index of their first release, by package then index
+        release_major = numpy.array([_major(v) for v in history.release_version], dtype=numpy.int64)
+        keys = history.release_package.astype(numpy.int64) * (release_major.max(initial=0) + 2) + release_major + 1
+        _, first = numpy.unique(keys, return_index=True)
+        first = numpy.sort(first[release_major[first] >= 0])
+        self._major_release = first
+        self._major = release_major[first]
+
+        # Distinct bounds, sorted, with infinities at both ends
+        bounds = set(Version(m + i, 0, 0) for m in numpy.unique(self._major).tolist() for i in (0, 1))
+        for interval in intervals:
+            for atomic in ([] if interval.is_empty() else interval):
+                bounds.update(b for b in (atomic.lower, atomic.upper) if isinstance(b, Version))
+        self.bounds = [-I.inf] + sorted(bounds) + [I.inf]
+        self._ranks = dict((b, r) for r, b in enumerate(self.bounds[1:-1], 1))
+
+        # Inclusive ranges of positions of the atomic intervals of each constraint
+        lower, upper, counts = [], [], []
+        for interval in intervals:
+            atomics = [] if interval.is_empty() else list(interval)
+            counts.append(len(atomics))
+            for atomic in atomics:
+                lower.append(self._position(atomic.lower, atomic.left == I.CLOSED, 1))
+                upper.append(self._position(atomic.upper, atomic.right == I.CLOSED, -1))
+        self._lower = numpy.array(lower, dtype=numpy.int64)
+        self._upper = numpy.array(upper, dtype=numpy.int64)
+        self._starts = numpy.zeros(len(intervals) + 1, dtype=numpy.int64)
+        numpy.cumsum(counts, out=self._starts[1:])
+        self._cache = {}
+
+    def _position(self, bound, closed, step):
+        if bound == -I.inf:
+            return 0
+        if bound == I.inf:
+            return 2 * len(self.bounds) - 2
+        position = 2 * self._ranks[bound]
+        return position if closed else position + step
+
+    def _atomic(self, lower, upper):
+        if lower % 2 == 0:
+            left, lower = (I.OPEN if lower == 0 else I.CLOSED), self.bounds[lower // 2]
+        else:
+            left, lower = I.OPEN, self.bounds[lower // 2]
+        if upper % 2 == 0:
+            right, upper = (I.OPEN if upper == 2 * len(self.bounds) - 2 else I.CLOSED), self.bounds[upper // 2]
+        else:
+            right, upper = I.OPEN, self.bounds[(upper + 1) // 2]
+        return I.AtomicInterval(left, lower, upper, right)
+
+    def interval(self, ranges):
+        """
+        Return the interval of given (sorted, disjoint) inclusive ranges of
+        positions.
+        """
+        ranges = tuple(ranges)
+        if ranges not in self._cache:
+            self._cache[ranges] = I.Interval(*[self._atomic(lower, upper) for lower, upper in ranges])
+        return self._cache[ranges]
+
+    def _intervals(self, size, groups, lower, upper):
+        ranges = [[] for _ in range(size)]
+        for group, low, high in zip(groups.tolist(), lower.tolist(), upper.tolist()):
+            ranges[group].append((low, high))
+        return [self.interval(r) for r in ranges]
+
+    def aggregate(self, dates):
+        """
+        Return, for each target and given date, the number of "dependents", of
+        "empty" constraints, and the "intersection" and "union" of the other
+        ones (a dataframe), and the number of dependents accepting each
+        "major" of each target (a dataframe), see module.
+        """
+        h = self.history
+        dates = list(dates)
+
+        # Dependencies in force at each date, grouped by date and target
+        indices = [h.in_force(date) for date in dates]
+        date = numpy.repeat(numpy.arange(len(dates)), [len(i) for i in indices])
+        index = numpy.concatenate(indices) if indices else numpy.zeros(0, dtype=numpy.int64)
+        keys, group = numpy.unique(date * len(h.packages) + h.dependency_target[index], return_inverse=True)
+        group_date, group_target = keys // len(h.packages), keys % len(h.packages)
+        code = self._codes[index]
+
+        empty = self._starts[code + 1] == self._starts[code]
+        dependents = numpy.bincount(group[~empty], minlength=len(keys))
+
+        # Sweep over the ranges of positions of the atomic intervals
+        atomic = _gather(self._starts, code)
+        row = numpy.repeat(numpy.arange(len(code)), self._starts[code + 1] - self._starts[code])
+        events = numpy.concatenate([group[row], group[row]])
+        positions = numpy.concatenate([self._lower[atomic], self._upper[atomic] + 1])
+        order = numpy.lexsort((positions, events))
+        events, positions = events[order], positions[order]
+        delta = numpy.r_[numpy.ones(len(atomic), dtype=numpy.int64), -numpy.ones(len(atomic), dtype=numpy.int64)][order]
+        # The events of each group sum to 0: the cumulative sum restarts at each group
+        count = numpy.cumsum(delta)
+        last = numpy.flatnonzero(numpy.r_[(events[1:] != events[:-1]) | (positions[1:] != positions[:-1]), True])
+        events, positions, count = events[last], positions[last], count[last]
+
+        union = self._intervals(len(keys), *_runs(count > 0, events, positions))
+        intersection = self._intervals(len(keys), *_runs((count > 0) & (count == dependents[events]), events, positions))
+
+        df_targets = pandas.DataFrame(OrderedDict([
+            ('target', h.packages[group_target]),
+            ('date', [dates[d] for d in group_date]),
+            ('dependents', dependents),
+            ('empty', numpy.bincount(group[empty], minlength=len(keys))),
+            ('intersection', intersection),
+            ('union', union),
+        ]))
+        return df_targets, self._spread(dates, group_date, group_target, group, row, atomic)
+
+    def _spread(self, dates, group_date, group_target, group, row, atomic):
+        h = self.history
+        # Majors of each group, i.e. of the releases of the target at the date
+        latest = numpy.concatenate([
+            h.release_index(h.packages[group_target[group_date == d]], date)
+            for d, date in enumerate(dates)
+        ]) if len(dates) else numpy.zeros(0, dtype=numpy.int64)
+        start = numpy.searchsorted(self._major_release, numpy.searchsorted(h.release_package, group_target))
+        end = numpy.where(latest >= 0, numpy.searchsorted(self._major_release, latest, side='right'), start)
+        indptr = numpy.zeros(len(group_target) + 1, dtype=numpy.int64)
+        numpy.cumsum(end - start, out=indptr[1:])
+        entry = numpy.arange(indptr[-1]) - numpy.repeat(indptr[:-1] - start, end - start)
+        entry_group = numpy.repeat(numpy.arange(len(group_target)), end - start)
+        # Majors may be released in any order (e.g. backports): sort them
+        order = numpy.lexsort((self._major[entry], entry_group))
+        entry, entry_group = entry[order], entry_group[order]
+        major = self._major[entry]
+        ranks = self._ranks
+        major_lower = numpy.array([2 * ranks[Version(m, 0, 0)] for m in major.tolist()], dtype=numpy.int64)
+        major_upper = numpy.array([2 * ranks[Version(m + 1, 0, 0)] - 1 for m in major.tolist()], dtype=numpy.int64)
+
+        # Majors overlapped by each atomic interval, counted once per dependency
+        width = 2 * len(self.bounds)
+        atomic_group = group[row]
+        first = numpy.searchsorted(entry_group * width + major_upper, atomic_group * width + self._lower[atomic])
+        last = numpy.searchsorted(entry_group * width + major_lower, atomic_group * width + self._upper[atomic], side='right')
+        counts = (last - first).clip(min=0)
+        offsets = numpy.cumsum(counts) - counts
+        overlapped = numpy.arange(counts.sum()) + numpy.repeat(first - offsets, counts)
+        pairs = numpy.unique(numpy.repeat(row, counts) * max(len(entry), 1) + overlapped)
+
+        return pandas.DataFrame(OrderedDict([
+            ('target', h.packages[group_target[entry_group]]),
+            ('date', [dates[d] for d in group_date[entry_group]]),
+            ('major', major),
+            ('dependents', numpy.bincount(pairs % max(len(entry), 1), minlength=len(entry))),
+        ]))
+
+
+def months(history):
+    """
+    Return the first day of each month between the first and the last release
+    of given History.
+    """
+    dates = pandas.to_datetime(pandas.Series(history.release_date))
+    return list(pandas.date_range(dates.min().to_period('M').to_timestamp(), dates.max(), freq='MS'))
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description='Intersection, union and major spread of the constraints on each package')
+    argparser.add_argument('ecosystem', type=str, help='ecosystem, e.g. Cargo')
+    argparser.add_argument('--date', type=str, nargs='+', help='dates to consider (default to the first day of each month)')
+    argparser.add_argument('--data', type=str, default=frames.DATA_PATH, help='folder containing the datasets')
+    argparser.add_argument('--output', type=str, help='file to store the intersections and unions (CSV)')
+    argparser.add_argument('--majors', type=str, help='file to store the number of dependents per major (CSV)')
+    args = argparser.parse_args()
+
+    start = time.perf_counter()
+    coverage = Coverage(_history.History(args.ecosystem, args.data))
+    dates = args.date if args.date else months(coverage.history)
+    df_targets, df_majors = coverage.aggregate(dates)
+    print('{} targets x dates aggregated in {:.1f}s'.format(len(df_targets), time.perf_counter() - start))
+
+    if args.output:
+        df_targets.to_csv(args.output, index=False)
+    else:
+        print(df_targets.to_string(index=False))
+    if args.majors:
+        df_majors.to_csv(args.majors, index=False)
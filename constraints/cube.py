@@ -0,0 +1,196 @@
+"""
+Monthly aggregate of the dependencies of an ecosystem.
+
+The cube contains the number of dependencies declared in releases published
+during each month, for each combination of constraint labels. This is enough to
+compute all the monthly proportions shown in the notebooks (valid constraints,
+dev constraints, compliant/permissive/restrictive ones, allows_*, etc.) without
+loading the dependencies themselves.
+
+A second aggregate counts, for each month, the packages required by at least
+one of these dependencies ("required"), the ones required for the first time
+("new"), and the ones required by at least one dependency with each label or
+constraint type (see build_required).
+
+Monthly results cover every month between the first and the last month of each
+ecosystem, as pandas.Grouper(freq='1M') does: proportions are NaN for months
+without any dependency.
+
+The cubes are generated by the pipeline, or directly with
+python -m constraints.cube [ecosystem ...]
+"""
+
+import os
+import sys
+
+import pandas
+
+from .constraints import LABELS
+from . import frames
+
+
+CUBE_PATH = '{}-monthly.csv.gz'
+REQUIRED_PATH = '{}-required.csv.gz'
+ECOSYSTEMS = ['Cargo', 'NPM', 'Packagist', 'Rubygems']
+
+
+def month(dates):
+    """
+    Return the last day of the month of given dates, as pandas.Grouper(freq='1M') does.
+    """
+    return dates.dt.normalize() + pandas.offsets.MonthEnd(0)
+
+
+def build(df_dependencies):
+    """
+    Return the cube (with a "date" column, one column per label and a count "n")
+    of given dependencies. Dependencies must have a "date" column.
+    """
+    return (
+        df_dependencies
+        [['date'] + LABELS]
+        .dropna(subset=['date'])
+        .assign(date=lambda d: month(d['date']))
+        .groupby(['date'] + LABELS)
+        .size()
+        .rename('n')
+        .reset_index()
+    )
+
+
+def build_required(df_dependencies):
+    """
+    Return, for each month (a "date" column), the number of packages required
+    by given dependencies ("required"), of packages required for the first time
+    ("new"), and of packages required by at least one dependency with each
+    label and constraint type (one column each, see frames.COMPLIANCE).
+    Dependencies must have "date" and "target" columns.
+    """
+    columns = LABELS + list(frames.COMPLIANCE)
+    targets = (
+        df_dependencies
+        [['date', 'target'] + LABELS]
+        .dropna(subset=['date'])
+        .assign(date=lambda d: month(d['date']))
+        .assign(**frames.COMPLIANCE)
+        .groupby(['date', 'target'])
+        [columns]
+        .any()
+    )
+    first = targets.reset_index().groupby('target')['date'].min()
+
+    result = targets.groupby(level='date').sum().astype(int)
+    result.insert(0, 'required', targets.groupby(level='date').size())
+    result.insert(1, 'new', first.value_counts().reindex(result.index, fill_value=0))
+    return result.reset_index()
+
+
+def load(ecosystems=ECOSYSTEMS, data_path=frames.DATA_PATH, path=CUBE_PATH):
+    """
+    Return the cubes (or the required packages with path=REQUIRED_PATH) of
+    given ecosystems, concatenated with an "ecosystem" column.
+    """
+    return pandas.concat([
+        (
+            pandas.read_csv(os.path.join(data_path, path.format(ecosystem)), parse_dates=['date'])
+            .assign(ecosystem=ecosystem)
+        ) for ecosystem in ecosystems
+    ], ignore_index=True)
+
+
+def _mask(cube, column):
+    if callable(column):
+        return column(cube)
+    elif column in frames.COMPLIANCE:
+        return frames.COMPLIANCE[column](cube)
+    else:
+        return cube[column]
+
+
+def _months(df):
+    """
+    Reindex given frame (indexed by date, or by ecosystem and date) to every
+    month between the first and the last month of each ecosystem.
+    """
+    def months(dates):
+        return pandas.period_range(dates.min(), dates.max(), freq='M').to_timestamp(how='end').normalize()
+
+    if df.empty:
+        return df
+    if df.index.nlevels == 1:
+        return df.reindex(pandas.Index(months(df.index), name='date'))
+    return pandas.concat([
+        group.reindex(pandas.MultiIndex.from_product(
+            [[ecosystem], months(group.index.get_level_values('date'))],
+            names=df.index.names,
+        ))
+        for ecosystem, group in df.groupby(level='ecosystem', sort=False)
+    ])
+
+
+def ratios(cube, columns, where=None):
+    """
+    Return, for each ecosystem and each month, the proportion of dependencies
+    satisfying given columns among the ones satisfying "where".
+
+    Columns (and "where") can be label names, constraint types (see
+    frames.COMPLIANCE) or functions returning a boolean mask given the cube.
+    The result is indexed by ecosystem and date, and contains one column per
+    element of "columns" (functions are named by their position). Months
+    without any dependency satisfying "where" are NaN.
+    """
+    if where is not None:
+        cube = cube[_mask(cube, where).values]
+
+    keys = ['ecosystem', 'date'] if 'ecosystem' in cube.columns else ['date']
+    counts = pandas.DataFrame({
+        (column if isinstance(column, str) else i): cube['n'] * _mask(cube, column)
+        for i, column in enumerate(columns)
+    })
+    grouped = counts.assign(_n=cube['n']).groupby([cube[key] for key in keys]).sum()
+    grouped = _months(grouped[grouped['_n'] > 0])
+
+    return grouped.drop(columns='_n').div(grouped['_n'], axis=0)
+
+
+def ratio(cube, column, where=None):
+    """
+    Return the proportion of dependencies satisfying given column (see ratios)
+    as a frame indexed by date, with one column per ecosystem.
+    """
+    name = column if isinstance(column, str) else 0
+    return ratios(cube, [column], where)[name].unstack('ecosystem')
+
+
+def counts(cube, where=None):
+    """
+    Return the number of dependencies satisfying "where" (see ratios) for each
+    month, as a frame indexed by date, with one column per ecosystem.
+    """
+    if where is not None:
+        cube = cube[_mask(cube, where).values]
+    return _months(cube.groupby(['ecosystem', 'date'])['n'].sum()).fillna(0).astype(int).unstack('ecosystem')
+
+
+def required_ratio(required, column):
+    """
+    Return the proportion of required packages that are required by at least
+    one dependency satisfying given label or constraint type, for each month of
+    given required packages (see build_required and load), as a frame indexed
+    by date, with one column per ecosystem.
+    """
+    required = required.set_index(['ecosystem', 'date'])
+    required = _months(required[required['required'] > 0])
+    return (required[column] / required['required']).unstack('ecosystem')
+
+
+if __name__ == '__main__':
+    for ecosystem in (sys.argv[1:] or ECOSYSTEMS):
+        print('Building monthly cube for {}'.format(ecosystem))
+        df_dependencies = frames.dependencies(ecosystem)
+        for path, func in [(CUBE_PATH, build), (REQUIRED_PATH, build_required)]:
+            func(df_dependencies).to_csv(
+                os.path.join(frames.DATA_PATH, path.format(ecosystem)),
+                index=False,
+                compression='gzip',
+            )
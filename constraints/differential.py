@@ -0,0 +1,228 @@
+"""
+Differential testing of alternative parse and classify engines.
+
+The reference (the parsers of parser.py and the predicates of constraints.py)
+and a candidate are run on every distinct constraint of the datasets, and their
+results (failure, interval and labels) are compared. Constraints are split into
+chunks that are processed in a pool of processes. For each kind of mismatch
+(i.e., each set of differing fields), the shortest constraints are reported,
+together with a minimal constraint obtained by removing characters from the
+shortest one while the mismatch remains.
+
+python -m constraints.differential CANDIDATE [--ecosystem ECOSYSTEM ...]
+                                   [--raw] [--files FILE ...] [--processes N]
+
+CANDIDATE is either a name of CANDIDATES, or "module:factory" where factory
+is called with an ecosystem and returns an object with a parse method (and
+optionally a labels method, default to constraints.labels). The command exits
+with status 1 if there is any mismatch.
+"""
+
+import os
+import sys
+import json
+import argparse
+import importlib
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas
+
+from . import parser
+from . import constraints
+
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_PATH = os.path.join(ROOT_PATH, 'data', '{}-dependencies.csv.gz')
+RAW_PATH = os.path.join(ROOT_PATH, 'data-raw', '{}-dependencies.csv.gz')
+ECOSYSTEMS = ['Cargo', 'NPM', 'Packagist', 'Rubygems']
+
+CANDIDATES = {
+    'fastpath': 'constraints.fastpath:FastParser',
+}
+CHUNK_SIZE = 500
+EXAMPLES = 5
+
+# Engines of the current process, created on first use
+_engines = {}
+
+
+def load_candidate(spec):
+    """
+    Return the factory designated by given candidate (see CANDIDATES).
+    """
+    spec = CANDIDATES.get(spec, spec)
+    module, _, name = spec.partition(':')
+    if not name:
+        raise ValueError('Candidate must be given as module:factory, not {!r}'.format(spec))
+    return getattr(importlib.import_module(module), name)
+
+
+def _engine(spec, ecosystem):
+    key = (spec, ecosystem)
+    if key not in _engines:
+        if spec is None:
+            _engines[key] = parser.PARSERS[ecosystem]()
+        else:
+            _engines[key] = load_candidate(spec)(ecosystem)
+    return _engines[key]
+
+
+def outcome(engine, text):
+    """
+    Return the result of given engine for given constraint: None if it cannot
+    be parsed, or a pair (interval, labels).
+    """
+    try:
+        interval = engine.parse(text)
+    except Exception:
+        return None
+    labels = engine.labels(interval) if hasattr(engine, 'labels') else constraints.labels(interval)
+    return interval, OrderedDict(labels)
+
+
+def differences(expected, actual):
+    """
+    Return the names of the fields that differ between given outcomes (see
+    outcome): "failure", "interval" and/or label names.
+    """
+    if expected is None or actual is None:
+        return () if expected is actual else ('failure', )
+
+    fields = []
+    if expected[0] != actual[0] or str(expected[0]) != str(actual[0]):
+        fields.append('interval')
+    fields.extend(label for label in constraints.LABELS if expected[1].get(label) != actual[1].get(label))
+    return tuple(fields)
+
+
+def _describe(result):
+    if result is None:
+        return None
+    interval, labels = result
+    return OrderedDict([('interval', str(interval)), ('labels', [label for label, value in labels.items() if value])])
+
+
+def compare(spec, ecosystem, text):
+    """
+    Return the differences (see differences) between the reference and given
+    candidate for given constraint, and their descriptions.
+    """
+    expected = outcome(_engine(None, ecosystem), text)
+    actual = outcome(_engine(spec, ecosystem), text)
+    return differences(expected, actual), _describe(expected), _describe(actual)
+
+
+def _compare_chunk(args):
+    spec, ecosystem, texts = args
+    mismatches = []
+    for text in texts:
+        fields, expected, actual = compare(spec, ecosystem, text)
+        if fields:
+            mismatches.append((text, fields, expected, actual))
+    return ecosystem, len(texts), mismatches
+
+
+def shrink(spec, ecosystem, text, fields):
+    """
+    Return a constraint obtained by removing characters of given one, for which
+    the reference and the candidate still differ on the same fields.
+    """
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(text)):
+            shorter = text[:i] + text[i + 1:]
+            if compare(spec, ecosystem, shorter)[0] == fields:
+                text = shorter
+                changed = True
+                break
+    return text
+
+
+def corpus(ecosystems, paths):
+    """
+    Return an ordered dict mapping each ecosystem to its distinct constraints,
+    read from given path patterns (formatted with the ecosystem).
+    """
+    texts = OrderedDict()
+    for ecosystem in ecosystems:
+        distinct = set()
+        for path in paths:
+            path = path.format(ecosystem)
+            if os.path.isfile(path):
+                distinct.update(pandas.read_csv(path, usecols=['constraint'])['constraint'].dropna().astype(str))
+        texts[ecosystem] = sorted(distinct)
+    return texts
+
+
+def run(spec, texts, processes=None, chunk_size=CHUNK_SIZE, examples=EXAMPLES):
+    """
+    Compare given candidate with the reference on given corpus (see corpus),
+    and return a report with, for each ecosystem, the number of constraints and
+    of mismatches, and the mismatches grouped by differing fields.
+    """
+    load_candidate(spec)  # Fail early
+    items = [
+        (spec, ecosystem, chunk[i:i + chunk_size])
+        for ecosystem, chunk in texts.items()
+        for i in range(0, len(chunk), chunk_size)
+    ]
+
+    report = OrderedDict((e, OrderedDict([('constraints', 0), ('mismatches', 0), ('kinds', OrderedDict())])) for e in texts)
+    if processes == 1:
+        results = map(_compare_chunk, items)
+    else:
+        executor = ProcessPoolExecutor(max_workers=processes)
+        results = executor.map(_compare_chunk, items)
+
+    try:
+        for ecosystem, count, mismatches in results:
+            report[ecosystem]['constraints'] += count
+            report[ecosystem]['mismatches'] += len(mismatches)
+            for text, fields, expected, actual in mismatches:
+                kind = report[ecosystem]['kinds'].setdefault(' '.join(fields), OrderedDict([('count', 0), ('examples', [])]))
+                kind['count'] += 1
+                kind['examples'].append(OrderedDict([('constraint', text), ('expected', expected), ('actual', actual)]))
+                kind['examples'] = sorted(kind['examples'], key=lambda e: (len(e['constraint']), e['constraint']))[:examples]
+    finally:
+        if processes != 1:
+            executor.shutdown()
+
+    for ecosystem, r in report.items():
+        for name, kind in r['kinds'].items():
+            kind['minimal'] = shrink(spec, ecosystem, kind['examples'][0]['constraint'], tuple(name.split(' ')))
+    return report
+
+
+def display(report, out=sys.stdout):
+    for ecosystem, r in report.items():
+        out.write('{}: {} constraints, {} mismatches\n'.format(ecosystem, r['constraints'], r['mismatches']))
+        for name, kind in r['kinds'].items():
+            out.write('  [{}] {} mismatches, minimal example: {!r}\n'.format(name, kind['count'], kind['minimal']))
+            for example in kind['examples']:
+                out.write('    {!r}: expected {}, got {}\n'.format(example['constraint'], example['expected'], example['actual']))
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description='Differential testing of a candidate engine')
+    argparser.add_argument('candidate', type=str, help='one of {}, or module:factory'.format(', '.join(sorted(CANDIDATES))))
+    argparser.add_argument('--ecosystem', type=str, nargs='+', choices=ECOSYSTEMS, default=ECOSYSTEMS, help='ecosystems to consider')
+    argparser.add_argument('--raw', action='store_true', help='also use the constraints of the raw datasets')
+    argparser.add_argument('--files', type=str, nargs='+', help='CSV files with a "constraint" column ("{}" is replaced by the ecosystem)')
+    argparser.add_argument('--processes', type=int, default=None, help='number of processes (default to the number of CPUs)')
+    argparser.add_argument('--examples', type=int, default=EXAMPLES, help='number of examples per kind of mismatch')
+    argparser.add_argument('--output', type=str, help='file to store the report (JSON)')
+    args = argparser.parse_args()
+
+    paths = args.files or ([DATA_PATH, RAW_PATH] if args.raw else [DATA_PATH])
+    texts = corpus(args.ecosystem, paths)
+    report = run(args.candidate, texts, args.processes, examples=args.examples)
+    display(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if any(r['mismatches'] for r in report.values()):
+        sys.exit(1)
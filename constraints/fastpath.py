@@ -0,0 +1,93 @@
+"""
+Fast path for the parsers of parser.py.
+
+Most constraints consist of a single operator applied to a numeric version
+(e.g. "^1.2.3", ">=2.0" or "1.0.0"). Such constraints are recognized with a
+regular expression, and converted by the methods of the parser that the grammar
+would call, so that the grammar is only used for the other constraints.
+Equivalence with the parsers is checked with constraints.differential.
+"""
+
+import re
+
+from . import parser as _parser
+
+
+# Operators of a single constraint, longest first
+OPERATORS = {
+    'Cargo': ['<=', '>=', '<', '>', '=', '~', '^'],
+    'NPM': ['<=', '>=', '<', '>', '=', '~', '^'],
+    'Packagist': ['!=', '<=', '>=', '<', '>', '=', '~', '^'],
+    'Rubygems': ['!=', '<=', '>=', '~>', '<', '>', '='],
+}
+
+# NPM does not accept leading zeros
+NUMBERS = {
+    'Cargo': r'\d+',
+    'NPM': r'0|[1-9]\d*',
+    'Packagist': r'\d+',
+    'Rubygems': r'\d+',
+}
+
+
+class FastParser:
+    """
+    Parser of given ecosystem that converts simple constraints directly, and
+    relies on given parser (default to the one of parser.PARSERS) otherwise.
+    The path taken by each constraint is recorded in given metrics (see
+    metrics.py), if any.
+    """
+
+    def __init__(self, ecosystem, parser=None, metrics=None):
+        self.ecosystem = ecosystem
+        self.parser = _parser.PARSERS[ecosystem]() if parser is None else parser
+        self.regex = re.compile(r'(?P<op>{})?(?P<major>{n})(?:\.(?P<minor>{n})(?:\.(?P<patch>{n}))?)?'.format(
+            '|'.join(re.escape(op) for op in OPERATORS[ecosystem]),
+            n=NUMBERS[ecosystem],
+        ))
+        self._convert = getattr(self, '_convert_' + ecosystem.lower())
+        self.metrics = metrics
+
+    def match(self, text):
+        """
+        Return the (op, components) of given constraint if it can be converted
+        by the fast path, or None.
+        """
+        match = self.regex.fullmatch(text)
+        if match is None:
+            return None
+        return match.group('op'), [c for c in match.group('major', 'minor', 'patch') if c is not None]
+
+    def parse(self, text):
+        match = self.match(text)
+        if match is None:
+            if self.metrics is not None:
+                self.metrics.path('grammar')
+            return self.parser.parse(text)
+        if self.metrics is not None:
+            self.metrics.path('fast')
+        return self._convert(*match)
+
+    def _constraint(self, method, op, version):
+        return method(version) if op is None else method(op, version)
+
+    def _convert_cargo(self, op, components):
+        p = self.parser
+        return p.constraints(p.conjunction(self._constraint(p.constraint, op, p.version(*components))))
+
+    _convert_rubygems = _convert_cargo
+
+    def _convert_packagist(self, op, components):
+        p = self.parser
+        return p.constraints(p.disjunction(p.conjunction(self._constraint(p.constraint_operator, op, p.version(*components)))))
+
+    def _convert_npm(self, op, components):
+        p = self.parser
+        version = p.partial(*components)
+        if op == '~':
+            interval = p.tilde(version)
+        elif op == '^':
+            interval = p.caret(version)
+        else:
+            interval = self._constraint(p.primitive, op, version)
+        return p.constraints(p.range_set(p.range(p.simple(interval))))
@@ -0,0 +1,311 @@
+"""
+Concurrent and rate-limit aware HTTP client for the libraries.io API.
+
+Requests are sent from a pool of threads sharing a single keep-alive Session.
+A token bucket, updated from the x-ratelimit-* headers returned by the server,
+controls the request rate. When the server throttles the requests (403/429),
+all the threads back off, and the rate is temporarily reduced.
+
+Responses can be stored in an on-disk cache (see ResponseCache), from which
+they can also be replayed without any network access.
+"""
+
+import os
+import json
+import time
+import random
+import hashlib
+import logging
+import threading
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+CONCURRENCY = 8
+RATE = 1.0  # requests per second (libraries.io allows 60 requests per minute)
+BURST = 60
+RATE_WINDOW = 60  # seconds covered by x-ratelimit-limit
+TIMEOUT = 60
+MAX_RETRIES = 8
+BACKOFF = 1.0
+MAX_BACKOFF = 120.0
+NEGATIVE_TTL = 7 * 24 * 3600  # 404 are kept for a week at most
+PRIVATE_PARAMS = ['key']
+
+logger = logging.getLogger(__name__)
+
+
+class FetchError(Exception):
+    """
+    Raised when a resource cannot be retrieved.
+    """
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: "rate" tokens are added per second, up to "capacity".
+    The rate can be adapted (see throttle and recover), and the bucket can be
+    paused for a while.
+    """
+
+    def __init__(self, rate=RATE, capacity=BURST, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.max_rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+        self._paused_until = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        if now > self._last:
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+
+    def acquire(self):
+        """
+        Wait until a token is available, and consume it.
+        """
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    delay = (1 - self._tokens) / self.rate
+            self._sleep(delay)
+
+    def update(self, remaining=None, limit=None):
+        """
+        Synchronize the bucket with the rate limit reported by the server.
+        """
+        with self._lock:
+            if limit is not None and limit > 0:
+                self.capacity = limit
+                self.max_rate = limit / RATE_WINDOW
+                self.rate = min(self.rate, self.max_rate)
+            if remaining is not None:
+                self._refill(self._clock())
+                self._tokens = min(self._tokens, remaining)
+
+    def pause(self, delay):
+        """
+        Prevent any token from being acquired during given delay, and empty the
+        bucket. Tokens are refilled again once the delay has elapsed.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + delay)
+            self._last = self._paused_until
+            self._tokens = 0
+
+    def throttle(self):
+        # Multiplicative decrease...
+        with self._lock:
+            self.rate = max(self.max_rate / 16, self.rate / 2)
+
+    def recover(self):
+        # ... additive increase
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 16)
+
+
+class ResponseCache:
+    """
+    On-disk cache of JSON documents, indexed by url and parameters (except
+    PRIVATE_PARAMS, so that the API key is neither part of the index nor stored).
+    Missing resources (404) are stored as negative entries.
+    """
+
+    def __init__(self, path, negative_ttl=NEGATIVE_TTL):
+        self.path = path
+        self.negative_ttl = negative_ttl
+
+    def _location(self, url, params):
+        public = sorted((k, str(v)) for k, v in (params or {}).items() if k not in PRIVATE_PARAMS)
+        key = hashlib.sha256(json.dumps([url, public]).encode()).hexdigest()
+        return os.path.join(self.path, key[:2], key + '.json'), public
+
+    def get(self, url, params=None, ttl=None, stale=False):
+        """
+        Return a pair (found, document). Found is False if given resource is not
+        in the cache, or if its entry is older than ttl seconds (if not None)
+        unless stale is True. Document is None for negative entries.
+        """
+        location, _ = self._location(url, params)
+        try:
+            with open(location) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return False, None
+
+        age = time.time() - entry['time']
+        if stale:
+            return True, entry['document']
+        if ttl is not None and age > ttl:
+            return False, None
+        if entry['status'] == 404 and age > self.negative_ttl:
+            return False, None
+        return True, entry['document']
+
+    def put(self, url, params, document, status=200):
+        location, public = self._location(url, params)
+        os.makedirs(os.path.dirname(location), exist_ok=True)
+        temp = '{}.{}.tmp'.format(location, threading.get_ident())
+        with open(temp, 'w') as f:
+            json.dump({'url': url, 'params': public, 'status': status, 'time': time.time(), 'document': document}, f)
+        os.replace(temp, location)
+
+
+def _header(response, name):
+    try:
+        return float(response.headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class Fetcher:
+    """
+    Retrieve JSON documents concurrently. "params" are added to every request
+    (e.g. the API key), "concurrency" is the maximal number of simultaneous
+    requests, and "rate" and "burst" configure the token bucket.
+
+    If a ResponseCache is provided, documents are looked up in the cache first,
+    and retrieved documents are stored in it. If "offline" is True, documents
+    are only looked up in the cache (whatever their age).
+    """
+
+    def __init__(self, params=None, concurrency=CONCURRENCY, rate=RATE, burst=BURST,
+                 max_retries=MAX_RETRIES, backoff=BACKOFF, max_backoff=MAX_BACKOFF, timeout=TIMEOUT,
+                 cache=None, offline=False):
+        if offline and cache is None:
+            raise ValueError('Offline mode requires a cache.')
+
+        self.params = {} if params is None else dict(params)
+        self.cache = cache
+        self.offline = offline
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        Wait for the scheduled retrievals, then close the session they use.
+        """
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+    def _delay(self, attempt, response=None):
+        retry_after = _header(response, 'retry-after') if response is not None else None
+        if retry_after is not None:
+            return retry_after
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def get(self, url, params=None, ttl=None):
+        """
+        Return the decoded JSON document at given url, or None if it does not
+        exist (404). Raise FetchError if it cannot be retrieved. Cached entries
+        older than ttl seconds (if not None) are retrieved again.
+        """
+        if self.cache is not None:
+            found, document = self.cache.get(url, params, ttl, stale=self.offline)
+            if found:
+                return document
+            elif self.offline:
+                raise FetchError('"{}" ({}) is not in the cache'.format(url, params or {}))
+
+        document, status = self._get(url, params)
+        if self.cache is not None:
+            self.cache.put(url, params, document, status)
+        return document
+
+    def _get(self, url, params):
+        params = dict(self.params, **(params or {}))
+        logger.debug('get: {} ({})'.format(url, {k: v for k, v in params.items() if k != 'key'}))
+
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                r = self.session.get(url, params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                logger.warning('{} on {} (attempt {})'.format(e.__class__.__name__, url, attempt + 1))
+                time.sleep(self._delay(attempt))
+                continue
+
+            remaining = _header(r, 'x-ratelimit-remaining')
+            self.bucket.update(remaining, _header(r, 'x-ratelimit-limit'))
+            logger.debug('x-ratelimit-remaining: {}'.format(remaining))
+
+            if r.status_code == 200:
+                self.bucket.recover()
+                return r.json(), 200
+            elif r.status_code == 404:
+                return None, 404
+            elif r.status_code in (403, 429) or r.status_code >= 500:
+                delay = self._delay(attempt, r)
+                if r.status_code in (403, 429):
+                    if r.status_code == 403 and remaining is not None and remaining > 0:
+                        logger.warning('403 with x-ratelimit-remaining set to {}'.format(remaining))
+                    self.bucket.throttle()
+                    self.bucket.pause(delay)
+                logger.info('{} on {}, retrying in {:.1f}s'.format(r.status_code, url, delay))
+                if r.status_code >= 500:
+                    time.sleep(delay)
+            else:
+                raise FetchError('"{}" returns code {}'.format(url, r.status_code))
+
+        raise FetchError('"{}" could not be retrieved after {} attempts'.format(url, self.max_retries + 1))
+
+    def submit(self, url, params=None, ttl=None):
+        """
+        Schedule the retrieval of given url, and return a Future.
+        """
+        return self._executor.submit(self.get, url, params, ttl)
+
+    def map(self, items, ttl=None, window=None):
+        """
+        Retrieve given (url, params) pairs concurrently, and yield the results in order.
+        If "window" is set, at most window pairs are scheduled ahead of the results
+        that were already yielded, and items are consumed lazily.
+        """
+        items = iter(items)
+        futures = deque()
+        try:
+            while True:
+                while window is None or len(futures) < window:
+                    try:
+                        url, params = next(items)
+                    except StopIteration:
+                        break
+                    futures.append(self.submit(url, params, ttl))
+                if len(futures) == 0:
+                    return
+                yield futures.popleft().result()
+        finally:
+            for future in futures:
+                future.cancel()
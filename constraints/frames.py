@@ -0,0 +1,173 @@
+"""
+Derived frames used by the notebooks.
+
+The frames are computed from the datasets contained in the data folder, and are
+cached on disk (in data/cache) under a key derived from the content of these
+datasets and of this module, so that they are only computed once.
+"""
+
+import os
+import glob
+import hashlib
+
+import numpy
+import pandas
+
+from .hashing import digest
+
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_PATH = os.path.join(ROOT_PATH, 'data')
+CACHE_PATH = os.path.join(DATA_PATH, 'cache')
+
+VERSIONS_PATH = '{}-versions.csv.gz'
+DEPENDENCIES_PATH = '{}-dependencies.csv.gz'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S UTC'
+
+# Constraint types, as defined by semver
+COMPLIANCE = {
+    'compliant': lambda d: (~d['allows_major'] & d['allows_minor'] & ~d['dev']) | (d['dev'] & ~d['allows_patch']),
+    'permissive': lambda d: d['allows_major'] | (d['dev'] & d['allows_patch']),
+    'restrictive': lambda d: ~d['allows_minor'] & ~d['dev'],
+}
+
+
+def with_next_date(df_versions):
+    """
+    Add a "next_date" column containing the date of the next release (in rank
+    order) of the same package.
+    """
+    next_date = (
+        df_versions
+        [['package', 'rank', 'date']]
+        .sort_values(['package', 'rank'], kind='mergesort')
+        .groupby('package', sort=False)
+        ['date']
+        .shift(-1)
+    )
+    return df_versions.assign(next_date=next_date)
+
+
+def with_compliance(df_dependencies):
+    """
+    Add "compliant", "permissive" and "restrictive" columns based on the labels
+    of the constraints.
+    """
+    return df_dependencies.assign(**COMPLIANCE)
+
+
+def constraint_changes(df_dependencies):
+    """
+    Return one row per (package, target, constraint) that corresponds to the first
+    release in which the constraint was used. Columns "constraint_next_date" and
+    "constraint_next_rank" identify the release in which the constraint was
+    replaced (if any), and "constraint_is_new" is True if the dependency was
+    introduced in that release.
+    """
+    keys = ['package', 'target', 'constraint']
+    # Missing constraints are considered equal, as in drop_duplicates
+    group = df_dependencies[keys].fillna({'constraint': ''}).groupby(keys, sort=False).ngroup().values
+    pair = df_dependencies.groupby(['package', 'target'], sort=False).ngroup().values
+    rank = df_dependencies['rank'].values
+
+    # Sort by group then by rank, so that groups are contiguous and their
+    # first and last rows are aligned
+    order = numpy.lexsort((rank, group))
+    group = group[order]
+    first = order[numpy.r_[True, group[1:] != group[:-1]]]
+    last = order[numpy.r_[group[1:] != group[:-1], True]]
+
+    next_date = df_dependencies['next_date'].values[last]
+    next_rank = (rank[last] + 1).astype(float)
+    next_rank[pandas.isnull(next_date)] = numpy.nan
+
+    introduced = numpy.full(pair.max() + 1 if len(pair) else 0, numpy.inf)
+    numpy.minimum.at(introduced, pair, rank)
+
+    return (
+        df_dependencies
+        .iloc[first]
+        .assign(
+            constraint_next_date=next_date,
+            constraint_next_rank=next_rank,
+            constraint_is_new=rank[first] == introduced[pair[first]],
+        )
+        .reset_index(drop=True)
+    )
+
+
+def _cached(name, ecosystem, paths, func):
+    """
+    Return func(), using a pickle in CACHE_PATH whose key depends on the content
+    of given paths and of this module.
+    """
+    h = hashlib.sha256()
+    for path in paths + [os.path.abspath(__file__)]:
+        h.update(digest(path).encode())
+    key = h.hexdigest()[:16]
+
+    pattern = os.path.join(CACHE_PATH, '{}-{}-{{}}.pkl'.format(ecosystem, name))
+    path = pattern.format(key)
+    if os.path.isfile(path):
+        return pandas.read_pickle(path)
+
+    df = func()
+    os.makedirs(CACHE_PATH, exist_ok=True)
+    for stale in glob.glob(pattern.format('*')):
+        os.remove(stale)
+    df.to_pickle(path + '.tmp')
+    os.replace(path + '.tmp', path)
+    return df
+
+
+def _paths(ecosystem, data_path, *names):
+    return [os.path.join(data_path, name.format(ecosystem)) for name in names]
+
+
+def versions(ecosystem, data_path=DATA_PATH, cache=True):
+    """
+    Return the releases of given ecosystem, with parsed dates and "next_date".
+    """
+    paths = _paths(ecosystem, data_path, VERSIONS_PATH)
+
+    def compute():
+        return (
+            pandas.read_csv(paths[0])
+            .assign(date=lambda d: pandas.to_datetime(d['date'], format=DATE_FORMAT))
+            .pipe(with_next_date)
+        )
+
+    return _cached('versions', ecosystem, paths, compute) if cache else compute()
+
+
+def dependencies(ecosystem, data_path=DATA_PATH, cache=True):
+    """
+    Return the dependencies of given ecosystem, with the "rank", "date" and
+    "next_date" of their release, and their constraint type.
+    """
+    paths = _paths(ecosystem, data_path, VERSIONS_PATH, DEPENDENCIES_PATH)
+
+    def compute():
+        return (
+            pandas.read_csv(paths[1])
+            .merge(
+                versions(ecosystem, data_path, cache)[['package', 'version', 'rank', 'date', 'next_date']],
+                how='left',
+                on=['package', 'version']
+            )
+            .pipe(with_compliance)
+        )
+
+    return _cached('dependencies', ecosystem, paths, compute) if cache else compute()
+
+
+def constraints(ecosystem, data_path=DATA_PATH, cache=True):
+    """
+    Return the constraints of given ecosystem, see constraint_changes.
+    """
+    paths = _paths(ecosystem, data_path, VERSIONS_PATH, DEPENDENCIES_PATH)
+
+    def compute():
+        return constraint_changes(dependencies(ecosystem, data_path, cache))
+
+    return _cached('constraints', ecosystem, paths, compute) if cache else compute()
@@ -0,0 +1,221 @@
+"""
+Dependency graph of an ecosystem at a given date.
+
+Nodes are packages, identified by integers (their position in the sorted list
+of package names). Each package that has a release at the given date is
+represented by its latest release (by date), and has one edge per dependency of
+this release, pointing to the target package and labelled with the constraint.
+Edges are stored in compressed sparse row (CSR) format, grouped by source
+(forward) and by target (reverse), so that neighbours and degrees are obtained
+for arrays of nodes at once. Graphs can be saved to and loaded from .npz files.
+
+python -m constraints.graph ECOSYSTEM [--date DATE] [--output FILE]
+"""
+
+import os
+import time
+import argparse
+
+import numpy
+import pandas
+
+from . import frames
+
+
+def _csr(keys, size):
+    """
+    Return (indptr, order) such that order sorts the edges by given keys, and
+    the edges of key k are order[indptr[k]:indptr[k + 1]].
+    """
+    order = numpy.argsort(keys, kind='mergesort')
+    indptr = numpy.zeros(size + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(keys, minlength=size), out=indptr[1:])
+    return indptr, order
+
+
+def _gather(indptr, nodes):
+    """
+    Return the positions of the edges of given nodes, in a CSR structure.
+    """
+    starts = indptr[nodes]
+    counts = indptr[nodes + 1] - starts
+    offsets = numpy.cumsum(counts) - counts
+    return numpy.arange(counts.sum(), dtype=numpy.int64) + numpy.repeat(starts - offsets, counts)
+
+
+class Graph:
+    """
+    CSR dependency graph, see build and load.
+
+    Node arrays (indexed by node id): "packages" (names, sorted) and "versions"
+    (their latest release at "date", or an empty string). Edge arrays (indexed
+    by edge id, edges being sorted by source): "sources", "targets" and
+    "constraints" (index in "constraint_names"). "indptr" delimits the edges of
+    each source, while "rindptr" and "redges" list the edges of each target.
+    """
+
+    STRINGS = ['packages', 'versions', 'constraint_names']
+    ARRAYS = ['indptr', 'sources', 'targets', 'constraints', 'rindptr', 'redges']
+    SEPARATOR = '\x00'
+
+    def __init__(self, ecosystem, date, **arrays):
+        self.ecosystem = ecosystem
+        self.date = date
+        for name in self.STRINGS + self.ARRAYS:
+            setattr(self, name, arrays[name])
+
+    @classmethod
+    def from_edges(cls, ecosystem, date, packages, versions, sources, targets, constraints, constraint_names):
+        """
+        Return the graph with given (sorted) packages and given edges.
+        """
+        indptr, order = _csr(sources, len(packages))
+        targets = targets[order]
+        rindptr, redges = _csr(targets, len(packages))
+        return cls(
+            ecosystem, date,
+            packages=packages, versions=versions, constraint_names=constraint_names,
+            indptr=indptr, sources=sources[order], targets=targets, constraints=constraints[order],
+            rindptr=rindptr, redges=redges,
+        )
+
+    def __len__(self):
+        return len(self.packages)
+
+    @property
+    def edges(self):
+        return len(self.targets)
+
+    def ids(self, names):
+        """
+        Return the ids of given package names (-1 for unknown packages).
+        """
+        names = numpy.asarray(names, dtype=object)
+        if len(self.packages) == 0:
+            return numpy.full(len(names), -1, dtype=numpy.int64)
+        ids = numpy.searchsorted(self.packages, names).clip(max=len(self.packages) - 1)
+        return numpy.where(self.packages[ids] == names, ids, -1)
+
+    def out_degree(self, nodes=None):
+        degrees = numpy.diff(self.indptr)
+        return degrees if nodes is None else degrees[nodes]
+
+    def in_degree(self, nodes=None):
+        degrees = numpy.diff(self.rindptr)
+        return degrees if nodes is None else degrees[nodes]
+
+    def out_edges(self, nodes):
+        """
+        Return the ids of the edges from given nodes (dependencies).
+        """
+        return _gather(self.indptr, numpy.asarray(nodes, dtype=numpy.int64))
+
+    def in_edges(self, nodes):
+        """
+        Return the ids of the edges to given nodes (dependents).
+        """
+        return self.redges[_gather(self.rindptr, numpy.asarray(nodes, dtype=numpy.int64))]
+
+    def successors(self, nodes):
+        return self.targets[self.out_edges(nodes)]
+
+    def predecessors(self, nodes):
+        return self.sources[self.in_edges(nodes)]
+
+    def save(self, path):
+        """
+        Save the graph in given .npz file. Strings are joined and encoded, as
+        fixed-size string arrays would be as large as their longest item times
+        their size, and their number is kept to tell [''] from [].
+        """
+        arrays = {name: getattr(self, name) for name in self.ARRAYS}
+        for name in self.STRINGS:
+            strings = getattr(self, name)
+            arrays[name] = numpy.frombuffer(self.SEPARATOR.join(strings).encode(), dtype=numpy.uint8)
+            arrays[name + '_size'] = numpy.int64(len(strings))
+        with open(path + '.tmp', 'wb') as f:
+            numpy.savez(f, ecosystem=self.ecosystem, date=str(self.date or ''), **arrays)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path):
+        with numpy.load(path) as data:
+            arrays = {name: data[name] for name in cls.ARRAYS}
+            for name in cls.STRINGS:
+                text = data[name].tobytes().decode()
+                strings = text.split(cls.SEPARATOR) if int(data[name + '_size']) else []
+                arrays[name] = numpy.array(strings, dtype=object)
+            return cls(str(data['ecosystem']), str(data['date']) or None, **arrays)
+
+
+def latest_releases(df_versions, date=None):
+    """
+    Return the latest release (by date, then by rank) of each package among the
+    releases published at given date (default to all of them), as a dataframe
+    with "package" and "version" columns.
+    """
+    if date is not None:
+        df_versions = df_versions[df_versions['date'] <= pandas.Timestamp(date)]
+    return (
+        df_versions
+        .sort_values(['date', 'rank'], kind='mergesort')
+        .drop_duplicates('package', keep='last')
+        [['package', 'version']]
+    )
+
+
+def build(ecosystem, date=None, data_path=frames.DATA_PATH):
+    """
+    Return the Graph of given ecosystem at given date (default to the most
+    recent one), from the datasets of data_path.
+    """
+    df_versions = pandas.read_csv(
+        os.path.join(data_path, frames.VERSIONS_PATH.format(ecosystem)),
+        usecols=['package', 'version', 'date', 'rank'],
+        dtype={'package': str, 'version': str},
+    )
+    df_versions['date'] = pandas.to_datetime(df_versions['date'], format=frames.DATE_FORMAT)
+    latest = latest_releases(df_versions, date)
+    del df_versions
+
+    df_dependencies = (
+        pandas.read_csv(
+            os.path.join(data_path, frames.DEPENDENCIES_PATH.format(ecosystem)),
+            usecols=['package', 'version', 'target', 'constraint'],
+            dtype={'package': str, 'version': str, 'target': str, 'constraint': str},
+        )
+        .merge(latest, how='inner', on=['package', 'version'])
+        .drop_duplicates(['package', 'target', 'constraint'])
+    )
+
+    names = latest['package'].values.astype(object)
+    packages = numpy.union1d(names, df_dependencies['target'].values.astype(object))
+    versions = numpy.full(len(packages), '', dtype=object)
+    versions[numpy.searchsorted(packages, names)] = latest['version'].values
+
+    constraints = pandas.Categorical(df_dependencies['constraint'].fillna(''))
+    return Graph.from_edges(
+        ecosystem,
+        date,
+        packages,
+        versions,
+        numpy.searchsorted(packages, df_dependencies['package'].values.astype(object)).astype(numpy.int32),
+        numpy.searchsorted(packages, df_dependencies['target'].values.astype(object)).astype(numpy.int32),
+        constraints.codes.astype(numpy.int32),
+        numpy.asarray(constraints.categories, dtype=object),
+    )
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description='Build the dependency graph of an ecosystem')
+    argparser.add_argument('ecosystem', type=str, help='ecosystem, e.g. Cargo')
+    argparser.add_argument('--date', type=str, help='consider the releases published at this date (default to all releases)')
+    argparser.add_argument('--data', type=str, default=frames.DATA_PATH, help='folder containing the datasets')
+    argparser.add_argument('--output', type=str, help='file to store the graph (default to {ecosystem}-graph.npz)')
+    args = argparser.parse_args()
+
+    start = time.perf_counter()
+    graph = build(args.ecosystem, args.date, args.data)
+    output = args.output or '{}-graph.npz'.format(args.ecosystem)
+    graph.save(output)
+    print('{} packages, {} dependencies, built in {:.1f}s and saved in {}'.format(len(graph), graph.edges, time.perf_counter() - start, output))
@@ -0,0 +1,20 @@
+"""
+Content digests of files, used as cache keys (see frames, shared) and as
+fingerprints of the stages of the pipeline.
+"""
+
+import hashlib
+
+
+CHUNK_SIZE = 1 << 20
+
+
+def digest(path):
+    """
+    Return the sha256 digest of the content of given file.
+    """
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
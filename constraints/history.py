@@ -0,0 +1,185 @@
+"""
+Indexed history of the releases and dependencies of an ecosystem.
+
+Releases are sorted by package then by date, and dependencies by release then
+by target, so that the state of the ecosystem at any date is obtained by binary
+search (numpy.searchsorted) instead of filtering the whole frames: the latest
+release of a package at a date, the constraint it used on a target at that
+date, or all the dependencies in force at that date. Queries accept arrays of
+packages and of dates (broadcast against each other), e.g. to compute time
+series without rescanning the datasets.
+"""
+
+import os
+
+import numpy
+import pandas
+
+from . import frames
+from .graph import _gather
+
+
+# Release dates are encoded as seconds since EPOCH, in the low bits of the keys
+EPOCH = pandas.Timestamp('1970-01-01')
+DATE_BITS = 34
+
+
+def _seconds(dates):
+    """
+    Return an array of the same shape as given dates (timestamps or strings),
+    with the number of seconds since EPOCH.
+    """
+    dates = numpy.asarray(dates)
+    if dates.dtype.kind != 'M':
+        converted = [pandas.Timestamp(d).to_datetime64() for d in dates.astype(object).ravel()]
+        dates = numpy.array(converted, dtype='datetime64[ns]').reshape(dates.shape)
+    return (dates - EPOCH.to_datetime64()) // numpy.timedelta64(1, 's')
+
+
+class History:
+    """
+    History of given ecosystem, built from the datasets of data_path (see frames).
+    """
+
+    def __init__(self, ecosystem, data_path=frames.DATA_PATH, cache=True):
+        self.ecosystem = ecosystem
+        df_versions = (
+            frames.versions(ecosystem, data_path, cache)
+            [['package', 'version', 'date', 'rank']]
+            .dropna(subset=['date'])
+        )
+        df_dependencies = pandas.read_csv(
+            os.path.join(data_path, frames.DEPENDENCIES_PATH.format(ecosystem)),
+            usecols=['package', 'version', 'target', 'constraint'],
+            dtype={'package': str, 'version': str, 'target': str, 'constraint': str},
+        )
+
+        self.packages = numpy.union1d(
+            df_versions['package'].values.astype(object),
+            df_dependencies['target'].values.astype(object),
+        )
+
+        # Releases, by package then by date (and rank for simultaneous releases)
+        df_versions = df_versions.assign(
+            code=numpy.searchsorted(self.packages, df_versions['package'].values.astype(object)),
+            seconds=_seconds(df_versions['date'].values),
+        ).sort_values(['code', 'seconds', 'rank'], kind='mergesort')
+        self.release_package = df_versions['code'].values
+        self.release_version = df_versions['version'].values.astype(object)
+        self.release_date = df_versions['date'].values
+        self._release_keys = (self.release_package.astype(numpy.int64) << DATE_BITS) + df_versions['seconds'].values
+        self._starts = numpy.searchsorted(self.release_package, numpy.arange(len(self.packages) + 1))
+
+        # Dependencies, by release then by target
+        index = pandas.Series(numpy.arange(len(df_versions)), index=pandas.MultiIndex.from_arrays([df_versions['package'], df_versions['version']]))
+        release = index.reindex(pandas.MultiIndex.from_arrays([df_dependencies['package'], df_dependencies['version']])).values
+        known = ~numpy.isnan(release)
+        release = release[known].astype(numpy.int64)
+        target = numpy.searchsorted(self.packages, df_dependencies['target'].values[known].astype(object))
+        order = numpy.lexsort((target, release))
+        self.dependency_release = release[order]
+        self.dependency_target = target[order]
+        self.dependency_constraint = df_dependencies['constraint'].values[known][order].astype(object)
+        self._dependency_keys = self.dependency_release * len(self.packages) + self.dependency_target
+        self._dependency_starts = numpy.searchsorted(self.dependency_release, numpy.arange(len(self.release_package) + 1))
+
+    def ids(self, names):
+        """
+        Return the ids of given package names (-1 for unknown packages).
+        """
+        names = numpy.asarray(names, dtype=object)
+        if len(self.packages) == 0:
+            return numpy.full(names.shape, -1, dtype=numpy.int64)
+        ids = numpy.searchsorted(self.packages, names).clip(max=len(self.packages) - 1)
+        return numpy.where(self.packages[ids] == names, ids, -1)
+
+    def releases(self, package, date=None):
+        """
+        Return the range of the indices of the releases of given package (an id)
+        published at given date (default to all of them), by date.
+        """
+        start, end = self._starts[package], self._starts[package + 1]
+        if date is not None:
+            end = self._release_index(numpy.array([package]), _seconds([date]))[0] + 1
+        return range(start, max(start, end))
+
+    def requirements(self, release):
+        """
+        Return the ids of the targets of given release (an index) and their
+        constraints.
+        """
+        start, end = self._dependency_starts[release], self._dependency_starts[release + 1]
+        return self.dependency_target[start:end], self.dependency_constraint[start:end]
+
+    def _release_index(self, codes, seconds):
+        keys = (codes.clip(min=0).astype(numpy.int64) << DATE_BITS) + seconds
+        index = numpy.searchsorted(self._release_keys, keys, side='right') - 1
+        return numpy.where((codes >= 0) & (index >= self._starts[codes.clip(min=0)]), index, -1)
+
+    def release_index(self, packages, dates):
+        """
+        Return the index of the latest release of given packages at given dates
+        (both broadcast against each other), or -1 if there is none.
+        """
+        packages, seconds = numpy.broadcast_arrays(numpy.asarray(packages, dtype=object), _seconds(dates))
+        return self._release_index(self.ids(packages), seconds)
+
+    def latest(self, packages, dates):
+        """
+        Return the latest version of given packages at given dates (see
+        release_index), or None.
+        """
+        index = self.release_index(packages, dates)
+        result = numpy.where(index >= 0, self.release_version[index.clip(min=0)], None)
+        return result if result.ndim else result.item()
+
+    def constraint(self, packages, targets, dates):
+        """
+        Return the constraint used by the latest release of given packages at
+        given dates on given targets, or None (all broadcast against each other).
+        """
+        packages, targets, seconds = numpy.broadcast_arrays(
+            numpy.asarray(packages, dtype=object), numpy.asarray(targets, dtype=object), _seconds(dates)
+        )
+        release = self._release_index(self.ids(packages), seconds)
+        target = self.ids(targets)
+        keys = release * len(self.packages) + target
+        index = numpy.searchsorted(self._dependency_keys, keys).clip(max=len(self._dependency_keys) - 1)
+        found = (release >= 0) & (target >= 0) & (self._dependency_keys[index] == keys)
+        result = numpy.where(found, self.dependency_constraint[index], None)
+        return result if result.ndim else result.item()
+
+    def snapshot(self, date):
+        """
+        Return the latest release of each package at given date, as a dataframe
+        with "package", "version" and "date" columns.
+        """
+        index = self.release_index(self.packages, date)
+        index = index[index >= 0]
+        return pandas.DataFrame({
+            'package': self.packages[self.release_package[index]],
+            'version': self.release_version[index],
+            'date': self.release_date[index],
+        }, columns=['package', 'version', 'date'])
+
+    def in_force(self, date):
+        """
+        Return the indices of the dependencies in force at given date (i.e.,
+        those of the latest release of each package).
+        """
+        release = self.release_index(self.packages, date)
+        return _gather(self._dependency_starts, release[release >= 0])
+
+    def dependencies(self, date):
+        """
+        Return the dependencies in force at given date (see in_force), as a
+        dataframe with "package", "version", "target" and "constraint" columns.
+        """
+        index = self.in_force(date)
+        release = self.dependency_release[index]
+        return pandas.DataFrame({
+            'package': self.packages[self.release_package[release]],
+            'version': self.release_version[release],
+            'target': self.packages[self.dependency_target[index]],
+            'constraint': self.dependency_constraint[index],
+        }, columns=['package', 'version', 'target', 'constraint'])
@@ -0,0 +1,167 @@
+"""
+Transitive impact of a release on the dependency graph (see graph.py).
+
+A package receives a new release of a target automatically if the constraint
+of its latest release on the target accepts the new release (directly), or if
+it depends on a package that receives it, with a constraint that accepts the
+latest release of that package (transitively). Releases are propagated
+breadth-first over the reverse edges of the graph, with one vectorized step per
+level. Whether each edge accepts the latest release of its target does not
+depend on the query, and is computed once per graph.
+
+python -m constraints.impact ECOSYSTEM PACKAGE VERSION [--date DATE] [--graph FILE]
+"""
+
+import sys
+import time
+import argparse
+
+from collections import OrderedDict
+
+import numpy
+
+from . import frames
+from . import graph as _graph
+from . import parser as _parser
+from . import constraints
+from .versions import Version
+
+
+def _version(text):
+    try:
+        return Version(text)
+    except Exception:
+        return None
+
+
+class Impact:
+    """
+    Answer impact queries on given Graph. Constraints are parsed with given
+    parser (default to the one of the ecosystem of the graph).
+    """
+
+    def __init__(self, graph, parser=None):
+        self.graph = graph
+        self.parser = _parser.PARSERS[graph.ecosystem]() if parser is None else parser
+        self._intervals = {}
+        self._accepts_latest = None
+
+    def interval(self, code):
+        """
+        Return the interval of the constraint with given code (see Graph).
+        """
+        if code not in self._intervals:
+            self._intervals[code] = _parser.parse_or_empty(self.parser, self.graph.constraint_names[code])
+        return self._intervals[code]
+
+    def _accepts(self, edges, versions):
+        """
+        Return a boolean array telling whether the constraint of each edge
+        accepts the corresponding version (a Version or None). Each distinct
+        (constraint, version) pair is only checked once.
+        """
+        codes = self.graph.constraints[edges]
+        result = numpy.zeros(len(edges), dtype=bool)
+        checked = {}
+        for i, (code, version) in enumerate(zip(codes.tolist(), versions)):
+            if version is None:
+                continue
+            key = (code, version)
+            if key not in checked:
+                interval = self.interval(code)
+                checked[key] = not constraints.empty(interval) and version in interval
+            result[i] = checked[key]
+        return result
+
+    @property
+    def accepts_latest(self):
+        """
+        Boolean array telling whether each edge accepts the latest release of
+        its target.
+        """
+        if self._accepts_latest is None:
+            versions = [_version(v) if v else None for v in self.graph.versions]
+            self._accepts_latest = self._accepts(
+                numpy.arange(self.graph.edges),
+                [versions[t] for t in self.graph.targets.tolist()],
+            )
+        return self._accepts_latest
+
+    def propagate(self, package, version):
+        """
+        Return an ordered dict with the number of packages that would receive
+        given release (a Version, or its text) of given package: "direct",
+        "transitive" (excluding direct ones), "total" and the number of new
+        packages at each "level", and the array of the ids of these packages
+        ("reached").
+        """
+        graph = self.graph
+        target = graph.ids([package])[0]
+        if target < 0:
+            raise KeyError('Unknown package {}'.format(package))
+
+        version = version if isinstance(version, Version) else Version(version)
+        reached = numpy.zeros(len(graph), dtype=bool)
+        reached[target] = True
+        edges = graph.in_edges([target])
+        edges = edges[self._accepts(edges, [version] * len(edges))]
+
+        levels = []
+        frontier = numpy.unique(graph.sources[edges])
+        frontier = frontier[~reached[frontier]]
+        while len(frontier) > 0:
+            reached[frontier] = True
+            levels.append(len(frontier))
+            edges = graph.in_edges(frontier)
+            edges = edges[self.accepts_latest[edges]]
+            frontier = numpy.unique(graph.sources[edges])
+            frontier = frontier[~reached[frontier]]
+
+        reached[target] = False
+        return OrderedDict([
+            ('package', package),
+            ('version', version),
+            ('dependents', len(numpy.unique(graph.predecessors([target])))),
+            ('direct', levels[0] if levels else 0),
+            ('transitive', sum(levels[1:])),
+            ('total', sum(levels)),
+            ('levels', levels),
+            ('reached', numpy.flatnonzero(reached)),
+        ])
+
+
+def display(result, out=sys.stdout):
+    out.write('Release {} {} reaches {} packages: {} of its {} dependents directly, and {} transitively\n'.format(
+        result['package'], result['version'], result['total'], result['direct'], result['dependents'], result['transitive'],
+    ))
+    for level, count in enumerate(result['levels'], 1):
+        out.write('  level {}: {} packages\n'.format(level, count))
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description='Transitive impact of a release')
+    argparser.add_argument('ecosystem', type=str, help='ecosystem, e.g. Cargo')
+    argparser.add_argument('package', type=str, help='name of the package')
+    argparser.add_argument('version', type=str, help='version of the new release, e.g. 1.0.80')
+    argparser.add_argument('--date', type=str, help='consider the releases published at this date (default to all releases)')
+    argparser.add_argument('--data', type=str, default=frames.DATA_PATH, help='folder containing the datasets')
+    argparser.add_argument('--graph', type=str, help='use this graph (see constraints.graph) instead of building it')
+    args = argparser.parse_args()
+    try:
+        version = Version(args.version)
+    except ValueError:
+        argparser.error('Invalid version {}'.format(args.version))
+
+    start = time.perf_counter()
+    g = _graph.Graph.load(args.graph) if args.graph else _graph.build(args.ecosystem, args.date, args.data)
+    impact = Impact(g)
+    impact.accepts_latest
+    print('Graph prepared in {:.1f}s'.format(time.perf_counter() - start))
+
+    start = time.perf_counter()
+    try:
+        result = impact.propagate(args.package, version)
+    except KeyError as e:
+        argparser.error(e.args[0])
+    display(result)
+    print('Answered in {:.2f}s'.format(time.perf_counter() - start))
@@ -0,0 +1,186 @@
+"""
+Instrumentation of the stages of the data scripts.
+
+Each stage records its wall time, CPU time, resident memory (current and peak)
+and the number of rows it receives and produces. A JSON report is written per
+script and ecosystem, in the directory given by the INSTRUMENT_DIR environment
+variable (default to "reports", relative to the working directory).
+
+The INSTRUMENT_PROFILE environment variable enables additional (and more
+expensive) captures, as a comma-separated list:
+ - "cprofile" stores the profile of each stage in a .prof file (see pstats);
+ - "tracemalloc" records the peak memory allocated by Python during each stage,
+   and the lines that allocated most of the memory still in use at its end.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import platform
+import cProfile
+import tracemalloc
+
+from collections import OrderedDict
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+REPORT_DIR = os.environ.get('INSTRUMENT_DIR', 'reports')
+PROFILE = [p.strip() for p in os.environ.get('INSTRUMENT_PROFILE', '').split(',') if p.strip()]
+TOP_ALLOCATIONS = 10
+
+
+def rss():
+    """
+    Return the current resident set size in bytes, or None if unknown.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def peak_rss():
+    """
+    Return the peak resident set size of the process in bytes, or None if unknown.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _count(rows):
+    if rows is None or isinstance(rows, int):
+        return rows
+    return len(rows)
+
+
+class Stage:
+    """
+    Measure a stage, see Run.stage. The number of rows produced by the stage
+    can be set with output.
+    """
+
+    def __init__(self, run, name, rows_in=None):
+        self.run = run
+        self.record = OrderedDict([('name', name), ('rows_in', _count(rows_in)), ('rows_out', None)])
+        self._profile = None
+
+    def output(self, rows):
+        """
+        Record the number of given rows (or the number itself) as the output
+        of the stage, and return rows.
+        """
+        self.record['rows_out'] = _count(rows)
+        return rows
+
+    def __enter__(self):
+        if 'tracemalloc' in self.run.profile:
+            tracemalloc.start()
+        if 'cprofile' in self.run.profile:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+        self._rss = rss()
+        self._peak_rss = peak_rss()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        record = self.record
+        record['wall_time'] = time.perf_counter() - self._wall
+        record['cpu_time'] = time.process_time() - self._cpu
+        record['rss_before'] = self._rss
+        record['rss_after'] = rss()
+        record['peak_rss'] = peak_rss()
+        # The peak of the process is only known to increase during a stage
+        if self._peak_rss is not None:
+            record['peak_rss_increase'] = record['peak_rss'] - self._peak_rss
+
+        if self._profile is not None:
+            self._profile.disable()
+            path = self.run.path('{}.prof'.format(record['name']))
+            self._profile.dump_stats(path)
+            record['profile'] = path
+
+        if 'tracemalloc' in self.run.profile:
+            _, record['traced_peak'] = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            record['top_allocations'] = [
+                OrderedDict([('location', str(stat.traceback)), ('size', stat.size), ('count', stat.count)])
+                for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]
+            ]
+
+        if exc_type is not None:
+            record['error'] = '{}: {}'.format(exc_type.__name__, exc_value)
+        self.run.stages.append(record)
+        self.run.save()
+        return False
+
+
+class Run:
+    """
+    Instrumented run of given script for given ecosystem, to be used as a
+    context manager. Stages are measured with stage, and the report is written
+    after each stage and at the end of the run.
+    """
+
+    def __init__(self, script, ecosystem, report_dir=None, profile=None):
+        self.script = script
+        self.ecosystem = ecosystem
+        self.report_dir = REPORT_DIR if report_dir is None else report_dir
+        self.profile = PROFILE if profile is None else profile
+        self.stages = []
+        self.started = None
+        self.finished = None
+
+    def path(self, suffix):
+        os.makedirs(self.report_dir, exist_ok=True)
+        return os.path.join(self.report_dir, '{}-{}-{}'.format(self.script, self.ecosystem, suffix))
+
+    def stage(self, name, rows_in=None):
+        """
+        Return a context manager measuring the stage with given name. rows_in
+        is the input of the stage (or its number of rows).
+        """
+        return Stage(self, name, rows_in)
+
+    def report(self):
+        return OrderedDict([
+            ('script', self.script),
+            ('ecosystem', self.ecosystem),
+            ('started', self.started),
+            ('finished', self.finished),
+            ('python', platform.python_version()),
+            ('host', socket.gethostname()),
+            ('profile', self.profile),
+            ('wall_time', sum(s['wall_time'] for s in self.stages)),
+            ('cpu_time', sum(s['cpu_time'] for s in self.stages)),
+            ('peak_rss', peak_rss()),
+            ('stages', self.stages),
+        ])
+
+    def save(self):
+        path = self.path('report.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        os.replace(path + '.tmp', path)
+        return path
+
+    def __enter__(self):
+        self.started = time.strftime('%Y-%m-%d %H:%M:%S')
+        return self
+
+    def __exit__(self, *args):
+        self.finished = time.strftime('%Y-%m-%d %H:%M:%S')
+        print('Run report saved in {}'.format(self.save()))
+        return False
@@ -0,0 +1,213 @@
+"""
+In-process metrics of the parsing layer.
+
+For each ecosystem, ParserMetrics counts the parsed constraints, the failures
+(by exception type), the cache hits and misses (see parser.CachingParser) and
+the constraints converted by the fast path or by the grammar (see
+fastpath.FastParser), and keeps a histogram of parse latencies. Updating the
+metrics costs a lock and a few additions, so that they can be left enabled.
+
+Metrics are grouped in a Registry (REGISTRY by default), that can be exported
+as a dict (and merged, e.g. from worker processes) or in the Prometheus text
+exposition format.
+"""
+
+import time
+import bisect
+import threading
+
+from collections import OrderedDict
+
+
+# Upper bounds of the latency buckets, in seconds
+BUCKETS = [0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, float('inf')]
+PREFIX = 'constraints_parse'
+
+
+class ParserMetrics:
+    """
+    Metrics of the parser of an ecosystem.
+    """
+
+    def __init__(self, ecosystem):
+        self.ecosystem = ecosystem
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.failures = {}
+            self.cache = {'hit': 0, 'miss': 0}
+            self.paths = {'fast': 0, 'grammar': 0}
+            self.buckets = [0] * len(BUCKETS)
+            self.duration = 0.0
+
+    def observe(self, duration, error=None):
+        """
+        Record a call that took given duration (in seconds), and that failed
+        with given exception (if any).
+        """
+        i = bisect.bisect_left(BUCKETS, duration)
+        with self._lock:
+            self.calls += 1
+            self.duration += duration
+            self.buckets[i] += 1
+            if error is not None:
+                name = error.__class__.__name__
+                self.failures[name] = self.failures.get(name, 0) + 1
+
+    def cache_lookup(self, hit):
+        with self._lock:
+            self.cache['hit' if hit else 'miss'] += 1
+
+    def path(self, name):
+        with self._lock:
+            self.paths[name] += 1
+
+    def as_dict(self):
+        with self._lock:
+            return OrderedDict([
+                ('calls', self.calls),
+                ('failures', dict(self.failures)),
+                ('cache', dict(self.cache)),
+                ('paths', dict(self.paths)),
+                ('duration', self.duration),
+                ('buckets', list(self.buckets)),
+            ])
+
+    def merge(self, other):
+        """
+        Add given metrics (see as_dict) to these ones.
+        """
+        with self._lock:
+            self.calls += other['calls']
+            self.duration += other['duration']
+            for name, count in other['failures'].items():
+                self.failures[name] = self.failures.get(name, 0) + count
+            for key, count in other['cache'].items():
+                self.cache[key] += count
+            for key, count in other['paths'].items():
+                self.paths[key] += count
+            self.buckets = [a + b for a, b in zip(self.buckets, other['buckets'])]
+
+
+class Registry:
+    """
+    Metrics of the parsers of all ecosystems.
+    """
+
+    def __init__(self):
+        self._metrics = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, ecosystem):
+        with self._lock:
+            if ecosystem not in self._metrics:
+                self._metrics[ecosystem] = ParserMetrics(ecosystem)
+            return self._metrics[ecosystem]
+
+    def as_dict(self):
+        with self._lock:
+            metrics = list(self._metrics.items())
+        return OrderedDict((ecosystem, m.as_dict()) for ecosystem, m in metrics)
+
+    def pop(self):
+        """
+        Return the metrics (see as_dict) and reset them.
+        """
+        with self._lock:
+            metrics = list(self._metrics.items())
+        result = OrderedDict()
+        for ecosystem, m in metrics:
+            result[ecosystem] = m.as_dict()
+            m.reset()
+        return result
+
+    def merge(self, metrics):
+        for ecosystem, other in metrics.items():
+            self.get(ecosystem).merge(other)
+
+    def prometheus(self, prefix=PREFIX):
+        """
+        Return the metrics in the Prometheus text exposition format.
+        """
+        metrics = self.as_dict()
+        lines = []
+
+        def family(name, kind, help, samples):
+            lines.append('# HELP {}_{} {}'.format(prefix, name, help))
+            lines.append('# TYPE {}_{} {}'.format(prefix, name, kind))
+            for suffix, labels, value in samples:
+                lines.append('{}_{}{}{{{}}} {}'.format(
+                    prefix, name, suffix,
+                    ','.join('{}="{}"'.format(k, v) for k, v in labels),
+                    value,
+                ))
+
+        family('calls_total', 'counter', 'Number of parsed constraints.', [
+            ('', [('ecosystem', e)], m['calls']) for e, m in metrics.items()
+        ])
+        family('failures_total', 'counter', 'Number of constraints that could not be parsed.', [
+            ('', [('ecosystem', e), ('exception', name)], count)
+            for e, m in metrics.items() for name, count in sorted(m['failures'].items())
+        ])
+        family('cache_total', 'counter', 'Number of cache lookups.', [
+            ('', [('ecosystem', e), ('result', key)], m['cache'][key])
+            for e, m in metrics.items() for key in ['hit', 'miss']
+        ])
+        family('path_total', 'counter', 'Number of constraints converted by the fast path or by the grammar.', [
+            ('', [('ecosystem', e), ('path', key)], m['paths'][key])
+            for e, m in metrics.items() for key in ['fast', 'grammar']
+        ])
+
+        samples = []
+        for e, m in metrics.items():
+            total = 0
+            for bound, count in zip(BUCKETS, m['buckets']):
+                total += count
+                samples.append(('_bucket', [('ecosystem', e), ('le', '+Inf' if bound == float('inf') else repr(bound))], total))
+            samples.append(('_sum', [('ecosystem', e)], m['duration']))
+            samples.append(('_count', [('ecosystem', e)], m['calls']))
+        family('duration_seconds', 'histogram', 'Latency of parse calls.', samples)
+
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class MeteredParser:
+    """
+    Wrap given parser, and record each call in given ParserMetrics.
+    Exceptions are recorded and raised again.
+    """
+
+    def __init__(self, parser, metrics):
+        self.parser = parser
+        self.metrics = metrics
+
+    def parse(self, text):
+        start = time.perf_counter()
+        try:
+            result = self.parser.parse(text)
+        except Exception as e:
+            self.metrics.observe(time.perf_counter() - start, e)
+            raise
+        self.metrics.observe(time.perf_counter() - start)
+        return result
+
+
+def metered_parser(ecosystem, registry=REGISTRY, cache_size=None):
+    """
+    Return the parser of given ecosystem, with the fast path, a cache of given
+    size (if any) and metrics recorded in given registry.
+    """
+    from .parser import CachingParser
+    from .fastpath import FastParser
+
+    metrics = registry.get(ecosystem)
+    parser = FastParser(ecosystem, metrics=metrics)
+    if cache_size:
+        parser = CachingParser(parser, cache_size, metrics=metrics)
+    return MeteredParser(parser, metrics)
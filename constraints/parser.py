@@ -1,3 +1,6 @@
+import functools
+import threading
+
 import intervals as I
 from .versions import Version
 from .constraints import minor_interval, patch_interval, comparator_interval
@@ -14,6 +17,39 @@ def parse_or_empty(parser, text, verbose=False):
         return I.empty()
 
 
+class CachingParser:
+    """
+    Wrap given parser, and keep the results (and the failures) of the last
+    "maxsize" parsed constraints. Instances can be shared between threads.
+    Cache hits and misses are recorded in given metrics (see metrics.py), if any.
+    """
+    
+    def __init__(self, parser, maxsize=4096, metrics=None):
+        self.parser = parser
+        self.metrics = metrics
+        self._parse = functools.lru_cache(maxsize=maxsize)(self._parse_uncached)
+        self._local = threading.local()
+        
+    def _parse_uncached(self, text):
+        self._local.miss = True
+        try:
+            return self.parser.parse(text), None
+        except Exception as e:
+            return None, e
+    
+    def parse(self, text):
+        self._local.miss = False
+        interval, error = self._parse(text)
+        if self.metrics is not None:
+            self.metrics.cache_lookup(not self._local.miss)
+        if error is not None:
+            raise error.with_traceback(None)
+        return interval
+    
+    def cache_info(self):
+        return self._parse.cache_info()
+
+
 class CargoParser(InlineTransformer):
     # https://doc.rust-lang.org/cargo/reference/specifying-dependencies.html
     grammar = """
@@ -452,3 +488,12 @@ class NPMParser(InlineTransformer):
             int(x) if (x is not None and str.isdigit(x)) else x
             for x in (major, minor, patch)
         )
+
+
+# Parser of each ecosystem
+PARSERS = {
+    'Cargo': CargoParser,
+    'NPM': NPMParser,
+    'Packagist': PackagistParser,
+    'Rubygems': RubyGemsParser,
+}
@@ -0,0 +1,451 @@
+"""
+Stage runner for the replication pipeline.
+
+Each stage declares the files it reads, the code it depends on, and the files
+it produces. A stage is only re-executed if the content of its inputs or code
+changed since its last successful run, or if one of its outputs is missing.
+Stages that do not depend on each other are executed in parallel. The previous
+outputs of a stage are moved aside while it runs, and only deleted once it
+succeeded (they are restored otherwise).
+
+Ecosystems whose raw data are not available (neither the libraries.io dump nor
+the converted or derived datasets) are not part of the default stages.
+
+Should be executed from the root directory, e.g. python -m constraints.pipeline
+"""
+
+import os
+import re
+import sys
+import json
+import hashlib
+import argparse
+import threading
+import subprocess
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from .hashing import digest
+
+
+ECOSYSTEMS = ['Cargo', 'NPM', 'Packagist', 'Rubygems']
+NOTEBOOKS = ['Exploratory', 'Constraint analysis', 'Semver compliance']
+
+STATE_DIR = '.pipeline'
+STATE_FILE = os.path.join(STATE_DIR, 'state.json')
+BACKUP_SUFFIX = '.previous'
+
+PYTHON = sys.executable
+PACKAGE = 'constraints'
+LIBRARY = [
+    'constraints/versions.py',
+    'constraints/parser.py',
+    'constraints/constraints.py',
+]
+
+
+def _imports(source, relative):
+    """
+    Return the names of the modules of PACKAGE that given source may import
+    (for "from X import a, b", both X and X.a, X.b), relative imports included
+    if relative is True.
+    """
+    prefix = r'(?:{}|\.)'.format(PACKAGE) if relative else PACKAGE
+    names = set()
+    for line in source.splitlines():
+        match = re.match(r'\s*from\s+{}(?:\.?(\w+))?\s+import\s+\(?([\w\s,]+)'.format(prefix), line)
+        if match:
+            module, imported = match.groups()
+            if module:
+                names.add(module)
+            else:
+                names.update(n.split()[0] for n in imported.split(',') if n.strip())
+            continue
+        match = re.match(r'\s*import\s+{}\.(\w+)'.format(PACKAGE), line)
+        if match:
+            names.add(match.group(1))
+    return names
+
+
+def imported_modules(path):
+    """
+    Return the source files of the modules of PACKAGE imported, directly or
+    transitively, by given Python file or notebook (paths are relative to the
+    root directory).
+    """
+    with open(path) as f:
+        if path.endswith('.ipynb'):
+            source = '\n'.join(''.join(c['source']) for c in json.load(f)['cells'] if c['cell_type'] == 'code')
+        else:
+            source = f.read()
+
+    result = set()
+    queue = list(_imports(source, relative=False))
+    while queue:
+        module = os.path.join(PACKAGE, '{}.py'.format(queue.pop()))
+        if module in result or not os.path.isfile(module):
+            # Already seen, or not a module (e.g. an imported function)
+            continue
+        result.add(module)
+        with open(module) as f:
+            queue.extend(_imports(f.read(), relative=True))
+    if result and os.path.isfile(os.path.join(PACKAGE, '__init__.py')):
+        result.add(os.path.join(PACKAGE, '__init__.py'))
+    return sorted(result)
+
+
+class Stage:
+    """
+    A step of the pipeline: a command executed in a given directory, that reads
+    "inputs" (data files), relies on "code" (source files) and produces "outputs".
+    All paths are relative to the root directory.
+    """
+
+    def __init__(self, name, command, cwd='.', inputs=None, code=None, outputs=None):
+        self.name = name
+        self.command = list(command)
+        self.cwd = cwd
+        self.inputs = list(inputs or [])
+        self.code = list(code or [])
+        self.outputs = list(outputs or [])
+
+    def __repr__(self):
+        return 'Stage({!r})'.format(self.name)
+
+
+def available_ecosystems():
+    """
+    Return the ecosystems whose datasets can be built or are already available:
+    the libraries.io dump is available, or the converted raw data of the
+    ecosystem, or its datasets.
+    """
+    dump = ['data-raw/versions.csv', 'data-raw/dependencies.csv']
+    return [
+        ecosystem for ecosystem in ECOSYSTEMS
+        if any(all(os.path.isfile(path.format(ecosystem)) for path in paths) for paths in [
+            dump,
+            ['data-raw/{}-versions.csv.gz', 'data-raw/{}-dependencies.csv.gz'],
+            ['data/{}-versions.csv.gz', 'data/{}-dependencies.csv.gz'],
+        ])
+    ]
+
+
+def default_stages(ecosystems=None):
+    """
+    Return the list of stages needed to reproduce the datasets of given
+    ecosystems (default to the available ones) and the notebooks.
+    """
+    stages = []
+    data = []
+
+    for ecosystem in (available_ecosystems() if ecosystems is None else ecosystems):
+        raw_versions = 'data-raw/{}-versions.csv.gz'.format(ecosystem)
+        raw_dependencies = 'data-raw/{}-dependencies.csv.gz'.format(ecosystem)
+        versions = 'data/{}-versions.csv.gz'.format(ecosystem)
+        dependencies = 'data/{}-dependencies.csv.gz'.format(ecosystem)
+
+        stages.append(Stage(
+            'convert-{}'.format(ecosystem),
+            [PYTHON, 'convert.py', ecosystem],
+            cwd='data-raw',
+            inputs=['data-raw/versions.csv', 'data-raw/dependencies.csv'],
+            code=['data-raw/convert.py'],
+            outputs=[raw_versions, raw_dependencies],
+        ))
+        stages.append(Stage(
+            'versions-{}'.format(ecosystem),
+            [PYTHON, 'versions.py', ecosystem],
+            cwd='data',
+            inputs=[raw_versions],
+            code=['data/versions.py'],
+            outputs=[versions],
+        ))
+        stages.append(Stage(
+            'dependencies-{}'.format(ecosystem),
+            [PYTHON, 'dependencies.py', ecosystem],
+            cwd='data',
+            inputs=[versions, raw_dependencies],
+            code=['data/dependencies.py'] + LIBRARY,
+            outputs=[dependencies],
+        ))
+        stages.append(Stage(
+            'monthly-{}'.format(ecosystem),
+            [PYTHON, '-m', 'constraints.cube', ecosystem],
+            inputs=[versions, dependencies],
+            code=LIBRARY + ['constraints/frames.py', 'constraints/cube.py'],
+            outputs=['data/{}-monthly.csv.gz'.format(ecosystem), 'data/{}-required.csv.gz'.format(ecosystem)],
+        ))
+        data.extend([versions, dependencies, 'data/{}-monthly.csv.gz'.format(ecosystem), 'data/{}-required.csv.gz'.format(ecosystem)])
+
+    for notebook in NOTEBOOKS:
+        path = 'notebooks/{}.ipynb'.format(notebook)
+        # Every module imported by the notebook, e.g. survival.py
+        modules = imported_modules(path) if os.path.isfile(path) else []
+        stages.append(Stage(
+            'notebook-{}'.format(notebook.lower().replace(' ', '-')),
+            [
+                'jupyter', 'nbconvert', '--to', 'notebook', '--execute',
+                '--ExecutePreprocessor.timeout=-1',
+                '--output-dir', '../figures', '{}.ipynb'.format(notebook),
+            ],
+            cwd='notebooks',
+            inputs=data + [path],
+            code=sorted(set(LIBRARY + ['constraints/frames.py', 'constraints/cube.py'] + modules)),
+            outputs=['figures/{}.ipynb'.format(notebook)],
+        ))
+
+    return stages
+
+
+class Pipeline:
+    """
+    Execute a set of stages, skipping the ones whose fingerprint did not change
+    since their last successful execution.
+
+    Fingerprints are stored in STATE_FILE, together with the digest of every
+    file that was hashed (indexed by size and modification time, so that
+    unchanged files are not read twice).
+    """
+
+    def __init__(self, stages, state_file=STATE_FILE, jobs=None, force=False, out=sys.stdout):
+        self.stages = OrderedStages(stages)
+        self.state_file = state_file
+        self.jobs = jobs if jobs is not None else (os.cpu_count() or 1)
+        self.force = force
+        self.out = out
+        self._state = self._load_state()
+        self._lock = threading.Lock()
+
+    def _load_state(self):
+        try:
+            with open(self.state_file) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        state.setdefault('stages', {})
+        state.setdefault('files', {})
+        return state
+
+    def _save_state(self):
+        directory = os.path.dirname(self.state_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            content = json.dumps(self._state, indent=1, sort_keys=True)
+        with open(self.state_file + '.tmp', 'w') as f:
+            f.write(content)
+        os.replace(self.state_file + '.tmp', self.state_file)
+
+    def _print(self, message):
+        print(message, file=self.out, flush=True)
+
+    def digest(self, path):
+        """
+        Return the sha256 digest of given file, or None if it does not exist.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        known = self._state['files'].get(path)
+        if known is not None and known[0] == stat.st_size and known[1] == stat.st_mtime:
+            return known[2]
+
+        result = digest(path)
+        with self._lock:
+            self._state['files'][path] = [stat.st_size, stat.st_mtime, result]
+        return result
+
+    def fingerprint(self, stage):
+        """
+        Return the fingerprint of given stage, computed from its command and from
+        the content of its inputs and code. Return None if an input is missing.
+        """
+        h = hashlib.sha256()
+        h.update(json.dumps([stage.command, stage.cwd]).encode())
+        for path in sorted(stage.inputs + stage.code):
+            digest = self.digest(path)
+            if digest is None:
+                return None
+            h.update('{}:{}\n'.format(path, digest).encode())
+        return h.hexdigest()
+
+    def status(self, stage):
+        """
+        Return a pair (status, fingerprint) where status is one of "up-to-date",
+        "outdated", "frozen" (inputs are missing but outputs are available) or
+        "missing" (neither inputs nor outputs are available).
+        """
+        fingerprint = self.fingerprint(stage)
+        outputs = all(os.path.isfile(path) for path in stage.outputs)
+
+        if fingerprint is None:
+            return ('frozen' if outputs else 'missing'), None
+        if not self.force and outputs and self._state['stages'].get(stage.name) == fingerprint:
+            return 'up-to-date', fingerprint
+        return 'outdated', fingerprint
+
+    def execute(self, stage):
+        """
+        Execute given stage. Its previous outputs are moved aside (scripts skip
+        ecosystems whose output already exists), and restored if it fails.
+        """
+        moved = []
+        for path in stage.outputs:
+            if os.path.isfile(path):
+                os.replace(path, path + BACKUP_SUFFIX)
+                moved.append(path)
+
+        try:
+            self._call(stage)
+        except BaseException:
+            for path in stage.outputs:
+                if path in moved:
+                    os.replace(path + BACKUP_SUFFIX, path)
+                elif os.path.isfile(path):
+                    # Partial output, that would be considered as up-to-date
+                    os.remove(path)
+            raise
+
+        for path in moved:
+            os.remove(path + BACKUP_SUFFIX)
+
+    def _call(self, stage):
+        directory = os.path.dirname(self.state_file) or '.'
+        os.makedirs(directory, exist_ok=True)
+        log_path = os.path.join(directory, '{}.log'.format(stage.name))
+        with open(log_path, 'w') as log:
+            code = subprocess.call(stage.command, cwd=stage.cwd, stdout=log, stderr=subprocess.STDOUT)
+
+        if code != 0:
+            raise RuntimeError('{} exited with code {} (see {})'.format(stage.name, code, log_path))
+        for path in stage.outputs:
+            if not os.path.isfile(path):
+                raise RuntimeError('{} did not produce {}'.format(stage.name, path))
+
+    def _process(self, stage, dry_run):
+        status, fingerprint = self.status(stage)
+        if status == 'missing':
+            missing = [p for p in stage.inputs + stage.code if not os.path.isfile(p)]
+            # Without a dry run, these inputs would be produced by upstream stages
+            if dry_run and all(self.stages.producer(p) is not None for p in missing):
+                return 'outdated'
+            raise RuntimeError('{}: missing inputs {}'.format(stage.name, missing))
+        if status == 'outdated' and not dry_run:
+            self._print('[{}] running'.format(stage.name))
+            self.execute(stage)
+            with self._lock:
+                self._state['stages'][stage.name] = fingerprint
+            status = 'done'
+        return status
+
+    def run(self, targets=None, dry_run=False):
+        """
+        Run given targets (stage names, default to all stages) and their upstream
+        stages. Return a dict mapping stage names to their final status.
+        """
+        selected = self.stages.closure(targets)
+        results = {}
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            while len(results) < len(selected):
+                for stage in selected:
+                    if stage.name in results or stage.name in running.values():
+                        continue
+                    upstream = [results.get(s.name) for s in self.stages.upstream(stage)]
+                    if any(r == 'failed' or r == 'skipped' for r in upstream):
+                        results[stage.name] = 'skipped'
+                        self._print('[{}] skipped (upstream failure)'.format(stage.name))
+                    elif all(r is not None for r in upstream):
+                        running[executor.submit(self._process, stage, dry_run)] = stage.name
+
+                if not running:
+                    continue
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        results[name] = 'failed'
+                        self._print('[{}] failed: {}'.format(name, e))
+                    else:
+                        if results[name] != 'done':
+                            self._print('[{}] {}'.format(name, results[name]))
+                self._save_state()
+
+        return results
+
+
+class OrderedStages:
+    """
+    Stages and the dependencies between them, derived from their inputs and outputs.
+    """
+
+    def __init__(self, stages):
+        self._stages = list(stages)
+        self._by_name = {stage.name: stage for stage in self._stages}
+        self._producers = {path: stage for stage in self._stages for path in stage.outputs}
+        self._upstream = {
+            stage.name: [self._producers[p] for p in stage.inputs if p in self._producers]
+            for stage in self._stages
+        }
+
+    def __iter__(self):
+        return iter(self._stages)
+
+    def __getitem__(self, name):
+        return self._by_name[name]
+
+    def upstream(self, stage):
+        return self._upstream[stage.name]
+
+    def producer(self, path):
+        """
+        Return the stage that produces given path, or None.
+        """
+        return self._producers.get(path)
+
+    def closure(self, targets=None):
+        """
+        Return given targets and all their upstream stages, in declaration order.
+        """
+        if not targets:
+            return list(self._stages)
+
+        names = set()
+        todo = [self[name] for name in targets]
+        while todo:
+            stage = todo.pop()
+            if stage.name not in names:
+                names.add(stage.name)
+                todo.extend(self.upstream(stage))
+        return [stage for stage in self._stages if stage.name in names]
+
+
+if __name__ == '__main__':
+    ecosystems = available_ecosystems()
+    stages = default_stages(ecosystems)
+
+    argparser = argparse.ArgumentParser(description='Replication pipeline')
+    argparser.add_argument('targets', type=str, nargs='*', help='stages to run (default to all)')
+    argparser.add_argument('--jobs', '-j', type=int, default=None, help='number of stages to run in parallel')
+    argparser.add_argument('--force', action='store_true', help='re-execute stages even if they are up-to-date')
+    argparser.add_argument('--dry-run', action='store_true', help='only display the status of the stages')
+
+    args = argparser.parse_args()
+
+    unknown = set(args.targets) - {stage.name for stage in stages}
+    if unknown:
+        argparser.error('unknown stages: {}'.format(', '.join(sorted(unknown))))
+
+    for ecosystem in ECOSYSTEMS:
+        if ecosystem not in ecosystems:
+            print('Skipping {} (raw data not available)'.format(ecosystem))
+
+    results = Pipeline(stages, jobs=args.jobs, force=args.force).run(args.targets, dry_run=args.dry_run)
+    if any(status in ('failed', 'skipped') for status in results.values()):
+        sys.exit(1)
@@ -0,0 +1,361 @@
+"""
+Resolution of the transitive dependencies of releases, at a given date.
+
+For each dependency, the resolver picks the highest release of the target that
+was published at the given date and that is accepted by the constraint (parsed
+with the parser of the ecosystem). Two strategies are supported:
+ - "nested" (NPM): each dependency is resolved independently, so that several
+   versions of the same package can be installed;
+ - "unified" (Cargo): the constraints on a package are intersected, so that a
+   single version is installed per package, unless the constraints cannot be
+   satisfied together, in which case a version is installed per group of
+   semver-compatible requirements (as Cargo does for different major versions).
+
+Releases are picked by testing the packed versions of all the candidates at once
+(see compiled.py). Picked releases and the dependencies of each release are
+memoized, as well as the whole set of installed releases of every release
+reached from a resolved root (nested strategy, computed in post-order, the
+releases of a dependency cycle sharing their set), so that subtrees shared by
+many roots are only resolved once.
+
+Unified resolution iterates until the chosen releases do not change, at most
+MAX_ROUNDS times ("converged" is False in the result otherwise).
+
+python -m constraints.resolver ECOSYSTEM DATE [PACKAGE[@VERSION] ...] [--all]
+                               [--mode nested|unified] [--output FILE]
+"""
+
+import sys
+import json
+import time
+import argparse
+
+from collections import OrderedDict, deque
+
+import numpy
+
+from . import frames
+from . import compiled as _compiled
+from . import history as _history
+from . import parser as _parser
+from .versions import Version
+
+
+MODES = {'Cargo': 'unified', 'NPM': 'nested', 'Packagist': 'unified', 'Rubygems': 'unified'}
+MAX_ROUNDS = 100
+
+
+def compatibility(version):
+    """
+    Return the semver-compatibility class of given Version: its major, or its
+    minor (or patch) for 0.x (or 0.0.x) versions.
+    """
+    if version.major > 0:
+        return (version.major, )
+    if version.minor > 0:
+        return (0, version.minor)
+    return (0, 0, version.patch)
+
+
+class Resolver:
+    """
+    Resolve releases of given History at given date, with given strategy
+    (default to the one of the ecosystem, see MODES).
+    """
+
+    def __init__(self, history, date, mode=None, parser=None):
+        self.history = history
+        self.date = date
+        self.mode = MODES[history.ecosystem] if mode is None else mode
+        if self.mode not in ('nested', 'unified'):
+            raise ValueError('Unknown mode {!r}'.format(self.mode))
+        self.parser = _parser.PARSERS[history.ecosystem]() if parser is None else parser
+
+        self._intervals = {}
+        self._compiled = {}
+        self._candidates = {}
+        self._keys = {}
+        self._picks = {}
+        self._requirements = {}
+        self._installed = {}
+        self._unified = {}
+
+    def interval(self, text):
+        if text not in self._intervals:
+            self._intervals[text] = _parser.parse_or_empty(self.parser, text)
+        return self._intervals[text]
+
+    def compiled(self, text):
+        if text not in self._compiled:
+            self._compiled[text] = _compiled.compile(self.interval(text))
+        return self._compiled[text]
+
+    def candidates(self, package):
+        """
+        Return the (Version, release index) of given package (an id) published
+        at the date, from the highest version.
+        """
+        if package not in self._candidates:
+            result = []
+            for release in self.history.releases(package, self.date):
+                try:
+                    result.append((Version(self.history.release_version[release]), release))
+                except Exception:
+                    pass
+            self._candidates[package] = sorted(result, reverse=True)
+            versions = [version for version, _ in self._candidates[package]]
+            self._keys[package] = _compiled.pack_many(versions) + (versions, )
+        return self._candidates[package]
+
+    def pick(self, package, interval):
+        """
+        Return the (Version, release index) of the highest release of given
+        package in given interval (or Compiled interval), or None.
+        """
+        candidates = self.candidates(package)
+        if len(candidates) == 0:
+            return None
+        if not isinstance(interval, _compiled.Compiled):
+            interval = _compiled.compile(interval)
+        accepted = numpy.flatnonzero(interval.contains(*self._keys[package]))
+        return candidates[accepted[0]] if len(accepted) > 0 else None
+
+    def _pick(self, target, text):
+        key = (target, text)
+        if key not in self._picks:
+            self._picks[key] = self.pick(target, self.compiled(text))
+        return self._picks[key]
+
+    def requirements(self, release):
+        """
+        Return the list of (target, constraint, picked release index or None) of
+        given release.
+        """
+        if release not in self._requirements:
+            result = []
+            for target, text in zip(*self.history.requirements(release)):
+                picked = self._pick(target, text)
+                result.append((target, text, None if picked is None else picked[1]))
+            self._requirements[release] = result
+        return self._requirements[release]
+
+    def release(self, package, version=None):
+        """
+        Return the index of given release of given package (a name), or of its
+        latest release at the date if version is None, or None.
+        """
+        code = self.history.ids([package])[0]
+        if code < 0:
+            return None
+        releases = self.history.releases(code, self.date)
+        for release in reversed(releases):
+            if version is None or self.history.release_version[release] == version:
+                return release
+        return None
+
+    def _successors(self, release):
+        return [picked for _, _, picked in self.requirements(release) if picked is not None]
+
+    def _close(self, component):
+        """
+        Memoize the installed releases and the unresolved requirements of given
+        releases, that depend on each other (a strongly connected component),
+        once their other dependencies are memoized.
+        """
+        members = set(component)
+        installed, unresolved = set(), set()
+        for release in component:
+            for target, text, picked in self.requirements(release):
+                if picked is None:
+                    unresolved.add((target, text))
+                    continue
+                installed.add(picked)
+                if picked not in members:
+                    shared_installed, shared_unresolved = self._installed[picked]
+                    installed.update(shared_installed)
+                    unresolved.update(shared_unresolved)
+        unresolved = frozenset(unresolved)
+        for release in component:
+            self._installed[release] = (frozenset(installed - {release}), unresolved)
+
+    def _closures(self, root):
+        """
+        Memoize the installed releases of every release reachable from given
+        root, in post-order (iterative Tarjan's algorithm, so that dependency
+        cycles share their installed releases).
+        """
+        index, low, stack, on_stack = {root: 0}, {root: 0}, [root], {root}
+        work = [(root, iter(self._successors(root)))]
+        while work:
+            release, successors = work[-1]
+            for successor in successors:
+                if successor in self._installed:
+                    continue
+                if successor not in index:
+                    index[successor] = low[successor] = len(index)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(self._successors(successor))))
+                    break
+                if successor in on_stack:
+                    low[release] = min(low[release], index[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[release])
+                if low[release] == index[release]:
+                    component = []
+                    while not component or component[-1] != release:
+                        component.append(stack.pop())
+                        on_stack.discard(component[-1])
+                    self._close(component)
+
+    def _nested(self, root):
+        if root not in self._installed:
+            self._closures(root)
+        installed, unresolved = self._installed[root]
+        return set(installed), set(unresolved), 0, True
+
+    def _unify(self, target, texts):
+        """
+        Return the releases of given target (a tuple), the unresolved constraints
+        and the number of conflicts for given constraints (a frozenset).
+        """
+        key = (target, texts)
+        if key not in self._unified:
+            groups, unresolved = OrderedDict(), []
+            for text in sorted(texts, key=str):
+                picked = self._pick(target, text)
+                if picked is None:
+                    unresolved.append(text)
+                else:
+                    groups.setdefault(compatibility(picked[0]), []).append(text)
+
+            releases, conflicts = set(), 0
+            for group in groups.values():
+                interval = self.interval(group[0])
+                for text in group[1:]:
+                    interval = interval & self.interval(text)
+                picked = self.pick(target, interval)
+                if picked is None:
+                    # Requirements cannot be unified
+                    conflicts += 1
+                    releases.update(self._pick(target, text)[1] for text in group)
+                else:
+                    releases.add(picked[1])
+            self._unified[key] = (tuple(sorted(releases)), unresolved, conflicts)
+        return self._unified[key]
+
+    def _unified_closure(self, root):
+        installed, unresolved, _, _ = self._nested(root)
+        packages = self.history.release_package
+        if len(set(packages[r] for r in installed)) == len(installed):
+            # A single release per package: they are the highest releases
+            # accepted by all the constraints, unification changes nothing
+            return installed, unresolved, 0, True
+
+        chosen = {}
+        for _ in range(MAX_ROUNDS):
+            # Collect the constraints of the releases reachable from the root
+            # with the current choices
+            required = OrderedDict()
+            seen, queue = {root}, deque([root])
+            while queue:
+                release = queue.popleft()
+                for target, text, picked in self.requirements(release):
+                    required.setdefault(target, set()).add(text)
+                    for candidate in chosen.get(target, (picked, )):
+                        if candidate is not None and candidate not in seen:
+                            seen.add(candidate)
+                            queue.append(candidate)
+
+            unresolved, conflicts, choices = set(), 0, {}
+            for target, texts in required.items():
+                releases, missing, count = self._unify(target, frozenset(texts))
+                choices[target] = releases
+                unresolved.update((target, text) for text in missing)
+                conflicts += count
+
+            if choices == chosen:
+                converged = True
+                break
+            chosen = choices
+        else:
+            converged = False
+
+        installed = set(release for releases in chosen.values() for release in releases)
+        installed.discard(root)
+        return installed, unresolved, conflicts, converged
+
+    def resolve(self, package, version=None):
+        """
+        Return an ordered dict with the "installed" (package, version) pairs of
+        given release (default to the latest one at the date), the "unresolved"
+        (target, constraint) pairs, the number of "conflicts" and whether the
+        unification "converged" within MAX_ROUNDS rounds (unified mode).
+        Raise a KeyError if the release is unknown at the date.
+        """
+        root = self.release(package, version)
+        if root is None:
+            raise KeyError('Unknown release {} {} at {}'.format(package, version or '', self.date))
+
+        if self.mode == 'nested':
+            installed, unresolved, conflicts, converged = self._nested(root)
+        else:
+            installed, unresolved, conflicts, converged = self._unified_closure(root)
+
+        h = self.history
+        return OrderedDict([
+            ('package', package),
+            ('version', h.release_version[root]),
+            ('installed', sorted((h.packages[h.release_package[r]], h.release_version[r]) for r in installed)),
+            ('unresolved', sorted((h.packages[t], text) for t, text in unresolved)),
+            ('conflicts', conflicts),
+            ('converged', converged),
+        ])
+
+    def resolve_many(self, roots):
+        """
+        Yield the resolution of given (package, version) roots (see resolve),
+        or None for unknown releases. Memoized results are shared by all roots.
+        """
+        for package, version in roots:
+            try:
+                yield self.resolve(package, version)
+            except KeyError:
+                yield None
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description='Resolve the transitive dependencies of releases')
+    argparser.add_argument('ecosystem', type=str, help='ecosystem, e.g. Cargo')
+    argparser.add_argument('date', type=str, help='only consider the releases published at this date')
+    argparser.add_argument('releases', type=str, nargs='*', help='releases to resolve, as PACKAGE or PACKAGE@VERSION')
+    argparser.add_argument('--all', action='store_true', help='resolve the latest release of every package at the date')
+    argparser.add_argument('--mode', choices=['nested', 'unified'], help='resolution strategy (default to the one of the ecosystem)')
+    argparser.add_argument('--data', type=str, default=frames.DATA_PATH, help='folder containing the datasets')
+    argparser.add_argument('--output', type=str, help='file to store the resolutions (JSON lines, default to stdout)')
+    args = argparser.parse_args()
+
+    if not args.releases and not args.all:
+        argparser.error('releases or --all are required')
+
+    resolver = Resolver(_history.History(args.ecosystem, args.data), args.date, args.mode)
+    if args.all:
+        roots = [(package, None) for package in resolver.history.snapshot(args.date)['package']]
+    else:
+        roots = [tuple(text.rsplit('@', 1)) if '@' in text[1:] else (text, None) for text in args.releases]
+
+    start = time.perf_counter()
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for (package, version), result in zip(roots, resolver.resolve_many(roots)):
+            if result is None:
+                print('Unknown release {} {} at {}'.format(package, version or '', args.date), file=sys.stderr)
+            else:
+                out.write(json.dumps(result) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print('{} releases resolved in {:.1f}s'.format(len(roots), time.perf_counter() - start), file=sys.stderr)
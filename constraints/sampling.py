@@ -0,0 +1,205 @@
+"""
+Stratified samples of the dependencies, for fast exploratory ratios.
+
+Dependencies are stratified by ecosystem, month (of the release that declares
+them, see cube.month) and size of the package (its number of releases, see
+SIZES), and a random sample of each stratum is kept (a fraction of it, but at
+least a minimum number of dependencies, or the whole stratum if it is smaller).
+Samples only contain the month, the size, the population of the stratum and the
+labels and constraint types of the dependencies. They are built once per
+ecosystem and cached on disk (see frames).
+
+Sample.ratios answers the same queries as cube.ratios, with the combined ratio
+estimator of stratified sampling and a Wilson confidence interval for its
+effective sample size (from the linearized variance, with finite population
+correction), or exactly from the whole dependencies with exact=True (for final
+figures).
+"""
+
+import os
+import sys
+
+from collections import OrderedDict
+
+import numpy
+import pandas
+import scipy.stats
+
+from . import cube
+from . import frames
+from .constraints import LABELS
+
+
+# Package sizes (number of releases): [1, 10), [10, 100) and [100, inf)
+SIZES = [1, 10, 100]
+SIZE_LABELS = ['small', 'medium', 'large']
+COLUMNS = LABELS + list(frames.COMPLIANCE)
+FRACTION = 0.02
+MINIMUM = 100
+SEED = 0
+
+
+def prepare(df_dependencies, df_versions):
+    """
+    Return the month, the size class (an index in SIZES) and the labels and
+    constraint types of given dependencies, and the "population" of their
+    stratum (the whole frame is the population).
+    """
+    releases = df_versions.groupby('package').size()
+    df = (
+        df_dependencies
+        [['package', 'date'] + COLUMNS]
+        .dropna(subset=['date'])
+    )
+    df = pandas.DataFrame(OrderedDict(
+        [
+            ('date', cube.month(df['date']).values),
+            ('size', numpy.digitize(df['package'].map(releases).fillna(1).values, SIZES) - 1),
+        ]
+        + [(column, df[column].fillna(False).astype(bool).values) for column in COLUMNS]
+    ))
+    return df.assign(population=df.groupby(['date', 'size'])['size'].transform('size').values)
+
+
+def stratify(df, fraction=FRACTION, minimum=MINIMUM, seed=SEED):
+    """
+    Return a stratified random sample of given prepared dependencies (see
+    prepare): max(minimum, fraction * population) dependencies of each stratum.
+    """
+    strata = df.groupby(['date', 'size']).ngroup().values
+    population = df['population'].values
+    size = numpy.minimum(population, numpy.maximum(minimum, numpy.ceil(fraction * population))).astype(numpy.int64)
+
+    order = numpy.lexsort((numpy.random.RandomState(seed).random_sample(len(df)), strata))
+    starts = numpy.searchsorted(strata[order], strata[order])
+    kept = order[numpy.arange(len(df)) - starts < size[order]]
+    return df.iloc[numpy.sort(kept)].reset_index(drop=True)
+
+
+def sample(ecosystem, fraction=FRACTION, minimum=MINIMUM, seed=SEED, data_path=frames.DATA_PATH, cache=True):
+    """
+    Return the stratified sample of the dependencies of given ecosystem.
+    """
+    paths = frames._paths(ecosystem, data_path, frames.VERSIONS_PATH, frames.DEPENDENCIES_PATH)
+
+    def compute():
+        return stratify(
+            prepare(frames.dependencies(ecosystem, data_path, cache), frames.versions(ecosystem, data_path, cache)),
+            fraction, minimum, seed,
+        )
+
+    if not cache:
+        return compute()
+    name = 'sample-{}-{}-{}'.format(fraction, minimum, seed)
+    return frames._cached(name, ecosystem, paths + [os.path.abspath(__file__)], compute)
+
+
+def estimate(df, columns, where=None, confidence=0.95):
+    """
+    Return the estimated proportion of dependencies satisfying given columns
+    among the ones satisfying "where" (see cube.ratios), for each ecosystem and
+    month of given sample, with the bounds of its confidence interval.
+    """
+    keys = ['ecosystem', 'date'] if 'ecosystem' in df.columns else ['date']
+    x = numpy.ones(len(df), dtype=bool) if where is None else numpy.asarray(cube._mask(df, where), dtype=bool)
+    names = [column if isinstance(column, str) else i for i, column in enumerate(columns)]
+
+    sums = pandas.DataFrame(OrderedDict(
+        [('_n', numpy.ones(len(df))), ('_x', x.astype(float))]
+        + [(name, (x & numpy.asarray(cube._mask(df, column), dtype=bool)).astype(float)) for name, column in zip(names, columns)]
+    ))
+    strata = sums.groupby([df[key] for key in keys + ['size']]).sum()
+    n = strata['_n'].values
+    population = df.groupby([df[key] for key in keys + ['size']])['population'].first().values
+    weights = population / n
+    groups = strata.index.droplevel('size')
+
+    def per_group(values):
+        return pandas.Series(values, index=groups).groupby(level=keys).sum()
+
+    total, sampled = per_group(weights * strata['_x'].values), per_group(strata['_x'].values)
+    # Sampled dependencies satisfying "where", corrected for the sampled fraction
+    cap = (sampled / (1 - sampled / total)).where(sampled < total, numpy.inf)
+
+    z = scipy.stats.norm.ppf(0.5 + confidence / 2)
+    result = OrderedDict((stat, OrderedDict()) for stat in ['ratio', 'low', 'high'])
+    for name in names:
+        ratio = per_group(weights * strata[name].values) / total
+        r = ratio.reindex(groups).values
+        # Linearized variance of the ratio: residuals y - r * x (y is a subset of x)
+        sum_d = strata[name].values - r * strata['_x'].values
+        sum_dd = strata[name].values * (1 - 2 * r) + r ** 2 * strata['_x'].values
+        variance = numpy.where(n > 1, (sum_dd - sum_d ** 2 / n) / numpy.maximum(n - 1, 1), 0).clip(min=0)
+        variance = per_group(population ** 2 * (1 - n / population) * variance / n) / total ** 2
+
+        # Wilson interval for the effective sample size, that is not larger
+        # than the sample itself (the variance vanishes with rare labels)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            size = numpy.fmin(ratio * (1 - ratio) / variance, cap)
+            size = size.where(size > 0, cap)
+            center = (ratio + z ** 2 / (2 * size)) / (1 + z ** 2 / size)
+            half = z * numpy.sqrt(ratio * (1 - ratio) / size + z ** 2 / (4 * size ** 2)) / (1 + z ** 2 / size)
+        result['ratio'][name] = ratio
+        result['low'][name] = (center - half).clip(lower=0)
+        result['high'][name] = (center + half).clip(upper=1)
+
+    kept = total > 0
+    return pandas.concat(
+        [pandas.DataFrame(values)[kept] for values in result.values()],
+        axis=1,
+        keys=list(result),
+    )
+
+
+class Sample:
+    """
+    Stratified samples of given ecosystems, see sample. The whole dependencies
+    are only loaded for exact ratios.
+    """
+
+    def __init__(self, ecosystems=cube.ECOSYSTEMS, fraction=FRACTION, minimum=MINIMUM, seed=SEED, data_path=frames.DATA_PATH):
+        self.ecosystems = ecosystems
+        self.data_path = data_path
+        self.data = pandas.concat([
+            sample(ecosystem, fraction, minimum, seed, data_path).assign(ecosystem=ecosystem)
+            for ecosystem in ecosystems
+        ], ignore_index=True)
+        self._population = None
+
+    @property
+    def population(self):
+        """
+        The whole prepared dependencies (see prepare) of the ecosystems.
+        """
+        if self._population is None:
+            self._population = pandas.concat([
+                prepare(frames.dependencies(ecosystem, self.data_path), frames.versions(ecosystem, self.data_path)).assign(ecosystem=ecosystem)
+                for ecosystem in self.ecosystems
+            ], ignore_index=True)
+        return self._population
+
+    def ratios(self, columns, where=None, confidence=0.95, exact=False):
+        """
+        Return, for each ecosystem and month, the proportion of dependencies
+        satisfying given columns among the ones satisfying "where" (see
+        cube.ratios). The result has a "ratio", a "low" and a "high" column for
+        each column (the bounds of the confidence interval). With exact=True,
+        ratios are computed from the whole dependencies (and the bounds are the
+        ratios).
+        """
+        return estimate(self.population if exact else self.data, columns, where, confidence)
+
+    def ratio(self, column, where=None, confidence=0.95, exact=False):
+        """
+        Return the proportion of dependencies satisfying given column (see
+        ratios) as a frame indexed by date, with "ratio", "low" and "high"
+        columns for each ecosystem.
+        """
+        name = column if isinstance(column, str) else 0
+        return self.ratios([column], where, confidence, exact).xs(name, axis=1, level=1).unstack('ecosystem')
+
+
+if __name__ == '__main__':
+    for ecosystem in (sys.argv[1:] or cube.ECOSYSTEMS):
+        df = sample(ecosystem)
+        print('Sample of {}: {} dependencies in {} strata'.format(ecosystem, len(df), len(df.groupby(['date', 'size']))))
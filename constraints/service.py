@@ -0,0 +1,232 @@
+"""
+HTTP/JSON service to parse and classify constraints.
+
+The four parsers are compiled once, and parsed and classified constraints are
+kept in LRU caches, so that clients do not pay for grammar compilation nor for
+constraints that were already seen. Requests are served by a pool of threads.
+
+python -m constraints.service [--host HOST] [--port PORT] [--workers N]
+
+POST /parse and POST /classify expect a JSON document such as
+{"ecosystem": "NPM", "constraints": ["^1.2.3", "~2.0"]} and return
+{"results": [...]} with one result per constraint, in the same order. Results
+contain the interval, and for /classify, the labels (see constraints.LABELS)
+and the constraint type ("compliance"). Constraints that cannot be parsed get
+an "error" instead. GET /status returns the state of the caches, and
+GET /metrics the metrics of the parsers in the Prometheus text format (see
+constraints.metrics).
+
+Connections are kept alive between requests, but are closed after TIMEOUT
+seconds without request, so that idle clients do not hold the workers.
+"""
+
+import json
+import logging
+import argparse
+import functools
+
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+
+from . import parser
+from . import metrics
+from . import constraints
+
+
+HOST = '127.0.0.1'
+PORT = 8080
+WORKERS = 8
+TIMEOUT = 30  # seconds an idle connection is kept open
+CACHE_SIZE = 2 ** 16
+MAX_BATCH = 10000  # constraints per request
+MAX_BODY = 16 * 2 ** 20
+
+logger = logging.getLogger(__name__)
+
+
+class Analyzer:
+    """
+    Parse and classify constraints of the supported ecosystems, caching the
+    results of the last "cache_size" constraints of each ecosystem. Parser
+    metrics are recorded in given registry (default to metrics.REGISTRY).
+    """
+
+    def __init__(self, cache_size=CACHE_SIZE, registry=None):
+        self.registry = metrics.REGISTRY if registry is None else registry
+        self.parsers = {name: metrics.metered_parser(name, self.registry, cache_size) for name in parser.PARSERS}
+        self._classify = functools.lru_cache(maxsize=cache_size)(self._classify_uncached)
+
+    def _parse(self, ecosystem, text):
+        result = {'constraint': text}
+        try:
+            interval = self.parsers[ecosystem].parse(text)
+        except Exception as e:
+            result['error'] = '{}: {}'.format(e.__class__.__name__, str(e).splitlines()[0] if str(e) else '')
+            return result, None
+        result['interval'] = str(interval)
+        return result, interval
+
+    def parse(self, ecosystem, text):
+        """
+        Return a dict with the interval of given constraint, or with an error.
+        """
+        return self._parse(ecosystem, text)[0]
+
+    def _classify_uncached(self, ecosystem, text):
+        result, interval = self._parse(ecosystem, text)
+        if interval is not None:
+            labels = constraints.labels(interval)
+            result['labels'] = labels
+            result['compliance'] = constraints.compliance(labels)
+        return result
+
+    def classify(self, ecosystem, text):
+        """
+        Same as parse, with the labels and the constraint type of the interval.
+        """
+        return dict(self._classify(ecosystem, text))
+
+    def status(self):
+        # Metered parsers wrap a CachingParser
+        info = {name: p.parser.cache_info() for name, p in self.parsers.items()}
+        info['classify'] = self._classify.cache_info()
+        return {name: {'hits': i.hits, 'misses': i.misses, 'size': i.currsize} for name, i in info.items()}
+
+
+class RequestError(Exception):
+    def __init__(self, code, message):
+        Exception.__init__(self, message)
+        self.code = code
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        # Idle keep-alive connections time out (see handle_one_request)
+        self.timeout = self.server.idle_timeout
+        BaseHTTPRequestHandler.setup(self)
+
+    def log_message(self, format, *args):
+        logger.info('%s - %s', self.address_string(), format % args)
+
+    def _send(self, code, document):
+        body = json.dumps(document).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _length(self):
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # The body cannot be skipped: the connection is not reusable
+            self.close_connection = True
+            raise RequestError(400, 'Invalid Content-Length header')
+        return length
+
+    def _read(self):
+        length = self._length()
+        if length > MAX_BODY:
+            raise RequestError(413, 'Request body is too large')
+        try:
+            document = json.loads(self.rfile.read(length).decode())
+        except ValueError:
+            raise RequestError(400, 'Request body is not valid JSON')
+
+        if not isinstance(document, dict):
+            raise RequestError(400, 'Request body must be a JSON object')
+        ecosystem = document.get('ecosystem')
+        if ecosystem not in parser.PARSERS:
+            raise RequestError(400, 'Unknown ecosystem {!r} (expected one of {})'.format(ecosystem, ', '.join(sorted(parser.PARSERS))))
+
+        texts = document['constraints'] if 'constraints' in document else [document.get('constraint')]
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            raise RequestError(400, '"constraints" must be a list of strings')
+        if len(texts) > MAX_BATCH:
+            raise RequestError(413, 'At most {} constraints per request'.format(MAX_BATCH))
+        return ecosystem, texts
+
+    def do_GET(self):
+        if self.path == '/status':
+            self._send(200, {'status': 'ok', 'cache': self.server.analyzer.status()})
+        elif self.path == '/metrics':
+            body = self.server.analyzer.registry.prometheus().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        try:
+            if self.path == '/parse':
+                func = self.server.analyzer.parse
+            elif self.path == '/classify':
+                func = self.server.analyzer.classify
+            else:
+                # The body is read anyway, to keep the connection usable
+                self.rfile.read(self._length())
+                raise RequestError(404, 'Not found')
+
+            ecosystem, texts = self._read()
+            self._send(200, {'results': [func(ecosystem, text) for text in texts]})
+        except RequestError as e:
+            self._send(e.code, {'error': str(e)})
+
+
+class Server(HTTPServer):
+    """
+    HTTP server that handles requests in a pool of "workers" threads, sharing
+    given Analyzer. Connections without request for "idle_timeout" seconds are
+    closed.
+    """
+
+    def __init__(self, address, analyzer=None, workers=WORKERS, handler=Handler, idle_timeout=TIMEOUT):
+        HTTPServer.__init__(self, address, handler)
+        self.analyzer = Analyzer() if analyzer is None else analyzer
+        self.idle_timeout = idle_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def process_request(self, request, client_address):
+        self._executor.submit(self._process, request, client_address)
+
+    def server_close(self):
+        HTTPServer.server_close(self)
+        self._executor.shutdown(wait=True)
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description='Constraint analysis service')
+    argparser.add_argument('--host', type=str, default=HOST, help='address to listen on (default to {})'.format(HOST))
+    argparser.add_argument('--port', type=int, default=PORT, help='port to listen on (default to {})'.format(PORT))
+    argparser.add_argument('--workers', type=int, default=WORKERS, help='number of worker threads')
+    argparser.add_argument('--timeout', type=float, default=TIMEOUT, help='seconds before idle connections are closed')
+    argparser.add_argument('--cache-size', type=int, default=CACHE_SIZE, help='number of constraints cached per ecosystem')
+    argparser.add_argument('--debug', action='store_true', help='log requests')
+    args = argparser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.debug else logging.WARNING, format='[%(levelname)-8s] %(asctime)s :: %(message)s')
+
+    server = Server((args.host, args.port), Analyzer(args.cache_size), args.workers, idle_timeout=args.timeout)
+    print('Serving on http://{}:{}'.format(*server.server_address))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,200 @@
+"""
+Datasets shared between processes through memory-mapped files.
+
+The versions and dependencies frames of an ecosystem (see frames) are stored
+once, one .npy file per column, in data/cache/shared under a key that depends
+on the content of the datasets: numeric, boolean and date columns as is, other
+columns as categorical codes (their categories are stored in a JSON file).
+Processes map these files read-only (numpy.load with mmap_mode), so that their
+columns are views on the same pages of the page cache instead of private
+copies.
+
+Workers of a multiprocessing pool open the datasets once (see pool, or attach
+as pool initializer), and get them with current().
+"""
+
+import os
+import glob
+import json
+import shutil
+import hashlib
+import multiprocessing
+
+from collections import OrderedDict
+
+import numpy
+import pandas
+
+from . import frames
+from .hashing import digest
+
+
+SHARED_PATH = os.path.join(frames.CACHE_PATH, 'shared')
+TABLES = OrderedDict([
+    ('versions', frames.versions),
+    ('dependencies', frames.dependencies),
+])
+
+# Datasets opened by the current process, by path
+_opened = {}
+_current = None
+
+
+def _key(ecosystem, data_path):
+    h = hashlib.sha256()
+    for path in frames._paths(ecosystem, data_path, frames.VERSIONS_PATH, frames.DEPENDENCIES_PATH) + [os.path.abspath(__file__)]:
+        h.update(digest(path).encode())
+    return h.hexdigest()[:16]
+
+
+def _store(df, path):
+    """
+    Store the columns of given frame in given directory, and return their
+    description.
+    """
+    os.makedirs(path)
+    columns = OrderedDict()
+    for i, (name, series) in enumerate(df.items()):
+        filename = '{}.npy'.format(i)
+        if series.dtype.kind in 'biuf':
+            kind, values = 'numeric', series.values
+        elif series.dtype.kind == 'M':
+            kind, values = 'datetime', series.values.astype('datetime64[ns]').view(numpy.int64)
+        else:
+            kind, categorical = 'category', pandas.Categorical(series)
+            values = categorical.codes.astype(numpy.int32)
+            with open(os.path.join(path, '{}.json'.format(i)), 'w') as f:
+                json.dump(categorical.categories.tolist(), f)
+        numpy.save(os.path.join(path, filename), numpy.ascontiguousarray(values))
+        columns[name] = OrderedDict([('file', filename), ('kind', kind)])
+    return OrderedDict([('rows', len(df)), ('columns', columns)])
+
+
+def materialize(ecosystem, data_path=frames.DATA_PATH, shared_path=SHARED_PATH, cache=True):
+    """
+    Store the versions and dependencies of given ecosystem as memory-mappable
+    files (unless they are already stored), and return their directory.
+    """
+    pattern = os.path.join(shared_path, '{}-{{}}'.format(ecosystem))
+    path = pattern.format(_key(ecosystem, data_path))
+    if os.path.isdir(path):
+        return path
+
+    tmp = '{}.tmp{}'.format(path, os.getpid())
+    shutil.rmtree(tmp, ignore_errors=True)
+    tables = OrderedDict(
+        (name, _store(func(ecosystem, data_path, cache), os.path.join(tmp, name)))
+        for name, func in TABLES.items()
+    )
+    with open(os.path.join(tmp, 'tables.json'), 'w') as f:
+        json.dump(tables, f, indent=2)
+
+    for stale in glob.glob(pattern.format('*')):
+        if '.tmp' not in stale:
+            shutil.rmtree(stale, ignore_errors=True)
+    try:
+        os.rename(tmp, path)
+    except OSError:
+        # Materialized concurrently by another process
+        shutil.rmtree(tmp, ignore_errors=True)
+    return path
+
+
+class SharedTable:
+    """
+    Read-only table whose columns are memory-mapped. column returns the shared
+    array of a column (the codes, for categorical columns), while categorical
+    and frame build (private) pandas objects.
+    """
+
+    def __init__(self, path, description):
+        self.path = path
+        self.description = description
+        self.columns = list(description['columns'])
+        self._arrays = {}
+        self._categories = {}
+
+    def __len__(self):
+        return self.description['rows']
+
+    def column(self, name):
+        if name not in self._arrays:
+            column = self.description['columns'][name]
+            values = numpy.load(os.path.join(self.path, column['file']), mmap_mode='r')
+            if column['kind'] == 'datetime':
+                values = values.view('datetime64[ns]')
+            self._arrays[name] = values
+        return self._arrays[name]
+
+    def categories(self, name):
+        """
+        Return the categories of given categorical column, or None.
+        """
+        column = self.description['columns'][name]
+        if column['kind'] != 'category':
+            return None
+        if name not in self._categories:
+            with open(os.path.join(self.path, column['file'].replace('.npy', '.json'))) as f:
+                self._categories[name] = json.load(f)
+        return self._categories[name]
+
+    def categorical(self, name):
+        return pandas.Categorical.from_codes(self.column(name), self.categories(name))
+
+    def frame(self, columns=None):
+        """
+        Return a dataframe (a private copy) with given columns (default to all).
+        """
+        return pandas.DataFrame(OrderedDict(
+            (name, self.categorical(name) if self.categories(name) is not None else numpy.array(self.column(name)))
+            for name in (columns or self.columns)
+        ))
+
+
+class SharedData:
+    """
+    Tables (see TABLES) stored in given directory, see materialize.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'tables.json')) as f:
+            self.tables = OrderedDict(
+                (name, SharedTable(os.path.join(path, name), description))
+                for name, description in json.load(f, object_pairs_hook=OrderedDict).items()
+            )
+
+    def __getitem__(self, name):
+        return self.tables[name]
+
+
+def load(path):
+    """
+    Return the SharedData stored in given directory, opened once per process.
+    """
+    if path not in _opened:
+        _opened[path] = SharedData(path)
+    return _opened[path]
+
+
+def attach(path):
+    """
+    Open the SharedData stored in given directory as the current one of this
+    process. To be used as the initializer of a pool.
+    """
+    global _current
+    _current = load(path)
+
+
+def current():
+    if _current is None:
+        raise RuntimeError('No shared data attached to this process')
+    return _current
+
+
+def pool(path, processes=None):
+    """
+    Return a multiprocessing pool whose workers are attached to the SharedData
+    stored in given directory.
+    """
+    return multiprocessing.Pool(processes, initializer=attach, initargs=(path, ))
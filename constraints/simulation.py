@@ -0,0 +1,208 @@
+"""
+What-if simulation of alternative interpretations of the constraints.
+
+A scenario rewrites the constraints (e.g. "~" treated as "^") and/or changes
+the semantics of 0.x versions (the "semver" parameter of the allows_*compatible
+predicates of constraints.py). The labels of each distinct constraint are
+stored as a bitset (one bit per label of constraints.LABELS): constraints that
+are not rewritten keep the labels of the dataset, and the labels that depend on
+"semver" are derived from the "dev", "allows_major", "allows_minor" and
+"allows_patch" bits, so that only rewritten constraints are parsed again. Labels
+and constraint types are then counted per month (as in cube.py) with numpy,
+and compared with the dataset.
+
+python -m constraints.simulation SCENARIO [--ecosystem ECOSYSTEM ...] [--output FILE]
+"""
+
+import re
+import argparse
+
+from collections import OrderedDict
+
+import numpy
+import pandas
+
+from . import cube
+from . import frames
+from . import fastpath
+from . import parser as _parser
+from . import constraints
+from .constraints import LABELS
+
+
+BITS = OrderedDict((label, 1 << i) for i, label in enumerate(LABELS))
+MEASURES = ['n'] + LABELS + list(frames.COMPLIANCE)
+
+
+class Scenario:
+    """
+    Alternative interpretation of the constraints: "rewrite" is a function
+    applied to each constraint (or None), and "semver" is passed to the
+    predicates that depend on it.
+    """
+
+    def __init__(self, name, rewrite=None, semver=False, description=''):
+        self.name = name
+        self.rewrite = rewrite
+        self.semver = semver
+        self.description = description
+
+
+def tilde_as_caret(text):
+    # "~>" is the pessimistic operator of Rubygems, not a tilde
+    return re.sub(r'~(?!>)', '^', text)
+
+
+SCENARIOS = OrderedDict((s.name, s) for s in [
+    Scenario('baseline', description='constraints as in the datasets'),
+    Scenario('tilde-as-caret', rewrite=tilde_as_caret, description='every "~" is treated as "^"'),
+    Scenario('semver', semver=True, description='0.x versions follow strict semver (any change may be incompatible)'),
+    Scenario('tilde-as-caret-semver', rewrite=tilde_as_caret, semver=True, description='both of the above'),
+])
+
+
+def bitset(labels):
+    """
+    Return the bitset of given labels (see constraints.labels).
+    """
+    return sum(bit for label, bit in BITS.items() if labels[label])
+
+
+def derive(bits, semver=False):
+    """
+    Return given array of bitsets with the labels that depend on "semver"
+    recomputed from the other ones, as the predicates of constraints.py do.
+    """
+    def has(label):
+        return (bits & BITS[label]) != 0
+
+    dev, major, minor, patch = has('dev'), has('allows_major'), has('allows_minor'), has('allows_patch')
+    if semver:
+        dev_compatible, dev_incompatible = numpy.ones_like(dev), major | minor | patch
+    else:
+        dev_compatible, dev_incompatible = patch, major | minor
+
+    derived = OrderedDict()
+    derived['allows_all_compatible'] = numpy.where(dev, dev_compatible, minor & patch)
+    derived['allows_compatible'] = numpy.where(dev, dev_compatible, minor | patch)
+    derived['allows_incompatible'] = numpy.where(dev, dev_incompatible, major)
+    derived['allows_compatible_only'] = derived['allows_compatible'] & ~derived['allows_incompatible']
+    derived['allows_all_compatible_only'] = derived['allows_all_compatible'] & ~derived['allows_incompatible']
+
+    result = bits.copy()
+    for label, values in derived.items():
+        result = numpy.where(values, result | BITS[label], result & ~BITS[label])
+    return result.astype(bits.dtype)
+
+
+class Simulation:
+    """
+    Simulation of scenarios for given ecosystem. The dependencies are loaded
+    once (see frames.dependencies), as counts per month and distinct constraint.
+    """
+
+    def __init__(self, ecosystem, data_path=frames.DATA_PATH, cache=True):
+        self.ecosystem = ecosystem
+        df = frames.dependencies(ecosystem, data_path, cache)[['date', 'constraint'] + LABELS].dropna(subset=['date'])
+        codes = pandas.Categorical(df['constraint'].fillna(''))
+        self.constraints = numpy.asarray(codes.categories, dtype=object)
+
+        # Labels of each distinct constraint, as in the dataset
+        labels = df[LABELS].fillna(False).astype(bool).values
+        first = numpy.unique(codes.codes, return_index=True)[1]
+        self.bits = (labels[first] * numpy.array(list(BITS.values()))).sum(axis=1).astype(numpy.int32)
+
+        counts = (
+            pandas.DataFrame({'date': cube.month(df['date']), 'code': codes.codes})
+            .groupby(['date', 'code'])
+            .size()
+        )
+        self.months = counts.index.levels[0]
+        self._month = counts.index.codes[0]
+        self._code = counts.index.get_level_values('code').values
+        self._n = counts.values
+        self._parser = None
+        self._rewritten = {}
+
+    def _labels(self, text):
+        if text not in self._rewritten:
+            if self._parser is None:
+                self._parser = fastpath.FastParser(self.ecosystem)
+            self._rewritten[text] = bitset(constraints.labels(_parser.parse_or_empty(self._parser, text)))
+        return self._rewritten[text]
+
+    def labels(self, scenario):
+        """
+        Return the bitsets of the distinct constraints under given scenario.
+        """
+        bits = self.bits.copy()
+        if scenario.rewrite is not None:
+            for i, text in enumerate(self.constraints):
+                rewritten = scenario.rewrite(text)
+                if rewritten != text:
+                    bits[i] = self._labels(rewritten)
+        return derive(bits, scenario.semver)
+
+    def count(self, bits):
+        """
+        Return the number of dependencies per month for each of MEASURES (the
+        total, the labels and the constraint types), given the bitsets of the
+        distinct constraints.
+        """
+        bits = bits[self._code]
+        masks = OrderedDict((label, (bits & bit) != 0) for label, bit in BITS.items())
+        masks.update((name, func(masks)) for name, func in frames.COMPLIANCE.items())
+
+        counts = OrderedDict([('n', numpy.bincount(self._month, weights=self._n, minlength=len(self.months)))])
+        for name, mask in masks.items():
+            counts[name] = numpy.bincount(self._month[mask], weights=self._n[mask], minlength=len(self.months))
+        return pandas.DataFrame(counts, index=pandas.Index(self.months, name='date')).astype(numpy.int64)
+
+    def run(self, scenario):
+        """
+        Return, for each month and each of MEASURES, the number of dependencies
+        in the baseline and under given scenario, and their difference.
+        """
+        baseline = self.count(self.labels(SCENARIOS['baseline']))
+        simulated = self.count(self.labels(scenario))
+        return pandas.concat(
+            [baseline, simulated, simulated - baseline],
+            axis=1,
+            keys=['baseline', 'scenario', 'delta'],
+        )
+
+
+def simulate(scenario, ecosystems=cube.ECOSYSTEMS, data_path=frames.DATA_PATH):
+    """
+    Return the result of Simulation.run for given ecosystems, concatenated
+    with an "ecosystem" index level.
+    """
+    return pandas.concat(
+        [Simulation(ecosystem, data_path).run(scenario) for ecosystem in ecosystems],
+        keys=ecosystems,
+        names=['ecosystem'],
+    )
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description='What-if simulation of constraint interpretations')
+    argparser.add_argument('scenario', choices=list(SCENARIOS), help='scenario to simulate')
+    argparser.add_argument('--ecosystem', type=str, nargs='+', default=cube.ECOSYSTEMS, help='ecosystems to consider')
+    argparser.add_argument('--data', type=str, default=frames.DATA_PATH, help='folder containing the datasets')
+    argparser.add_argument('--output', type=str, help='file to store the monthly counts and deltas (CSV)')
+    args = argparser.parse_args()
+
+    scenario = SCENARIOS[args.scenario]
+    result = simulate(scenario, args.ecosystem, args.data)
+
+    print('Scenario {}: {}'.format(scenario.name, scenario.description))
+    totals = result.groupby(level='ecosystem', sort=False).sum()
+    for ecosystem, row in totals.iterrows():
+        print('{} ({} dependencies)'.format(ecosystem, row[('baseline', 'n')]))
+        for measure in MEASURES[1:]:
+            before, delta = row[('baseline', measure)], row[('delta', measure)]
+            if delta != 0:
+                print('  {:<28} {:>10} -> {:>10} ({:+})'.format(measure, before, before + delta, delta))
+
+    if args.output:
+        result.to_csv(args.output)
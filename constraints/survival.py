@@ -0,0 +1,147 @@
+"""
+Survival analysis of constraints, as in the "Semver compliance" notebook.
+
+The duration and observation arrays are computed once per ecosystem, and split
+into (ecosystem, dev, type) partitions using group indexes. Kaplan-Meier fits
+and pairwise log-rank tests are then computed in a pool of processes, and
+returned as tidy frames.
+"""
+
+import itertools
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+import pandas
+import lifelines
+
+from lifelines.statistics import logrank_test
+
+
+TYPES = ['compliant', 'permissive', 'restrictive']
+UNIT = pandas.to_timedelta(30, 'days')
+
+
+def partition(df_constraints, censor_date, types=TYPES, unit=UNIT):
+    """
+    Return an ordered dict mapping (dev, type) pairs to (durations, observed)
+    arrays for given constraints (see frames.constraints). Durations are
+    expressed in given unit (default to months of 30 days), and constraints
+    that were not replaced before censor_date are not observed.
+    """
+    next_date = df_constraints['constraint_next_date']
+    observed = next_date.notnull().values
+    durations = ((next_date.fillna(censor_date) - df_constraints['date']) / unit).values
+
+    partitions = OrderedDict()
+    groups = df_constraints.groupby('dev').indices
+    for dev in (False, True):
+        indices = groups.get(dev, numpy.array([], dtype=int))
+        for constraint_type in types:
+            selected = indices[df_constraints[constraint_type].values[indices]]
+            partitions[(dev, constraint_type)] = (durations[selected], observed[selected])
+    return partitions
+
+
+def partition_all(df_constraints, censor_date, types=TYPES, unit=UNIT):
+    """
+    Same as partition, for a dict mapping ecosystems to their constraints.
+    Keys of the returned dict are (ecosystem, dev, type) triples.
+    """
+    return OrderedDict(
+        ((ecosystem, ) + key, value)
+        for ecosystem, df in df_constraints.items()
+        for key, value in partition(df, censor_date, types, unit).items()
+    )
+
+
+def _map(func, items, processes):
+    if processes == 1:
+        return list(map(func, items))
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(func, items, chunksize=max(1, len(items) // (4 * (processes or 4)))))
+
+
+def _kaplan_meier(item):
+    key, (durations, observed) = item
+    if len(durations) == 0:
+        return key, None, None
+
+    kmf = lifelines.KaplanMeierFitter()
+    kmf.fit(durations, observed)
+    return key, kmf.survival_function_.iloc[:, 0], kmf.median_survival_time_
+
+
+def kaplan_meier(partitions, processes=None):
+    """
+    Fit a Kaplan-Meier estimator for each of given partitions (see partition and
+    partition_all). Return a pair of frames: the first one contains the survival
+    functions (one row per partition and time), the second one contains the
+    number of constraints, observations and median survival time per partition.
+    Empty partitions are not reported.
+    """
+    results = _map(_kaplan_meier, list(partitions.items()), processes)
+    names = _names(next(iter(partitions))) if partitions else []
+
+    curves = []
+    summary = []
+    for key, survival, median in results:
+        if survival is None:
+            continue
+        durations, observed = partitions[key]
+        curves.append(pandas.DataFrame(dict(zip(names, key)), index=survival.index).assign(
+            timeline=survival.index.values,
+            survival=survival.values,
+        ))
+        summary.append(key + (len(durations), int(observed.sum()), median))
+
+    curves = pandas.concat(curves, ignore_index=True) if curves else pandas.DataFrame(columns=names + ['timeline', 'survival'])
+    summary = pandas.DataFrame(summary, columns=names + ['n', 'observed', 'median'])
+    return curves, summary
+
+
+def _names(key):
+    return ['ecosystem', 'dev', 'type'] if len(key) == 3 else ['dev', 'type']
+
+
+def default_pairs(partitions):
+    """
+    Return the pairs of partitions that are compared in the notebook: constraint
+    types with each other (for each ecosystem and dev), and dev vs. non-dev for
+    compliant and permissive constraints.
+    """
+    pairs = []
+    prefixes = OrderedDict((key[:-2], None) for key in partitions)
+    for prefix in prefixes:
+        for dev in (False, True):
+            types = [t for t in TYPES if not (dev and t == 'restrictive')]
+            for a, b in itertools.combinations(types, 2):
+                pairs.append((prefix + (dev, a), prefix + (dev, b)))
+        for constraint_type in ['compliant', 'permissive']:
+            pairs.append((prefix + (False, constraint_type), prefix + (True, constraint_type)))
+    return [(a, b) for a, b in pairs if a in partitions and b in partitions]
+
+
+def _logrank(item):
+    a, b, (durations_a, observed_a), (durations_b, observed_b) = item
+    try:
+        test = logrank_test(durations_a, durations_b, observed_a, observed_b)
+        return a, b, test.test_statistic, test.p_value
+    except (AssertionError, ValueError, ZeroDivisionError):
+        return a, b, numpy.nan, numpy.nan
+
+
+def logrank_tests(partitions, pairs=None, processes=None):
+    """
+    Run a log-rank test for each pair of partitions (default to default_pairs).
+    Return a frame with one row per pair. Tests that cannot be computed have a
+    missing p-value.
+    """
+    pairs = default_pairs(partitions) if pairs is None else pairs
+    items = [(a, b, partitions[a], partitions[b]) for a, b in pairs]
+    results = _map(_logrank, items, processes)
+
+    names = _names(pairs[0][0]) if pairs else ['dev', 'type']
+    columns = [n + '_a' for n in names] + [n + '_b' for n in names] + ['statistic', 'p_value']
+    return pandas.DataFrame([a + b + (stat, p) for a, b, stat, p in results], columns=columns)
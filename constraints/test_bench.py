@@ -0,0 +1,15 @@
+from .bench import BENCHMARKS, run, compare
+
+
+def test_run():
+    results = run(['versions.parse', 'predicates.dev', 'scripts.versions.extract_components'], repeat=1, packages=20, out=None)
+    assert list(results) == ['versions.parse', 'predicates.dev', 'scripts.versions.extract_components']
+    for result in results.values():
+        assert result['time'] > 0 and result['n'] > 0 and result['peak'] > 0
+    assert all(name.startswith(('versions.', 'parser.', 'predicates.', 'scripts.')) for name in BENCHMARKS)
+
+
+def test_compare():
+    baseline = {'a': {'time': 1.0, 'peak': 100}, 'b': {'time': 1.0, 'peak': 100}}
+    results = {'a': {'time': 1.2, 'peak': 200}, 'b': {'time': 2.0, 'peak': 100}, 'c': {'time': 5.0, 'peak': 1}}
+    assert compare(results, baseline, tolerance=0.25) == [('a', 'peak', 100, 200), ('b', 'time', 1.0, 2.0)]
@@ -0,0 +1,44 @@
+import io
+import csv
+import json
+
+from .classify import classify, classify_stream, classify_lines, classify_csv
+
+
+def test_classify():
+    result = classify('NPM', '^1.2.3')
+    assert result['interval'] == '[1.2.3,2.0.0)'
+    assert result['allows_minor'] and not result['allows_major']
+    assert classify('NPM', 'not a constraint!')['empty']
+    assert classify('NPM', None)['empty'] and classify('NPM', None)['interval'] == '()'
+
+
+def test_classify_stream():
+    texts = ['^1.{}.0'.format(i % 7) for i in range(100)]
+    expected = [classify('Cargo', text) for text in texts]
+
+    for processes in (1, 2):
+        results = list(classify_stream(iter(texts), 'Cargo', processes=processes, chunk_size=8, cache_size=3))
+        assert [text for text, _ in results] == texts
+        assert [result for _, result in results] == expected
+
+
+def test_classify_lines():
+    output = io.StringIO()
+    classify_lines([io.StringIO('~> 1.2\n>= 2\n')], 'Rubygems', output, processes=1)
+    rows = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [(r['constraint'], r['interval']) for r in rows] == [('~> 1.2', '[1.2.0,2.0.0)'), ('>= 2', '[2.0.0,+inf)')]
+
+    # Blank lines are missing constraints
+    output = io.StringIO()
+    classify_lines([io.StringIO('^1.0\n\n')], 'Cargo', output, processes=1)
+    rows = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [(r['constraint'], r['interval'], r['empty']) for r in rows] == [('^1.0', '[1.0.0,2.0.0)', False), (None, '()', True)]
+
+
+def test_classify_csv():
+    output = io.StringIO()
+    source = io.StringIO('package,version,constraint\na,1.0.0,^1.0\nb,0.1.0,\n')
+    classify_csv([source], 'Cargo', output, 'csv', processes=1)
+    rows = list(csv.DictReader(io.StringIO(output.getvalue())))
+    assert [(r['package'], r['interval'], r['empty']) for r in rows] == [('a', '[1.0.0,2.0.0)', 'False'), ('b', '()', 'True')]
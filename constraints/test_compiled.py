@@ -0,0 +1,41 @@
+import intervals as I
+
+from .compiled import compile, matrix, pack, pack_many
+from .parser import CargoParser, NPMParser
+from .versions import Version
+
+
+VERSIONS = [
+    Version(v) for v in [
+        '0.0.0', '0.0.1', '0.1.0', '0.1.9', '0.2.0', '1.0.0-alpha', '1.0.0-beta', '1.0.0',
+        '1.2.2', '1.2.3-rc.1', '1.2.3', '1.2.4', '1.9.0', '2.0.0-alpha', '2.0.0', '3.0.0', '20180101.0.0',
+    ]
+]
+
+
+def test_pack():
+    keys = [pack(v) for v in VERSIONS[:-1]]
+    assert keys == sorted(keys)
+    assert pack(Version('20180101.0.0')) is None
+    assert pack(Version('1.0.0-alpha')) == pack(Version('1.0.0-beta'))
+    keys, valid = pack_many(VERSIONS)
+    assert valid.tolist() == [True] * (len(VERSIONS) - 1) + [False]
+
+
+def test_compiled():
+    intervals = [I.empty(), I.closed(-I.inf, I.inf)]
+    for parser, texts in [
+        (CargoParser(), ['^1.2.3', '~1.2', '0.1', '=1.0.0', '*', '>=0.1, <2', '>1.0.0-alpha, <2.0.0-alpha']),
+        (NPMParser(), ['^1.2.3 || ~0.1.0', '>=1.0.0-beta <1.2.3-rc.1', '>1.2.3', '<1.0.0', '0.x || >=3.0.0']),
+    ]:
+        intervals.extend(parser.parse(text) for text in texts)
+    intervals.append(I.closed(Version('1.0.0'), Version('30000000.0.0')))
+
+    keys, valid = pack_many(VERSIONS)
+    for interval in intervals:
+        expected = [v in interval for v in VERSIONS]
+        c = compile(interval)
+        assert [v in c for v in VERSIONS] == expected
+        assert c.contains(keys, valid, VERSIONS).tolist() == expected
+
+    assert matrix(intervals, VERSIONS).tolist() == [[v in i for v in VERSIONS] for i in intervals]
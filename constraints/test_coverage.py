@@ -0,0 +1,46 @@
+import pandas
+import intervals as I
+
+from .coverage import Coverage, months
+from .history import History
+from .parser import CargoParser
+from .versions import Version
+
+
+def test_coverage(tmpdir):
+    pandas.DataFrame([
+        ('a', '1.0.0', '2017-01-15 00:00:00 UTC', 1),
+        ('a', '1.1.0', '2017-02-15 00:00:00 UTC', 2),
+        ('b', '1.0.0', '2017-01-15 00:00:00 UTC', 1),
+        ('c', '1.0.0', '2017-02-15 00:00:00 UTC', 1),
+        ('t', '0.9.0', '2017-01-01 00:00:00 UTC', 1),
+        ('t', '1.0.0', '2017-01-10 00:00:00 UTC', 2),
+        ('t', '2.0.0', '2017-02-10 00:00:00 UTC', 3),
+    ], columns=['package', 'version', 'date', 'rank']).to_csv(str(tmpdir.join('Cargo-versions.csv.gz')), index=False)
+
+    pandas.DataFrame([
+        ('a', '1.0.0', 't', '^1.0'),
+        ('a', '1.1.0', 't', '>=1.2, <3'),
+        ('b', '1.0.0', 't', '>1.0.0, <=1.5.0'),
+        ('c', '1.0.0', 't', 'invalid'),
+    ], columns=['package', 'version', 'target', 'constraint']).to_csv(str(tmpdir.join('Cargo-dependencies.csv.gz')), index=False)
+
+    history = History('Cargo', str(tmpdir), cache=False)
+    assert months(history) == [pandas.Timestamp('2017-01-01'), pandas.Timestamp('2017-02-01')]
+
+    coverage = Coverage(history, CargoParser())
+    df_targets, df_majors = coverage.aggregate(['2017-02-01', '2017-03-01'])
+    p = CargoParser()
+
+    january, february = df_targets.to_dict('records')
+    assert (january['target'], january['dependents'], january['empty']) == ('t', 2, 0)
+    assert january['intersection'] == I.openclosed(Version(1, 0, 0), Version(1, 5, 0))
+    assert january['union'] == p.parse('^1.0')
+    assert (february['dependents'], february['empty']) == (2, 1)
+    assert february['intersection'] == I.closed(Version(1, 2, 0), Version(1, 5, 0))
+    assert february['union'] == I.open(Version(1, 0, 0), Version(3, 0, 0))
+
+    assert df_majors[['date', 'major', 'dependents']].values.tolist() == [
+        ['2017-02-01', 0, 0], ['2017-02-01', 1, 2],
+        ['2017-03-01', 0, 0], ['2017-03-01', 1, 2], ['2017-03-01', 2, 1],
+    ]
@@ -0,0 +1,53 @@
+import pandas
+
+from .constraints import LABELS
+from .cube import build, build_required, counts, ratios, ratio, required_ratio
+
+
+def dependencies():
+    rows = [
+        ('2018-01-03', 'a', {'dev': True, 'allows_patch': True}),
+        ('2018-01-20', 'a', {'allows_minor': True, 'allows_patch': True}),
+        ('2018-01-31 23:00', 'b', {'allows_major': True, 'allows_minor': True, 'allows_patch': True}),
+        ('2018-03-01', 'a', {'empty': True}),
+    ]
+    return pandas.DataFrame([
+        dict({label: labels.get(label, False) for label in LABELS}, date=pandas.to_datetime(date), target=target)
+        for date, target, labels in rows
+    ])
+
+
+def test_build():
+    cube = build(pandas.concat([dependencies()] * 2))
+    assert list(cube['date'].dt.strftime('%Y-%m-%d')) == ['2018-01-31'] * 3 + ['2018-03-31']
+    assert list(cube['n']) == [2, 2, 2, 2]
+
+
+def test_ratios():
+    cube = build(dependencies()).assign(ecosystem='Cargo')
+
+    df = ratios(cube, ['dev', 'compliant', lambda d: ~d['empty']])
+    assert list(df.columns) == ['dev', 'compliant', 2]
+    assert df.loc[('Cargo', pandas.to_datetime('2018-01-31'))].tolist() == [1 / 3, 1 / 3, 1]
+    assert df.loc[('Cargo', pandas.to_datetime('2018-03-31'))].tolist() == [0, 0, 0]
+    # Months without dependencies are NaN, as with pandas.Grouper
+    assert df.loc[('Cargo', pandas.to_datetime('2018-02-28'))].isnull().all()
+
+    df = ratio(cube, 'permissive', where=lambda d: ~d['dev'])
+    assert list(df.columns) == ['Cargo']
+    assert df['Cargo'].fillna(-1).tolist() == [0.5, -1, 0]
+
+    df = counts(cube)
+    assert list(df.index.strftime('%Y-%m-%d')) == ['2018-01-31', '2018-02-28', '2018-03-31']
+    assert df['Cargo'].tolist() == [3, 0, 1]
+
+
+def test_required():
+    required = build_required(pandas.concat([dependencies()] * 2))
+    assert required[['required', 'new', 'dev', 'allows_major', 'compliant', 'empty']].values.tolist() == [
+        [2, 2, 1, 1, 1, 0],
+        [1, 0, 0, 0, 0, 1],
+    ]
+
+    df = required_ratio(required.assign(ecosystem='Cargo'), 'dev')
+    assert df['Cargo'].fillna(-1).tolist() == [0.5, -1, 0]
@@ -0,0 +1,36 @@
+from collections import OrderedDict
+
+from .fastpath import FastParser
+from .differential import run, shrink, compare
+
+
+class CaretAsTilde(FastParser):
+    """
+    Wrong candidate, for which ^ is ~.
+    """
+
+    def parse(self, text):
+        return FastParser.parse(self, text.replace('^', '~'))
+
+
+def test_run():
+    texts = OrderedDict([('Cargo', ['^1.2.3', '~1.2.3', '^0.2.3', '>=1.0.0, ^2.0', '=1.0.0'])])
+
+    report = run('fastpath', texts, processes=1)
+    assert report['Cargo']['constraints'] == 5 and report['Cargo']['mismatches'] == 0
+
+    report = run('constraints.test_differential:CaretAsTilde', texts, processes=2, chunk_size=2)
+    assert report['Cargo']['mismatches'] == 2
+    kind, = report['Cargo']['kinds'].values()
+    assert [e['constraint'] for e in kind['examples']] == ['^1.2.3', '>=1.0.0, ^2.0']
+    assert kind['examples'][0]['expected']['interval'] == '[1.2.3,2.0.0)'
+    assert kind['examples'][0]['actual']['interval'] == '[1.2.3,1.3.0)'
+    assert len(kind['minimal']) < len('^1.2.3')
+
+
+def test_shrink():
+    spec = 'constraints.test_differential:CaretAsTilde'
+    fields = compare(spec, 'Cargo', '^1.2.3')[0]
+    assert 'interval' in fields
+    minimal = shrink(spec, 'Cargo', '^1.2.3', fields)
+    assert minimal == '^2.3' and compare(spec, 'Cargo', minimal)[0] == fields
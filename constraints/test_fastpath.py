@@ -0,0 +1,29 @@
+import pytest
+
+from .parser import PARSERS
+from .fastpath import FastParser
+from .metrics import ParserMetrics
+
+
+examples = [
+    '1.2.3', '1', '1.2', '01.2.3', '^1.2.3', '^0.2', '^0.0.3', '^0', '~1.2.3', '~1', '~>1.2', '~>1',
+    '=0.1.0', '!=1.0.0', '>=2', '>2.1', '<1.0.0', '<=1.2', '', '*', '1.x', '>= 1.0.0', '1.0.0-beta',
+    '>=1.0.0, <2.0.0', '>=1.0.0 <2.0.0', '1.0.0 - 2.0.0', '^1.0 || ^2.0',
+]
+
+
+def _result(parser, text):
+    try:
+        return str(parser.parse(text))
+    except Exception:
+        return None
+
+
+@pytest.mark.parametrize('ecosystem', sorted(PARSERS))
+def test_fastparser(ecosystem):
+    reference = PARSERS[ecosystem]()
+    metrics = ParserMetrics(ecosystem)
+    parser = FastParser(ecosystem, metrics=metrics)
+    for text in examples:
+        assert _result(parser, text) == _result(reference, text), text
+    assert metrics.paths['fast'] > 0 and metrics.paths['grammar'] > 0
@@ -0,0 +1,154 @@
+import json
+import time
+import threading
+
+import pytest
+
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+
+from .fetch import Fetcher, FetchError, TokenBucket, ResponseCache
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, code, document=None, headers=None):
+        body = json.dumps(document).encode()
+        self.send_response(code)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        state = self.server.state
+        with state['lock']:
+            state['requests'].append(self.path)
+            state['active'] += 1
+            state['max_active'] = max(state['max_active'], state['active'])
+
+        try:
+            if self.path.startswith('/slow'):
+                time.sleep(0.05)
+                self._send(200, {'path': self.path}, {'x-ratelimit-remaining': '50'})
+            elif self.path.startswith('/limited'):
+                with state['lock']:
+                    state['limited'] += 1
+                    limited = state['limited'] <= 2
+                if limited:
+                    self._send(429, {}, {'x-ratelimit-remaining': '0', 'retry-after': '0.05'})
+                else:
+                    self._send(200, {'ok': True})
+            elif self.path.startswith('/missing'):
+                self._send(404)
+            elif self.path.startswith('/unavailable'):
+                self._send(503)
+            else:
+                self._send(400)
+        finally:
+            with state['lock']:
+                state['active'] -= 1
+
+
+@pytest.fixture
+def server():
+    server = Server(('127.0.0.1', 0), Handler)
+    server.state = {'lock': threading.Lock(), 'requests': [], 'active': 0, 'max_active': 0, 'limited': 0}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, 'http://127.0.0.1:{}'.format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetcher(server):
+    server, url = server
+
+    with Fetcher({'key': 'secret'}, concurrency=4, rate=1000, burst=1000, backoff=0.01) as fetcher:
+        results = list(fetcher.map((url + '/slow/{}'.format(i), {'page': i}) for i in range(12)))
+        assert [r['path'] for r in results] == ['/slow/{}?key=secret&page={}'.format(i, i) for i in range(12)]
+        assert 1 < server.state['max_active'] <= 4
+
+        items = iter([(url + '/slow/{}'.format(i), None) for i in range(6)])
+        results = fetcher.map(items, window=2)
+        assert next(results)['path'] == '/slow/0?key=secret'
+        assert len(list(items)) == 4
+
+        assert fetcher.get(url + '/missing') is None
+        assert fetcher.get(url + '/limited') == {'ok': True}
+        assert server.state['limited'] == 3
+        assert fetcher.bucket.rate < 1000
+
+        with pytest.raises(FetchError):
+            fetcher.get(url + '/invalid')
+
+    with Fetcher(max_retries=2, backoff=0.01) as fetcher:
+        with pytest.raises(FetchError):
+            fetcher.get(url + '/unavailable')
+        assert len([p for p in server.state['requests'] if p.startswith('/unavailable')]) == 3
+
+    # Closing waits for the scheduled retrievals before closing the session
+    with Fetcher(concurrency=2, rate=1000, burst=1000) as fetcher:
+        futures = [fetcher.submit(url + '/slow/{}'.format(i)) for i in range(4)]
+    assert [f.result()['path'] for f in futures] == ['/slow/{}'.format(i) for i in range(4)]
+
+
+def test_cache(server, tmpdir):
+    server, url = server
+    cache = ResponseCache(str(tmpdir), negative_ttl=3600)
+    requests = server.state['requests']
+
+    with Fetcher({'key': 'secret'}, cache=cache, rate=1000) as fetcher:
+        assert fetcher.get(url + '/slow', {'page': 1})['path'] == '/slow?key=secret&page=1'
+        assert fetcher.get(url + '/slow', {'page': 1})['path'] == '/slow?key=secret&page=1'
+        assert fetcher.get(url + '/missing') is None
+        assert fetcher.get(url + '/missing') is None
+        assert len(requests) == 2
+
+        fetcher.get(url + '/slow', {'page': 1}, ttl=0)
+        assert len(requests) == 3
+
+    for path in tmpdir.visit('*.json'):
+        entry = json.loads(path.read())
+        assert 'key' not in dict(entry['params'])
+
+    with Fetcher(cache=cache, offline=True) as fetcher:
+        assert fetcher.get(url + '/slow', {'page': 1, 'key': 'other'}, ttl=0)['path'] == '/slow?key=secret&page=1'
+        assert fetcher.get(url + '/missing') is None
+        with pytest.raises(FetchError):
+            fetcher.get(url + '/slow', {'page': 2})
+        assert len(requests) == 3
+
+
+def test_token_bucket():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(delay):
+        sleeps.append(delay)
+        now[0] += delay
+
+    bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0], sleep=sleep)
+    bucket.acquire()
+    bucket.acquire()
+    assert sleeps == []
+    bucket.acquire()
+    assert sleeps == [0.5]
+
+    bucket.pause(10)
+    bucket.acquire()
+    assert now[0] == pytest.approx(10.5 + 0.5)
+
+    bucket.update(remaining=0, limit=60)
+    assert bucket.capacity == 60 and bucket.rate == 1
+    bucket.throttle()
+    assert bucket.rate == 0.5
+    bucket.recover()
+    assert bucket.rate == 0.5 + 1 / 16
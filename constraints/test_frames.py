@@ -0,0 +1,57 @@
+import pandas
+
+from .frames import with_next_date, with_compliance, constraint_changes
+
+
+def test_next_date():
+    df = pandas.DataFrame([
+        ('a', 2, '2018-02-01'),
+        ('b', 1, '2018-01-15'),
+        ('a', 1, '2018-01-01'),
+        ('a', 3, '2018-03-01'),
+    ], columns=['package', 'rank', 'date']).assign(date=lambda d: pandas.to_datetime(d['date']))
+
+    df = with_next_date(df)
+    assert list(df['next_date'].dt.strftime('%m-%d').fillna('-')) == ['03-01', '-', '02-01', '-']
+
+
+def test_constraint_changes():
+    dates = pandas.to_datetime(['2018-01-01', '2018-02-01', '2018-03-01', '2018-04-01'])
+    df = pandas.DataFrame([
+        ('a', 1, 'x', '^1'),
+        ('a', 2, 'x', '^1'),
+        ('a', 2, 'y', '^2'),
+        ('a', 3, 'x', '^2'),
+        ('a', 4, 'x', '^2'),
+        ('a', 4, 'y', '^2'),
+    ], columns=['package', 'rank', 'target', 'constraint']).assign(
+        date=lambda d: dates[d['rank'] - 1],
+        next_date=lambda d: [dates[r] if r < 4 else None for r in d['rank']],
+    )
+
+    df = constraint_changes(df).set_index(['target', 'constraint'])
+
+    assert len(df) == 3
+    assert df.loc[('x', '^1'), 'rank'] == 1
+    assert df.loc[('x', '^1'), 'constraint_next_rank'] == 3
+    assert df.loc[('x', '^1'), 'constraint_next_date'] == dates[2]
+    assert df.loc[('x', '^1'), 'constraint_is_new']
+    assert df.loc[('x', '^2'), 'rank'] == 3
+    assert pandas.isnull(df.loc[('x', '^2'), 'constraint_next_rank'])
+    assert not df.loc[('x', '^2'), 'constraint_is_new']
+    assert df.loc[('y', '^2'), 'constraint_is_new']
+
+
+def test_compliance():
+    df = pandas.DataFrame([
+        (False, True, True, False),
+        (True, True, True, False),
+        (False, False, True, False),
+        (False, False, True, True),
+        (False, False, False, True),
+    ], columns=['allows_major', 'allows_minor', 'allows_patch', 'dev'])
+
+    df = with_compliance(df)
+    assert list(df['compliant']) == [True, False, False, False, True]
+    assert list(df['permissive']) == [False, True, False, True, False]
+    assert list(df['restrictive']) == [False, False, True, False, False]
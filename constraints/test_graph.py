@@ -0,0 +1,55 @@
+import numpy
+import pandas
+
+from .graph import Graph, build
+
+
+def test_build(tmpdir):
+    pandas.DataFrame([
+        ('a', '1.0.0', '2018-01-02 00:00:00 UTC', 1),
+        ('a', '1.1.0', '2018-03-01 00:00:00 UTC', 2),
+        ('b', '0.1.0', '2017-12-01 00:00:00 UTC', 1),
+        ('t', '1.0.0', '2017-01-01 00:00:00 UTC', 1),
+    ], columns=['package', 'version', 'date', 'rank']).to_csv(str(tmpdir.join('Cargo-versions.csv.gz')), index=False)
+
+    pandas.DataFrame([
+        ('a', '1.0.0', 't', '^1.0.0'),
+        ('a', '1.0.0', 'b', '^0.1'),
+        ('a', '1.1.0', 't', '*'),
+        ('b', '0.1.0', 't', '~1.0.0'),
+        ('b', '0.1.0', 'u', '^0.1.0'),
+    ], columns=['package', 'version', 'target', 'constraint']).to_csv(str(tmpdir.join('Cargo-dependencies.csv.gz')), index=False)
+
+    graph = build('Cargo', '2018-02-01', str(tmpdir))
+    a, b, t, u = graph.ids(['a', 'b', 't', 'u'])
+    assert list(graph.packages) == ['a', 'b', 't', 'u']
+    assert list(graph.versions) == ['1.0.0', '0.1.0', '1.0.0', '']
+    assert graph.ids(['unknown', 'zzz']).tolist() == [-1, -1]
+    assert graph.edges == 4
+    assert graph.out_degree().tolist() == [2, 2, 0, 0]
+    assert graph.in_degree([t, u]).tolist() == [2, 1]
+    assert sorted(graph.successors([a, b])) == [b, t, t, u]
+    assert sorted(graph.predecessors([t])) == [a, b]
+    edge, = graph.in_edges([u])
+    assert graph.constraint_names[graph.constraints[edge]] == '^0.1.0'
+
+    path = str(tmpdir.join('graph.npz'))
+    graph.save(path)
+    loaded = Graph.load(path)
+    assert list(loaded.packages) == list(graph.packages) and list(loaded.versions) == list(graph.versions)
+    assert loaded.indptr.tolist() == graph.indptr.tolist() and loaded.redges.tolist() == graph.redges.tolist()
+
+    latest = build('Cargo', data_path=str(tmpdir))
+    assert latest.successors(latest.ids(['a'])).tolist() == latest.ids(['t']).tolist()
+
+
+def test_save_empty_strings(tmpdir):
+    empty = numpy.array([], dtype=numpy.int64)
+    graph = Graph.from_edges(
+        'Cargo', None, numpy.array(['a'], dtype=object), numpy.array([''], dtype=object),
+        empty, empty, empty, numpy.array([], dtype=object),
+    )
+    path = str(tmpdir.join('graph.npz'))
+    graph.save(path)
+    loaded = Graph.load(path)
+    assert list(loaded.versions) == [''] and list(loaded.constraint_names) == []
@@ -0,0 +1,40 @@
+import pandas
+
+from .history import History
+
+
+def test_history(tmpdir):
+    pandas.DataFrame([
+        ('a', '1.0.0', '2018-01-02 00:00:00 UTC', 1),
+        ('a', '1.1.0', '2018-03-01 00:00:00 UTC', 2),
+        ('a', '1.0.1', '2018-03-01 00:00:00 UTC', 3),
+        ('b', '0.1.0', '2017-12-01 00:00:00 UTC', 1),
+        ('t', '1.0.0', '2017-01-01 00:00:00 UTC', 1),
+    ], columns=['package', 'version', 'date', 'rank']).to_csv(str(tmpdir.join('Cargo-versions.csv.gz')), index=False)
+
+    pandas.DataFrame([
+        ('a', '1.0.0', 't', '^1.0.0'),
+        ('a', '1.1.0', 't', '*'),
+        ('a', '1.1.0', 'b', '^0.1'),
+        ('b', '0.1.0', 'u', '^0.1.0'),
+    ], columns=['package', 'version', 'target', 'constraint']).to_csv(str(tmpdir.join('Cargo-dependencies.csv.gz')), index=False)
+
+    history = History('Cargo', str(tmpdir), cache=False)
+    assert history.latest('a', '2018-02-01') == '1.0.0'
+    assert history.latest('a', '2018-01-01') is None
+    assert history.latest('unknown', '2018-01-01') is None
+    # Simultaneous releases are ordered by rank
+    assert history.latest('a', ['2018-01-01', '2018-02-01', '2018-03-01 00:00:00']).tolist() == [None, '1.0.0', '1.0.1']
+    assert history.latest(['a', 'b', 'u'], '2018-02-01').tolist() == ['1.0.0', '0.1.0', None]
+
+    assert history.constraint('a', 't', '2018-02-01') == '^1.0.0'
+    assert history.constraint('a', 'b', '2018-02-01') is None
+    assert history.constraint('a', ['t', 'b'], '2019-01-01').tolist() == [None, None]
+    assert history.constraint(['a', 'b'], ['t', 'u'], '2018-02-01').tolist() == ['^1.0.0', '^0.1.0']
+
+    assert history.snapshot('2018-02-01')[['package', 'version']].values.tolist() == [['a', '1.0.0'], ['b', '0.1.0'], ['t', '1.0.0']]
+    assert history.dependencies('2018-02-01').values.tolist() == [
+        ['a', '1.0.0', 't', '^1.0.0'],
+        ['b', '0.1.0', 'u', '^0.1.0'],
+    ]
+    assert len(history.dependencies('2016-01-01')) == 0
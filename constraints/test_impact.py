@@ -0,0 +1,48 @@
+import numpy
+import pytest
+
+from .graph import Graph
+from .impact import Impact
+from .versions import Version
+
+
+@pytest.fixture
+def graph():
+    packages = ['a', 'b', 'c', 'd', 'e', 'f', 't']
+    versions = ['1.1.0', '0.1.0', '1.0.0', '1.0.0', '1.0.0', '1.0.0', '1.0.0']
+    edges = [
+        ('a', 't', '^1.0.0'),
+        ('b', 't', '~1.0.0'),
+        ('c', 'a', '^1.0'),
+        ('d', 'a', '=1.0.0'),
+        ('e', 'c', '*'),
+        ('f', 'b', '*'),
+    ]
+    names = sorted(set(c for _, _, c in edges))
+    return Graph.from_edges(
+        'Cargo', None,
+        numpy.array(packages, dtype=object),
+        numpy.array(versions, dtype=object),
+        numpy.array([packages.index(s) for s, _, _ in edges]),
+        numpy.array([packages.index(t) for _, t, _ in edges]),
+        numpy.array([names.index(c) for _, _, c in edges]),
+        numpy.array(names, dtype=object),
+    )
+
+
+def test_propagate(graph):
+    engine = Impact(graph)
+
+    result = engine.propagate('t', '1.2.0')
+    assert (result['dependents'], result['direct'], result['transitive'], result['levels']) == (2, 1, 2, [1, 1, 1])
+    assert list(graph.packages[result['reached']]) == ['a', 'c', 'e']
+
+    result = engine.propagate('t', '1.0.5')
+    assert result['levels'] == [2, 2, 1]
+    assert list(graph.packages[result['reached']]) == ['a', 'b', 'c', 'e', 'f']
+
+    assert engine.propagate('t', '2.0.0')['total'] == 0
+    assert engine.propagate('t', Version('1.0.5'))['levels'] == [2, 2, 1]
+    assert engine.propagate('a', '1.2.0')['levels'] == [1, 1]
+    with pytest.raises(KeyError):
+        engine.propagate('unknown', '1.0.0')
@@ -0,0 +1,23 @@
+import json
+
+import pytest
+
+from .instrument import Run
+
+
+def test_run(tmpdir):
+    with Run('script', 'Cargo', report_dir=str(tmpdir), profile=['cprofile', 'tracemalloc']) as run:
+        with run.stage('build', 3) as stage:
+            data = stage.output([list(range(1000)) for _ in range(10)])
+        with pytest.raises(ValueError):
+            with run.stage('fail', data):
+                raise ValueError('invalid')
+
+    report = json.loads(tmpdir.join('script-Cargo-report.json').read())
+    build, fail = report['stages']
+    assert (build['name'], build['rows_in'], build['rows_out']) == ('build', 3, 10)
+    assert build['wall_time'] >= 0 and build['cpu_time'] >= 0
+    assert build['traced_peak'] > 0 and len(build['top_allocations']) > 0
+    assert tmpdir.join('script-Cargo-build.prof').exists()
+    assert fail['rows_in'] == 10 and fail['error'] == 'ValueError: invalid'
+    assert report['finished'] is not None
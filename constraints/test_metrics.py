@@ -0,0 +1,40 @@
+import pytest
+
+from .metrics import Registry, metered_parser
+
+
+def test_metered_parser():
+    registry = Registry()
+    p = metered_parser('NPM', registry, cache_size=16)
+
+    assert str(p.parse('^1.2.3')) == '[1.2.3,2.0.0)'
+    p.parse('^1.2.3')
+    p.parse('>=1.0.0 <2.0.0 || 3.x')
+    for _ in range(2):
+        with pytest.raises(Exception):
+            p.parse('not a constraint!')
+
+    m = registry.as_dict()['NPM']
+    assert m['calls'] == 5
+    assert sum(m['failures'].values()) == 2
+    assert m['cache'] == {'hit': 2, 'miss': 3}
+    assert m['paths'] == {'fast': 1, 'grammar': 2}
+    assert sum(m['buckets']) == 5
+
+
+def test_merge_and_prometheus():
+    registry = Registry()
+    p = metered_parser('Cargo', registry)
+    p.parse('1.0')
+
+    other = Registry()
+    other.merge(registry.pop())
+    other.merge(registry.pop())  # Nothing more to merge
+    assert registry.as_dict()['Cargo']['calls'] == 0
+    assert other.as_dict()['Cargo']['calls'] == 1
+
+    text = other.prometheus()
+    assert 'constraints_parse_calls_total{ecosystem="Cargo"} 1\n' in text
+    assert 'constraints_parse_path_total{ecosystem="Cargo",path="fast"} 1\n' in text
+    assert 'constraints_parse_duration_seconds_bucket{ecosystem="Cargo",le="+Inf"} 1\n' in text
+    assert '# TYPE constraints_parse_duration_seconds histogram\n' in text
@@ -1,7 +1,7 @@
 import pytest
 import intervals as I
 
-from .parser import CargoParser, RubyGemsParser, PackagistParser, NPMParser
+from .parser import CargoParser, RubyGemsParser, PackagistParser, NPMParser, CachingParser
 from .versions import Version
 
 
@@ -111,3 +111,12 @@ def test_npmparser():
     parser = NPMParser()
     for constraint, result in examples:
         assert repr(parser.parse(constraint)) == result, constraint
+
+
+def test_cachingparser():
+    parser = CachingParser(CargoParser(), maxsize=2)
+    assert parser.parse('^1.2.3') is parser.parse('^1.2.3')
+    for _ in range(2):
+        with pytest.raises(Exception):
+            parser.parse('not a constraint')
+    assert parser.cache_info().hits == 2
@@ -0,0 +1,119 @@
+import io
+import os
+import sys
+import json
+
+from .pipeline import Stage, Pipeline, available_ecosystems, default_stages, imported_modules
+
+
+def copy_stage(name, source, target, code, tmpdir):
+    return Stage(
+        name,
+        [sys.executable, '-c', 'import shutil; shutil.copy({!r}, {!r})'.format(source, target)],
+        cwd=str(tmpdir),
+        inputs=[source],
+        code=[code],
+        outputs=[target],
+    )
+
+
+def test_pipeline_reruns_changed_stages_only(tmpdir):
+    path = lambda name: os.path.join(str(tmpdir), name)
+    for name in ['raw', 'a.py', 'b.py']:
+        with open(path(name), 'w') as f:
+            f.write(name)
+
+    stages = [
+        copy_stage('first', path('raw'), path('first'), path('a.py'), tmpdir),
+        copy_stage('second', path('first'), path('second'), path('b.py'), tmpdir),
+    ]
+
+    def run():
+        pipeline = Pipeline(stages, state_file=path('state.json'), out=io.StringIO())
+        return pipeline.run()
+
+    assert run() == {'first': 'done', 'second': 'done'}
+    assert run() == {'first': 'up-to-date', 'second': 'up-to-date'}
+
+    with open(path('b.py'), 'a') as f:
+        f.write('changed')
+    assert run() == {'first': 'up-to-date', 'second': 'done'}
+
+    os.remove(path('first'))
+    assert run() == {'first': 'done', 'second': 'up-to-date'}
+
+    os.remove(path('raw'))
+    assert run() == {'first': 'frozen', 'second': 'up-to-date'}
+
+
+def test_pipeline_targets_and_failures(tmpdir):
+    path = lambda name: os.path.join(str(tmpdir), name)
+    with open(path('code.py'), 'w') as f:
+        f.write('')
+
+    stages = [
+        copy_stage('missing', path('nothing'), path('first'), path('code.py'), tmpdir),
+        copy_stage('downstream', path('first'), path('second'), path('code.py'), tmpdir),
+        Stage('other', [sys.executable, '-c', 'open("other", "w")'], cwd=str(tmpdir), outputs=[path('other')]),
+    ]
+
+    pipeline = Pipeline(stages, state_file=path('state.json'), out=io.StringIO())
+    assert pipeline.run(['other']) == {'other': 'done'}
+    assert pipeline.run() == {'missing': 'failed', 'downstream': 'skipped', 'other': 'up-to-date'}
+
+    os.remove(path('other'))
+    stages[0] = copy_stage('missing', path('code.py'), path('first'), path('code.py'), tmpdir)
+    pipeline = Pipeline(stages, state_file=path('state.json'), out=io.StringIO())
+    assert pipeline.run(dry_run=True) == {'missing': 'outdated', 'downstream': 'outdated', 'other': 'outdated'}
+
+
+def test_pipeline_restores_outputs(tmpdir):
+    path = lambda name: os.path.join(str(tmpdir), name)
+    with open(path('output'), 'w') as f:
+        f.write('previous')
+
+    # Fails after writing a partial output
+    script = 'import sys; open("output", "w").write("partial"); open("other", "w"); sys.exit(1)'
+    stages = [Stage('failing', [sys.executable, '-c', script], cwd=str(tmpdir), outputs=[path('output'), path('other')])]
+    pipeline = Pipeline(stages, state_file=path('state.json'), out=io.StringIO())
+    assert pipeline.run() == {'failing': 'failed'}
+    with open(path('output')) as f:
+        assert f.read() == 'previous'
+    assert sorted(os.listdir(str(tmpdir))) == ['failing.log', 'output', 'state.json']
+
+    stages = [Stage('working', [sys.executable, '-c', 'open("output", "w").write("new")'], cwd=str(tmpdir), outputs=[path('output')])]
+    pipeline = Pipeline(stages, state_file=path('state.json'), out=io.StringIO())
+    assert pipeline.run() == {'working': 'done'}
+    with open(path('output')) as f:
+        assert f.read() == 'new'
+    assert sorted(os.listdir(str(tmpdir))) == ['failing.log', 'output', 'state.json', 'working.log']
+
+
+def test_available_ecosystems(tmpdir, monkeypatch):
+    monkeypatch.chdir(str(tmpdir))
+    for path in ['data-raw/Cargo-versions.csv.gz', 'data-raw/Cargo-dependencies.csv.gz', 'data/NPM-versions.csv.gz']:
+        tmpdir.join(path).ensure()
+    assert available_ecosystems() == ['Cargo']
+
+    names = [stage.name for stage in default_stages()]
+    assert 'dependencies-Cargo' in names and 'convert-NPM' not in names
+
+    tmpdir.join('data-raw', 'versions.csv').ensure()
+    tmpdir.join('data-raw', 'dependencies.csv').ensure()
+    assert available_ecosystems() == ['Cargo', 'NPM', 'Packagist', 'Rubygems']
+
+
+def test_imported_modules(tmpdir, monkeypatch):
+    monkeypatch.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    notebook = str(tmpdir.join('notebook.ipynb'))
+    with open(notebook, 'w') as f:
+        json.dump({'cells': [
+            {'cell_type': 'markdown', 'source': ['from constraints import tool']},
+            {'cell_type': 'code', 'source': ['import pandas\n', 'from constraints import cube, survival as s\n']},
+        ]}, f)
+
+    modules = imported_modules(notebook)
+    assert 'constraints/survival.py' in modules
+    # Transitive imports of cube.py
+    assert {'constraints/cube.py', 'constraints/frames.py', 'constraints/constraints.py'} <= set(modules)
+    assert 'constraints/tool.py' not in modules
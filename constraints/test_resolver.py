@@ -0,0 +1,97 @@
+import pandas
+import pytest
+
+from .history import History
+from . import resolver as _resolver
+from .resolver import Resolver
+
+
+@pytest.fixture(scope='module')
+def history(tmpdir_factory):
+    tmpdir = tmpdir_factory.mktemp('data')
+    pandas.DataFrame([
+        ('app', '1.0.0', '2017-06-01 00:00:00 UTC', 1),
+        ('app', '2.0.0', '2017-07-01 00:00:00 UTC', 2),
+        ('app', '3.0.0', '2017-08-01 00:00:00 UTC', 3),
+        ('lib', '1.0.0', '2017-01-01 00:00:00 UTC', 1),
+        ('lib', '1.1.0', '2017-02-01 00:00:00 UTC', 2),
+        ('lib', '2.0.0', '2017-03-01 00:00:00 UTC', 3),
+        ('util', '0.2.0', '2017-01-01 00:00:00 UTC', 1),
+        ('util', '0.2.1', '2017-02-01 00:00:00 UTC', 2),
+        ('util', '0.3.0', '2017-03-01 00:00:00 UTC', 3),
+        ('util', '0.2.5', '2018-06-01 00:00:00 UTC', 4),
+    ], columns=['package', 'version', 'date', 'rank']).to_csv(str(tmpdir.join('Cargo-versions.csv.gz')), index=False)
+
+    pandas.DataFrame([
+        ('app', '1.0.0', 'lib', '^1.0'),
+        ('app', '1.0.0', 'util', '^0.2'),
+        ('app', '2.0.0', 'lib', '^1.0'),
+        ('app', '2.0.0', 'util', '=0.2.1'),
+        ('app', '3.0.0', 'util', '^0.3'),
+        ('app', '3.0.0', 'missing', '^5'),
+        ('lib', '1.1.0', 'util', '=0.2.0'),
+    ], columns=['package', 'version', 'target', 'constraint']).to_csv(str(tmpdir.join('Cargo-dependencies.csv.gz')), index=False)
+    return History('Cargo', str(tmpdir), cache=False)
+
+
+def test_nested(history):
+    resolver = Resolver(history, '2018-01-01', 'nested')
+    result = resolver.resolve('app', '1.0.0')
+    assert result['installed'] == [('lib', '1.1.0'), ('util', '0.2.0'), ('util', '0.2.1')]
+    assert result['unresolved'] == [] and result['conflicts'] == 0
+    # Every release reached is memoized, not only the root
+    assert len(resolver._installed) == 4
+
+    result = resolver.resolve('app')
+    assert result['version'] == '3.0.0'
+    assert result['installed'] == [('util', '0.3.0')]
+    assert result['unresolved'] == [('missing', '^5')]
+
+    # Releases after the date are ignored
+    assert Resolver(history, '2018-07-01', 'nested').resolve('app', '1.0.0')['installed'][-1] == ('util', '0.2.5')
+    with pytest.raises(KeyError):
+        resolver.resolve('app', '4.0.0')
+
+
+def test_unified(history):
+    resolver = Resolver(history, '2018-01-01')
+    assert resolver.mode == 'unified'
+    assert resolver.resolve('app', '1.0.0')['installed'] == [('lib', '1.1.0'), ('util', '0.2.0')]
+
+    result = resolver.resolve('app', '2.0.0')
+    assert result['installed'] == [('lib', '1.1.0'), ('util', '0.2.0'), ('util', '0.2.1')]
+    assert result['conflicts'] == 1
+
+    results = list(resolver.resolve_many([('app', '1.0.0'), ('lib', None), ('unknown', None)]))
+    assert results[0]['installed'] == [('lib', '1.1.0'), ('util', '0.2.0')]
+    assert results[1]['version'] == '2.0.0' and results[1]['installed'] == []
+    assert results[2] is None
+
+
+def test_nested_cycle(tmpdir):
+    pandas.DataFrame([
+        ('a', '1.0.0', '2017-01-01 00:00:00 UTC', 1),
+        ('b', '1.0.0', '2017-01-01 00:00:00 UTC', 1),
+        ('c', '1.0.0', '2017-01-01 00:00:00 UTC', 1),
+    ], columns=['package', 'version', 'date', 'rank']).to_csv(str(tmpdir.join('Cargo-versions.csv.gz')), index=False)
+    pandas.DataFrame([
+        ('a', '1.0.0', 'b', '^1'),
+        ('b', '1.0.0', 'a', '^1'),
+        ('b', '1.0.0', 'c', '^1'),
+        ('c', '1.0.0', 'missing', '^1'),
+    ], columns=['package', 'version', 'target', 'constraint']).to_csv(str(tmpdir.join('Cargo-dependencies.csv.gz')), index=False)
+    resolver = Resolver(History('Cargo', str(tmpdir), cache=False), '2018-01-01', 'nested')
+    result = resolver.resolve('a', '1.0.0')
+    assert result['installed'] == [('b', '1.0.0'), ('c', '1.0.0')]
+    assert result['unresolved'] == [('missing', '^1')]
+    # The releases of the cycle share their closure, excluding themselves
+    result = resolver.resolve('b', '1.0.0')
+    assert result['installed'] == [('a', '1.0.0'), ('c', '1.0.0')]
+    assert result['unresolved'] == [('missing', '^1')]
+    assert resolver.resolve('c', '1.0.0')['installed'] == []
+
+
+def test_unified_not_converged(history, monkeypatch):
+    assert Resolver(history, '2018-01-01').resolve('app', '2.0.0')['converged']
+    monkeypatch.setattr(_resolver, 'MAX_ROUNDS', 1)
+    assert not Resolver(history, '2018-01-01').resolve('app', '2.0.0')['converged']
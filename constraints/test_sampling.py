@@ -0,0 +1,51 @@
+import numpy
+import pandas
+
+from . import cube
+from . import frames
+from .constraints import LABELS
+from .sampling import COLUMNS, estimate, prepare, stratify
+
+
+def population():
+    rows = []
+    for i in range(600):
+        package = 'big' if i % 3 == 0 else 'p{}'.format(i)
+        dev, minor = i % 4 == 0, i % 5 != 0
+        labels = dict((label, False) for label in LABELS)
+        labels.update(dev=dev, allows_minor=minor, allows_patch=True)
+        rows.append(dict(labels, package=package, date=pandas.Timestamp('2017-01-15' if i % 2 else '2017-02-15')))
+    df_dependencies = pandas.DataFrame(rows).assign(**frames.COMPLIANCE)
+    df_versions = pandas.DataFrame({'package': ['big'] * 20 + ['p1'], 'version': ['1.0.{}'.format(i) for i in range(21)]})
+    return prepare(df_dependencies, df_versions)
+
+
+def test_stratify():
+    df = population()
+    assert sorted(df.groupby(['date', 'size']).size().tolist()) == [100, 100, 200, 200]
+    assert (df['population'] == df.groupby(['date', 'size'])['size'].transform('size')).all()
+
+    sample = stratify(df, fraction=0.1, minimum=50, seed=1)
+    assert sorted(sample.groupby(['date', 'size']).size().tolist()) == [50, 50, 50, 50]
+    assert stratify(df, fraction=0.1, minimum=50, seed=1).equals(sample)
+    assert len(stratify(df, minimum=1000)) == len(df)
+
+
+def test_estimate():
+    df = population()
+    columns = ['compliant', 'restrictive', lambda d: d['allows_minor']]
+    where = lambda d: ~d['dev']
+
+    exact = estimate(df, columns, where)
+    expected = cube.ratios(
+        df.assign(n=1).groupby(['date'] + COLUMNS).size().rename('n').reset_index(),
+        columns, where,
+    )
+    assert numpy.allclose(exact['ratio'].values, expected.values)
+    assert numpy.allclose(exact['low'].values, exact['high'].values)
+
+    approximate = estimate(stratify(df, fraction=0.1, minimum=50), columns, where)
+    assert list(approximate.columns.get_level_values(0).unique()) == ['ratio', 'low', 'high']
+    assert (approximate['low'] <= approximate['ratio']).all().all()
+    assert (approximate['ratio'] <= approximate['high']).all().all()
+    assert (approximate['low'] < approximate['high']).all().all()
@@ -0,0 +1,89 @@
+import json
+import socket
+import http.client
+import threading
+
+import pytest
+import requests
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .service import Server, Analyzer
+
+
+@pytest.fixture(scope='module')
+def url():
+    server = Server(('127.0.0.1', 0), Analyzer(), workers=4)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{}'.format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+def test_parse(url):
+    r = requests.post(url + '/parse', json={'ecosystem': 'NPM', 'constraints': ['^1.2.3', 'not a constraint!']})
+    assert r.status_code == 200
+    first, second = r.json()['results']
+    assert first == {'constraint': '^1.2.3', 'interval': '[1.2.3,2.0.0)'}
+    assert second['constraint'] == 'not a constraint!' and 'error' in second
+
+
+def test_classify(url):
+    with requests.Session() as session:
+        r = session.post(url + '/classify', json={'ecosystem': 'Cargo', 'constraint': '0.3'})
+        result, = r.json()['results']
+        assert result['interval'] == '[0.3.0,0.4.0)'
+        assert result['labels']['dev'] and result['labels']['allows_patch']
+        assert result['compliance'] == 'permissive'
+
+        r = session.post(url + '/classify', json={'ecosystem': 'Cargo', 'constraint': '=1.0.0'})
+        assert r.json()['results'][0]['compliance'] == 'restrictive'
+
+        status = session.get(url + '/status').json()
+        assert status['cache']['Cargo']['misses'] >= 2
+
+        r = session.get(url + '/metrics')
+        assert r.headers['Content-Type'].startswith('text/plain')
+        assert 'constraints_parse_calls_total{ecosystem="Cargo"}' in r.text
+
+
+def test_errors(url):
+    assert requests.post(url + '/parse', data='{').status_code == 400
+    assert requests.post(url + '/parse', json={'ecosystem': 'PyPI', 'constraints': []}).status_code == 400
+    assert requests.post(url + '/parse', json={'ecosystem': 'NPM', 'constraints': [1]}).status_code == 400
+    assert requests.post(url + '/unknown', json={}).status_code == 404
+
+    for length in ['abc', '-1']:
+        connection = http.client.HTTPConnection(url[len('http://'):])
+        connection.putrequest('POST', '/parse')
+        connection.putheader('Content-Length', length)
+        connection.endheaders(b'{}')
+        response = connection.getresponse()
+        assert response.status == 400 and 'Content-Length' in json.loads(response.read().decode())['error']
+        connection.close()
+
+
+def test_idle_connections():
+    server = Server(('127.0.0.1', 0), Analyzer(), workers=2, idle_timeout=0.5)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        idle = [socket.create_connection(server.server_address) for _ in range(2)]
+        r = requests.get('http://127.0.0.1:{}/status'.format(server.server_address[1]), timeout=5)
+        assert r.status_code == 200
+        for s in idle:
+            s.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_concurrent_clients(url):
+    def classify(i):
+        r = requests.post(url + '/classify', json={'ecosystem': 'NPM', 'constraints': ['~1.{}.0'.format(i % 5)] * 10})
+        return [result['compliance'] for result in r.json()['results']]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(classify, range(40)))
+    assert results == [['restrictive'] * 10] * 40
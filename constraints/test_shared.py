@@ -0,0 +1,41 @@
+import numpy
+import pandas
+
+from . import shared
+
+
+def _count_dev(bounds):
+    return int(shared.current()['dependencies'].column('dev')[bounds[0]:bounds[1]].sum())
+
+
+def test_shared(tmpdir):
+    pandas.DataFrame([
+        ('a', '1.0.0', '2018-01-02 00:00:00 UTC', 1),
+        ('a', '1.1.0', '2018-01-20 00:00:00 UTC', 2),
+        ('b', '0.1.0', '2017-12-01 00:00:00 UTC', 1),
+    ], columns=['package', 'version', 'date', 'rank']).to_csv(str(tmpdir.join('Cargo-versions.csv.gz')), index=False)
+
+    pandas.DataFrame([
+        ('a', '1.0.0', 'b', '^0.1.0', False, True, True, True),
+        ('a', '1.1.0', 'b', '*', True, True, True, False),
+        ('b', '0.1.0', 't', None, False, False, False, False),
+    ], columns=['package', 'version', 'target', 'constraint', 'allows_major', 'allows_minor', 'allows_patch', 'dev']
+    ).to_csv(str(tmpdir.join('Cargo-dependencies.csv.gz')), index=False)
+
+    path = shared.materialize('Cargo', str(tmpdir), str(tmpdir.join('shared')), cache=False)
+    assert shared.materialize('Cargo', str(tmpdir), str(tmpdir.join('shared')), cache=False) == path
+
+    data = shared.load(path)
+    assert shared.load(path) is data
+    versions, dependencies = data['versions'], data['dependencies']
+    assert len(versions) == 3 and len(dependencies) == 3
+
+    rank = versions.column('rank')
+    assert isinstance(rank, numpy.memmap) and not rank.flags.writeable
+    assert versions.column('date')[0] == numpy.datetime64('2018-01-02')
+    assert list(dependencies.categorical('constraint').codes) == [1, 0, -1]
+    assert dependencies.categories('constraint') == ['*', '^0.1.0']
+    assert dependencies.frame(['package', 'dev'])['package'].tolist() == ['a', 'a', 'b']
+
+    with shared.pool(path, 2) as workers:
+        assert sum(workers.map(_count_dev, [(0, 1), (1, 3)])) == 1
@@ -0,0 +1,51 @@
+import numpy
+import pandas
+
+from . import constraints
+from .parser import CargoParser
+from .simulation import Simulation, SCENARIOS, bitset, derive, tilde_as_caret
+
+
+def test_derive():
+    p = CargoParser()
+    for text in ['^1.2.3', '~1.2', '0.2', '~0.2.1', '=0.0.1', '*', '>=0.3, <2']:
+        interval = p.parse(text)
+        for semver in (False, True):
+            labels = constraints.labels(interval)
+            for name in ['allows_compatible', 'allows_incompatible', 'allows_all_compatible', 'allows_compatible_only', 'allows_all_compatible_only']:
+                labels[name] = getattr(constraints, name)(interval, semver)
+            assert derive(numpy.array([bitset(constraints.labels(interval))]), semver)[0] == bitset(labels)
+
+
+def test_tilde_as_caret():
+    assert tilde_as_caret('~1.2, <2') == '^1.2, <2'
+    assert tilde_as_caret('~> 1.2') == '~> 1.2'
+
+
+def test_simulation(tmpdir):
+    pandas.DataFrame([
+        ('a', '1.0.0', '2018-01-02 00:00:00 UTC', 1),
+        ('a', '1.1.0', '2018-02-20 00:00:00 UTC', 2),
+    ], columns=['package', 'version', 'date', 'rank']).to_csv(str(tmpdir.join('Cargo-versions.csv.gz')), index=False)
+
+    rows = [('a', '1.0.0', 't', '~1.2.3'), ('a', '1.0.0', 'u', '^0.2'), ('a', '1.1.0', 't', '~1.2.3')]
+    p = CargoParser()
+    pandas.DataFrame([
+        dict(constraints.labels(p.parse(c)), package=package, version=version, target=target, constraint=c)
+        for package, version, target, c in rows
+    ]).to_csv(str(tmpdir.join('Cargo-dependencies.csv.gz')), index=False)
+
+    simulation = Simulation('Cargo', str(tmpdir), cache=False)
+    result = simulation.run(SCENARIOS['baseline'])
+    assert result['baseline']['n'].tolist() == [2, 1]
+    assert (result['delta'] == 0).all().all()
+
+    result = simulation.run(SCENARIOS['tilde-as-caret'])
+    assert result['baseline']['restrictive'].tolist() == [1, 1]
+    assert result['scenario']['restrictive'].tolist() == [0, 0]
+    assert result['delta']['compliant'].tolist() == [1, 1]
+    assert result['delta']['allows_minor'].tolist() == [1, 1]
+
+    result = simulation.run(SCENARIOS['semver'])
+    assert result['delta']['allows_incompatible'].tolist() == [1, 0]
+    assert result['delta']['compliant'].tolist() == [0, 0]
@@ -0,0 +1,44 @@
+import pandas
+
+from .survival import partition, partition_all, kaplan_meier, logrank_tests, default_pairs
+
+
+def constraints():
+    dates = pandas.to_datetime(['2018-01-01', '2018-01-31', '2018-03-02'])
+    return pandas.DataFrame([
+        (dates[0], dates[1], False, True, False, False),
+        (dates[0], None, False, True, False, False),
+        (dates[0], dates[2], False, False, True, False),
+        (dates[1], dates[2], True, False, True, False),
+        (dates[0], dates[1], False, False, False, True),
+    ], columns=['date', 'constraint_next_date', 'dev', 'compliant', 'permissive', 'restrictive'])
+
+
+def test_partition():
+    partitions = partition(constraints(), pandas.to_datetime('2018-03-02'))
+
+    assert list(partitions) == [
+        (False, 'compliant'), (False, 'permissive'), (False, 'restrictive'),
+        (True, 'compliant'), (True, 'permissive'), (True, 'restrictive'),
+    ]
+    durations, observed = partitions[(False, 'compliant')]
+    assert list(durations) == [1, 2] and list(observed) == [True, False]
+    durations, observed = partitions[(True, 'permissive')]
+    assert list(durations) == [1] and list(observed) == [True]
+    assert len(partitions[(True, 'compliant')][0]) == 0
+
+
+def test_fits_and_tests():
+    partitions = partition_all({'Cargo': constraints()}, pandas.to_datetime('2018-03-02'))
+    assert len(default_pairs(partitions)) == 6
+
+    curves, summary = kaplan_meier(partitions, processes=1)
+    assert list(summary['type']) == ['compliant', 'permissive', 'restrictive', 'permissive']
+    assert list(summary['n']) == [2, 1, 1, 1]
+    assert set(curves['ecosystem']) == {'Cargo'}
+
+    tests = logrank_tests(partitions, processes=1)
+    assert list(tests.columns) == [
+        'ecosystem_a', 'dev_a', 'type_a', 'ecosystem_b', 'dev_b', 'type_b', 'statistic', 'p_value'
+    ]
+    assert len(tests) == 6
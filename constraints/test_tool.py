@@ -0,0 +1,168 @@
+import pandas
+
+import pytest
+
+from .tool import Dataset, Checkpoint, group_by_month, summarize, stream, stream_batch, main_impact, DEPS_URL
+
+from datetime import datetime
+
+
+def test_group_by_month():
+    months = group_by_month([
+        ('a', '1.0.0', datetime(2018, 1, 2)),
+        ('a', '1.1.0', datetime(2018, 1, 20)),
+        ('b', '0.1.0', datetime(2017, 12, 1)),
+    ])
+    assert list(months.items()) == [((2018, 1), {'a': '1.0.0'}), ((2017, 12), {'b': '0.1.0'})]
+
+
+def test_summarize():
+    assert summarize([]) == (0, 0, 0, 0)
+    assert summarize([
+        (False, True, True, False),  # ^1.0.0
+        (True, True, True, False),  # *
+        (False, False, True, False),  # ~1.0.0
+        (False, False, False, True),  # ^0.1.0
+    ]) == (4, 2, 1, 1)
+
+
+def test_dataset(tmpdir):
+    pandas.DataFrame([
+        ('a', '1.0.0', '2018-01-02 00:00:00 UTC', 1),
+        ('a', '1.1.0', '2018-01-20 00:00:00 UTC', 2),
+        ('a', '2.0.0', '2018-03-01 00:00:00 UTC', 3),
+        ('b', '0.1.0', '2017-12-01 00:00:00 UTC', 1),
+        ('b', '0.2.0', '2018-01-05 00:00:00 UTC', 2),
+        ('t', '1.0.0', '2017-01-01 00:00:00 UTC', 1),
+    ], columns=['package', 'version', 'date', 'rank']).to_csv(str(tmpdir.join('Cargo-versions.csv.gz')), index=False)
+
+    pandas.DataFrame([
+        ('a', '1.0.0', 't', '^1.0.0', False, True, True, False),
+        ('a', '1.1.0', 't', '*', True, True, True, False),
+        ('b', '0.1.0', 't', '~1.0.0', False, False, True, False),
+        ('b', '0.2.0', 't', '~1.0.0', False, False, True, False),
+        ('b', '0.2.0', 'u', '^0.1.0', False, False, False, True),
+    ], columns=['package', 'version', 'target', 'constraint', 'allows_major', 'allows_minor', 'allows_patch', 'dev']
+    ).to_csv(str(tmpdir.join('Cargo-dependencies.csv.gz')), index=False)
+
+    dataset = Dataset('Cargo', str(tmpdir), cache=False)
+    assert dataset.has_dependents('t') and not dataset.has_dependents('a')
+    assert dataset.report('t') == [
+        ((2018, 3), (0, 0, 0, 0)),
+        ((2018, 1), (2, 1, 0, 1)),
+        ((2017, 12), (1, 0, 0, 1)),
+    ]
+    assert dataset.report('u') == [((2018, 1), (1, 1, 0, 0)), ((2017, 12), (0, 0, 0, 0))]
+    assert dataset.report('unknown') == []
+
+
+class DocumentFetcher:
+    """
+    Serve documents from a dict, indexed by url (and page, if any).
+    """
+
+    def __init__(self, documents, failing=()):
+        self.documents = documents
+        self.failing = failing
+        self.requested = []
+
+    def map(self, items, ttl=None, window=None):
+        for url, params in items:
+            if url in self.failing:
+                raise RuntimeError(url)
+            self.requested.append((url, (params or {}).get('page')))
+            yield self.documents.get((url, (params or {}).get('page')))
+
+
+def _crawl():
+    def dependent(name, *versions):
+        return {'name': name, 'platform': 'Cargo', 'versions': [
+            {'number': number, 'published_at': '{}T00:00:00.000Z'.format(date)} for number, date in versions
+        ]}
+
+    def dependencies(*requirements):
+        return {'dependencies': [{'name': 't', 'platform': 'Cargo', 'requirements': r} for r in requirements]}
+
+    package = {'name': 't', 'platform': 'Cargo', 'dependents_count': 150}
+    url = 'https://libraries.io/api/Cargo/t/dependents'
+    documents = {
+        (url, 1): [dependent('a', ('1.0.0', '2018-01-02'), ('1.1.0', '2018-01-20'), ('2.0.0', '2018-03-01'))],
+        (url, 2): [dependent('b', ('0.1.0', '2017-12-01'), ('0.2.0', '2018-01-05'))],
+        (DEPS_URL.format(platform='Cargo', package='a', version='1.0.0'), None): dependencies('^1.0.0'),
+        (DEPS_URL.format(platform='Cargo', package='a', version='2.0.0'), None): dependencies(),
+        (DEPS_URL.format(platform='Cargo', package='b', version='0.1.0'), None): dependencies('~1.0.0'),
+        (DEPS_URL.format(platform='Cargo', package='b', version='0.2.0'), None): dependencies('~1.0.0'),
+    }
+    expected = [((2018, 3), (0, 0, 0, 0)), ((2018, 1), (2, 1, 0, 1)), ((2017, 12), (1, 0, 0, 1))]
+    return package, documents, expected
+
+
+def test_stream():
+    package, documents, expected = _crawl()
+    fetcher = DocumentFetcher(documents)
+    rows = stream(fetcher, package)
+
+    assert next(rows) == expected[0]
+    assert len(fetcher.requested) == 3
+    assert list(rows) == expected[1:]
+
+
+def test_checkpoint(tmpdir):
+    package, documents, expected = _crawl()
+    path = str(tmpdir.join('checkpoints', 'Cargo-t.json'))
+
+    # Interrupted while retrieving the dependencies of 2018-01
+    fetcher = DocumentFetcher(documents, failing=[DEPS_URL.format(platform='Cargo', package='b', version='0.2.0')])
+    rows = stream(fetcher, package, checkpoint=Checkpoint(path))
+    assert next(rows) == expected[0]
+    with pytest.raises(RuntimeError):
+        list(rows)
+
+    checkpoint = Checkpoint(path)
+    assert checkpoint.resumed and checkpoint.pages == {1, 2}
+    # The month already yielded is only kept as its counts
+    assert checkpoint.done == {expected[0][0]: expected[0][1]}
+    assert expected[0][0] not in checkpoint.months
+    assert checkpoint.requirements == {('a', '1.0.0'): ['^1.0.0']}
+
+    fetcher = DocumentFetcher(documents)
+    assert list(stream(fetcher, package, checkpoint=checkpoint)) == expected
+    assert [url for url, page in fetcher.requested] == [
+        DEPS_URL.format(platform='Cargo', package='b', version='0.2.0'),
+        DEPS_URL.format(platform='Cargo', package='b', version='0.1.0'),
+    ]
+    assert not tmpdir.join('checkpoints', 'Cargo-t.json').exists()
+
+    # Pages are retrieved again if the number of dependents changed
+    checkpoint = Checkpoint(path)
+    checkpoint.start(150)
+    checkpoint.pages.add(1)
+    checkpoint.done[(2018, 1)] = (1, 1, 0, 0)
+    checkpoint.save()
+    checkpoint = Checkpoint(path)
+    checkpoint.start(250)
+    assert checkpoint.pages == set() and checkpoint.done == {}
+
+
+def test_stream_batch():
+    package, documents, expected = _crawl()
+    other = {'name': 'u', 'platform': 'Cargo', 'dependents_count': 1}
+    documents[('https://libraries.io/api/Cargo/u/dependents', 1)] = [
+        {'name': 'b', 'platform': 'Cargo', 'versions': [{'number': '0.2.0', 'published_at': '2018-01-05T00:00:00.000Z'}]}
+    ]
+    documents[(DEPS_URL.format(platform='Cargo', package='b', version='0.2.0'), None)]['dependencies'].append(
+        {'name': 'u', 'platform': 'Cargo', 'requirements': '^0.1.0'}
+    )
+
+    fetcher = DocumentFetcher(documents)
+    rows = list(stream_batch(fetcher, [package, other]))
+    assert rows == [('t', key, counts) for key, counts in expected] + [('u', (2018, 1), (1, 0, 1, 0))]
+
+    requested = [url for url, page in fetcher.requested if page is None]
+    assert len(requested) == len(set(requested)) == 4
+
+
+def test_main_impact_invalid_version(tmpdir):
+    with pytest.raises(SystemExit) as e:
+        main_impact('Cargo', ['t'], '1.x', str(tmpdir))
+    assert e.value.code == 'Invalid version 1.x'
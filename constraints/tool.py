@@ -1,11 +1,13 @@
-import requests
 import os
+import json
 import time
 import logging
 import sys
 import math
 import argparse
+import csv
 
+import numpy
 import tqdm
 
 from urllib.parse import quote_plus
@@ -15,6 +17,11 @@ from collections import OrderedDict
 
 from . import parser
 from . import constraints
+from . import fetch
+from . import frames
+from . import graph
+from . import impact
+from .versions import Version
 
 PARSER = {
     'Cargo': parser.CargoParser(),
@@ -28,6 +35,16 @@ DEPS_URL = 'https://libraries.io/api/{platform}/{package}/{version}/dependencies
 REV_DEPS_URL = 'https://libraries.io/api/{platform}/{package}/dependents'
 DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
 PER_PAGE = 100
+WINDOW = 64  # maximal number of requests scheduled ahead
+
+# Dependencies of a given release never change, other resources are refreshed daily
+CACHE_PATH = os.path.join('.cache', 'libraries.io')
+PACKAGE_TTL = 24 * 3600
+DEPENDENTS_TTL = 24 * 3600
+
+# Crawl state of interrupted reports
+CHECKPOINT_PATH = os.path.join('.cache', 'checkpoints')
+CHECKPOINT_INTERVAL = 30  # seconds between two saves
 
 logging.basicConfig(
     level=logging.CRITICAL,
@@ -36,42 +53,148 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def get_url(url, params=None):
-    params = {} if params is None else params
+def main(platform, package_names, key, concurrency=fetch.CONCURRENCY, cache_path=CACHE_PATH, offline=False, checkpoint_path=CHECKPOINT_PATH, table=False):
+    cache = fetch.ResponseCache(cache_path) if cache_path else None
+    params = {} if key is None else {'key': key}
+    
+    with fetch.Fetcher(params, concurrency=concurrency, cache=cache, offline=offline) as fetcher:
+        try:
+            if len(package_names) == 1 and not table:
+                checkpoint = None
+                if checkpoint_path:
+                    checkpoint = Checkpoint(os.path.join(checkpoint_path, '{}-{}.json'.format(platform, quote_plus(package_names[0]))))
+                report(fetcher, platform, package_names[0], checkpoint)
+            else:
+                report_batch(fetcher, platform, package_names, table)
+        except fetch.FetchError as e:
+            sys.exit('Aborting: {}'.format(e))
+
+
+def main_dataset(platform, package_names, data_path=frames.DATA_PATH, table=False):
+    dataset = Dataset(platform, data_path)
+    
+    def rows():
+        for package_name in package_names:
+            if not dataset.has_dependents(package_name):
+                print('Package {} has no dependent in the dataset of {}'.format(package_name, platform), file=sys.stderr if table else sys.stdout)
+                continue
+            for key, counts in dataset.report(package_name):
+                yield package_name, key, counts
+    
+    display_rows(rows(), table)
+
+
+def main_impact(platform, package_names, version, data_path=frames.DATA_PATH):
+    """
+    Report how many packages of the dataset would receive given release of
+    each given package, directly or transitively (see impact).
+    """
+    try:
+        version = Version(version)
+    except ValueError:
+        sys.exit('Invalid version {}'.format(version))
+    
+    engine = impact.Impact(graph.build(platform, data_path=data_path))
+    for package_name in package_names:
+        try:
+            impact.display(engine.propagate(package_name, version))
+        except KeyError:
+            print('Package {} is not part of the dataset of {}'.format(package_name, platform))
+
+
+def group_by_month(dependents):
+    """
+    Group given (name, version, date) triples by month, from the most recent one,
+    and return an ordered dict mapping (year, month) to a dict {name: version}
+    with a single release per dependent.
+    """
+    dependents = sorted(dependents, key=lambda t: t[2], reverse=True)
+    months = OrderedDict()
+    
+    for name, version, date in dependents:
+        current = months.setdefault((date.year, date.month), {})
+        # Take last release of each dependents
+        current[name] = version
+    return months
+
+
+def labels(interval):
+    return (
+        constraints.allows_major(interval),
+        constraints.allows_minor(interval),
+        constraints.allows_patch(interval),
+        constraints.dev(interval),
+    )
+
+
+def summarize(labels):
+    """
+    Return the number of given (major, minor, patch, dev) labels, and the number
+    of compliant, permissive and restrictive ones among them.
+    """
+    total = 0
+    compliant = 0
+    permissive = 0
+    restrictive = 0
     
-    logger.debug('get: {} ({})'.format(url, params))
+    for major, minor, patch, dev in labels:
+        total += 1
+        compliant += int((not major and minor and not dev) or (dev and not patch))
+        permissive += int(major or (dev and patch))
+        restrictive += int(not minor and not dev)
     
-    status_code = 403
-    while status_code in [403, 429]:
-        r = requests.get(url, params=params)
-        status_code = r.status_code
-        logger.debug('x-ratelimit-remaining: {}'.format(r.headers.get('x-ratelimit-remaining', None)))
+    return total, compliant, permissive, restrictive
+
+
+def display(year, month, counts):
+    total, compliant, permissive, restrictive = counts
+    if total == 0:
+        print('None collected')
+        return
+    
+    print('[{}-{:0>2}] ({:3} cons.)\t {:.1%} compl. / {:.1%} perm. / {:.1%} restr.'.format(
+        year, month,
+        total,
+        compliant / total,
+        permissive / total,
+        restrictive / total,
+    ))
+
+
+def display_rows(rows, table=False):
+    """
+    Display given (package, (year, month), counts) triples, either as a CSV
+    table, or as a report per package.
+    """
+    if table:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(['package', 'month', 'total', 'compliant', 'permissive', 'restrictive'])
+    
+    current = None
+    for package_name, (year, month), counts in rows:
+        if table:
+            writer.writerow([package_name, '{}-{:0>2}'.format(year, month)] + list(counts))
+            continue
         
-        if status_code == 200:
-            logger.debug('hit!')
-            return r
-        elif status_code == 404:
-            return None
-        elif status_code in [403, 429]:
-            # Check header
-            ratelimit = r.headers.get('x-ratelimit-remaining', None)
-            
-            if ratelimit is None or ratelimit > 0:
-                logger.warning('403/429 with x-ratelimit-remaining set to {}'.format(ratelimit))
-                time.sleep(5)
-            
-            time.sleep(1)
-        else:
-            raise ValueError('"{}" returns code {}'.format(url, status_code))
+        if package_name != current:
+            print('Report for {}'.format(package_name))
+            current = package_name
+        display(year, month, counts)
+
+
+def find(fetcher, platform, package_name):
+    """
+    Return the libraries.io document of given package, or None if it does not exist.
+    """
+    return fetcher.get(PKG_URL.format(platform=platform, package=quote_plus(package_name)), ttl=PACKAGE_TTL)
 
 
-def main(platform, package_name, key):
+def report(fetcher, platform, package_name, checkpoint=None):
     # Check that package exists
-    r = get_url(PKG_URL.format(platform=platform, package=quote_plus(package_name)), {'key': key})
-    if r is None:
+    package = find(fetcher, platform, package_name)
+    if package is None:
         sys.exit('Aborting: package {} not found for {}'.format(package_name, platform))
     
-    package = r.json()
     print('Package {} found on {}'.format(package['name'], package['platform']))
     
     # Retrieve dependents
@@ -79,110 +202,414 @@ def main(platform, package_name, key):
         sys.exit('Aborting: package has no dependent')
     print('Found {} potential dependents'.format(package['dependents_count']))
     
-    dependents = []
-    nb_pages = math.ceil(package['dependents_count'] / PER_PAGE)
-    logger.info('nb page: {}'.format(nb_pages))
+    if checkpoint is not None and checkpoint.resumed:
+        print('Resuming from {} ({} pages, {} months, {} releases)'.format(checkpoint.path, len(checkpoint.pages), len(checkpoint.done), len(checkpoint.requirements)))
     
+    # The stream is closed explicitly, so that the checkpoint is saved on interrupt
+    rows = stream(fetcher, package, progress=True, checkpoint=checkpoint)
     try:
-        for page in tqdm.tqdm(range(1, nb_pages + 1), leave=False):
-            logger.info('page {}'.format(page))
-            r = get_url(
-                REV_DEPS_URL.format(platform=platform, package=quote_plus(package_name)),
-                {'key': key, 'per_page': PER_PAGE, 'page': page}
-            )
-            
-            for dependent in r.json():
-                if dependent['platform'] == package['platform']:
-                    for version in dependent['versions']:
-                        try:
-                            published_at = datetime.strptime(version['published_at'], DATE_FORMAT)
-                        except ValueError as e:
-                            logger.warning('Unable to parse {}'.format(version['published_at']))
-                            continue
-                            
-                        dependents.append((
-                            dependent['name'],
-                            version['number'],
-                            published_at
-                        ))
-                else:
-                    logger.info('Dependent {} not on {} (is on {})'.format(dependent['name'], package['platform'], dependent['platform']))
+        for (year, month), counts in rows:
+            display(year, month, counts)
     except KeyboardInterrupt:
-        print('Aborting')
+        sys.exit('Aborting')
+    finally:
+        rows.close()
+
+
+def report_batch(fetcher, platform, package_names, table=False):
+    out = sys.stderr if table else sys.stdout
+    packages = []
+    for package_name in package_names:
+        package = find(fetcher, platform, package_name)
+        if package is None:
+            print('Package {} not found for {}'.format(package_name, platform), file=out)
+        elif package['dependents_count'] == 0:
+            print('Package {} has no dependent'.format(package['name']), file=out)
+        else:
+            print('Package {} found on {} ({} potential dependents)'.format(package['name'], package['platform'], package['dependents_count']), file=out)
+            packages.append(package)
+    
+    rows = stream_batch(fetcher, packages, progress=True)
+    try:
+        display_rows(rows, table)
+    except KeyboardInterrupt:
+        sys.exit('Aborting')
+    finally:
+        rows.close()
+
+
+class Checkpoint:
+    """
+    Crawl state of the report of a package, stored as JSON in given path: the
+    pages of dependents already processed, the releases selected for each month
+    (see group_by_month) that was not yielded yet, the requirements collected
+    for the releases of these months whose dependencies were already retrieved
+    (None if the release is unknown), and the counts of the months already
+    yielded ("done").
+    The file is written atomically, at most every "interval" seconds (see touch)
+    and when save is called.
+    """
+    
+    def __init__(self, path, interval=CHECKPOINT_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.dependents_count = None
+        self.pages = set()
+        self.months = {}
+        self.requirements = {}
+        self.done = {}
+        self.resumed = False
+        self._saved = time.monotonic()
         
-    # Group by month
-    dependents.sort(key=lambda t: t[2], reverse=True)
-    months = OrderedDict()
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        
+        self.dependents_count = state['dependents_count']
+        self.pages = set(state['pages'])
+        self.months = {tuple(month): dependents for month, dependents in state['months']}
+        self.requirements = {(name, version): requirements for name, version, requirements in state['requirements']}
+        self.done = {tuple(month): tuple(counts) for month, counts in state.get('done', [])}
+        self.resumed = True
     
-    for name, version, date in dependents:
-        current = months.setdefault((date.year, date.month), {})
-        # Take last release of each dependents
-        current[name] = version
+    def start(self, dependents_count):
+        """
+        Pages are only reused if the number of dependents did not change, as
+        their content would be shifted otherwise.
+        """
+        if dependents_count != self.dependents_count:
+            self.dependents_count = dependents_count
+            self.pages = set()
+            self.months = {}
+            self.done = {}
+    
+    def touch(self):
+        if time.monotonic() - self._saved >= self.interval:
+            self.save()
+    
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump({
+                'dependents_count': self.dependents_count,
+                'pages': sorted(self.pages),
+                'months': [[list(month), dependents] for month, dependents in self.months.items()],
+                'requirements': [[name, version, r] for (name, version), r in self.requirements.items()],
+                'done': [[list(month), list(counts)] for month, counts in self.done.items()],
+            }, f)
+        os.replace(self.path + '.tmp', self.path)
+        self._saved = time.monotonic()
+    
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def releases(dependent):
+    """
+    Return the (name, version, date) triples of the releases of given dependent.
+    """
+    triples = []
+    for version in dependent['versions']:
+        try:
+            published_at = datetime.strptime(version['published_at'], DATE_FORMAT)
+        except ValueError as e:
+            logger.warning('Unable to parse {}'.format(version['published_at']))
+            continue
+        
+        triples.append((dependent['name'], version['number'], published_at))
+    return triples
+
+
+def stream(fetcher, package, window=WINDOW, progress=False, checkpoint=None):
+    """
+    Yield ((year, month), counts) pairs for the dependents of given package (see
+    find), from the most recent month, where counts is the summary of their
+    constraints on the package (see summarize).
+    
+    The listing of dependents is not ordered by date, so no month is complete
+    before all its pages are retrieved. Pages are folded into the releases to
+    consider for each month as they arrive (all the releases of a dependent are
+    part of the same page), so the full listing is never kept. Dependencies are
+    then retrieved month by month, and each month is yielded (and forgotten) as
+    soon as its dependencies are available. At most "window" requests are
+    scheduled ahead of the data being processed.
+    
+    If a Checkpoint is provided, the crawl resumes from its state, which is
+    kept up to date and saved when the generator stops. The counts of the
+    months already yielded are kept in the checkpoint (and yielded again when
+    resuming) instead of their releases. It is removed once all the months have
+    been yielded.
+    """
+    platform, package_name = package['platform'], package['name']
+    
+    if checkpoint is not None:
+        checkpoint.start(package['dependents_count'])
+        months, resolved, done = checkpoint.months, checkpoint.requirements, set(checkpoint.pages)
+        yielded = checkpoint.done
+    else:
+        months, resolved, done, yielded = {}, {}, set(), {}
     
     try:
-        for (year, month), dependent in months.items():
+        for number in listing(fetcher, package, months, done, window, progress):
+            if checkpoint is not None:
+                checkpoint.pages.add(number)
+                checkpoint.touch()
+        
+        # Dependencies are retrieved in month order, except the ones of the checkpoint
+        keys = sorted(set(months) | set(yielded), reverse=True)
+        known = set(resolved)
+        versions_data = fetcher.map(
+            (
+                (DEPS_URL.format(platform=platform, package=quote_plus(name), version=version), None)
+                for key in keys
+                for name, version in months.get(key, {}).items()
+                if (name, version) not in known
+            ),
+            window=window,
+        )
+        
+        for key in keys:
+            if key in yielded:
+                yield key, yielded[key]
+                continue
             
             dependencies = []
-            for name, version in tqdm.tqdm(dependent.items(), leave=False):
-                version_data = get_url(DEPS_URL.format(platform=platform, package=quote_plus(name), version=version), {'key': key})
+            for name, version in tqdm.tqdm(months[key].items(), leave=False, disable=not progress):
+                if (name, version) in known:
+                    requirements = resolved[(name, version)]
+                else:
+                    requirements = collect(next(versions_data), package_name, platform)
+                    if checkpoint is not None:
+                        resolved[(name, version)] = requirements
+                        checkpoint.touch()
                 
-                if version_data is None:
+                if requirements is None:
                     logger.warning('Unknown package {}@{}'.format(name, version))
-                    continue
-                    
-                for dependency in version_data.json()['dependencies']:
-                    if dependency['name'] == package_name and dependency['platform'] == package['platform']:
-                        dependencies.append(dependency['requirements'])
+                else:
+                    dependencies.extend(requirements)
             
-            # Convert & display summary
-            if len(dependencies) == 0:
-                print('None collected')
-                
+            # Convert & summarize
             dependencies = [parser.parse_or_empty(PARSER[platform], x) for x in dependencies]
+            logger.info(' / '.join([str(d) for d in dependencies]))
+            counts = summarize(labels(dep) for dep in dependencies)
             
-            total = 0
-            compliant = 0
-            permissive = 0
-            restrictive = 0
-            
-            for dep in dependencies:
-                major = constraints.allows_major(dep)
-                minor = constraints.allows_minor(dep)
-                patch = constraints.allows_patch(dep)
-                dev = constraints.dev(dep)
-                
-                total += 1
-                compliant += int((not major and minor and not dev) or (dev and not patch))
-                permissive += int(major or (dev and patch))
-                restrictive += int(not minor and not dev)
+            # Each release belongs to a single month: the month is forgotten,
+            # except its counts in the checkpoint
+            if checkpoint is not None:
+                for release in months[key].items():
+                    resolved.pop(release, None)
+                yielded[key] = counts
+                checkpoint.touch()
+            del months[key]
+            yield key, counts
+    except BaseException:
+        if checkpoint is not None:
+            checkpoint.save()
+        raise
+    
+    if checkpoint is not None:
+        checkpoint.remove()
+
+
+def listing(fetcher, package, months, done=(), window=WINDOW, progress=False):
+    """
+    Retrieve the pages of dependents of given package, except the ones in
+    "done", and fold them into "months" (see group_by_month). Yield the number
+    of each page once it has been folded.
+    """
+    platform, package_name = package['platform'], package['name']
+    nb_pages = math.ceil(package['dependents_count'] / PER_PAGE)
+    logger.info('nb page: {}'.format(nb_pages))
+    
+    pages = [page for page in range(1, nb_pages + 1) if page not in done]
+    items = (
+        (REV_DEPS_URL.format(platform=platform, package=quote_plus(package_name)), {'per_page': PER_PAGE, 'page': page})
+        for page in pages
+    )
+    for number, page in zip(pages, tqdm.tqdm(fetcher.map(items, ttl=DEPENDENTS_TTL, window=window), total=nb_pages, initial=nb_pages - len(pages), leave=False, disable=not progress)):
+        for dependent in (page or []):
+            if dependent['platform'] == platform:
+                for key, selected in group_by_month(releases(dependent)).items():
+                    months.setdefault(key, {}).update(selected)
+            else:
+                logger.info('Dependent {} not on {} (is on {})'.format(dependent['name'], platform, dependent['platform']))
+        yield number
+
+
+def stream_batch(fetcher, packages, window=WINDOW, progress=False):
+    """
+    Same as stream for several packages of the same platform, yielding
+    (package, (year, month), counts) triples, package after package.
+    
+    The listings of all the packages are retrieved first. The dependencies of
+    each release are then retrieved once, and the requirements they contain on
+    any of the packages are kept, so that releases shared by several packages
+    are not retrieved again.
+    """
+    names = [package['name'] for package in packages]
+    months = OrderedDict()
+    for package in packages:
+        months[package['name']] = {}
+        for _ in listing(fetcher, package, months[package['name']], window=window, progress=progress):
+            pass
+    
+    resolved = {}
+    for package in packages:
+        platform, package_name = package['platform'], package['name']
+        package_months = months.pop(package_name)
+        keys = sorted(package_months, reverse=True)
+        known = set(resolved)
+        versions_data = fetcher.map(
+            (
+                (DEPS_URL.format(platform=platform, package=quote_plus(name), version=version), None)
+                for key in keys
+                for name, version in package_months[key].items()
+                if (name, version) not in known
+            ),
+            window=window,
+        )
+        
+        for key in keys:
+            dependencies = []
+            for name, version in tqdm.tqdm(package_months[key].items(), leave=False, disable=not progress):
+                if (name, version) not in known:
+                    version_data = next(versions_data)
+                    resolved[(name, version)] = None if version_data is None else {
+                        n: r for n in names for r in [collect(version_data, n, platform)] if r
+                    }
                 
-            if total == 0:
-                print('None collected')
-                continue
-            
-            print('[{}-{:0>2}] ({:3} cons.)\t {:.1%} compl. / {:.1%} perm. / {:.1%} restr.'.format(
-                year, month,
-                total,
-                compliant / total,
-                permissive / total,
-                restrictive / total,
-            ))
-            logger.info(' / '.join([str(d) for d in dependencies]))
+                if resolved[(name, version)] is None:
+                    logger.warning('Unknown package {}@{}'.format(name, version))
+                else:
+                    dependencies.extend(resolved[(name, version)].get(package_name, []))
+            del package_months[key]
             
-    except KeyboardInterrupt:
-        sys.exit('Aborting')
+            dependencies = [parser.parse_or_empty(PARSER[platform], x) for x in dependencies]
+            yield package_name, key, summarize(labels(dep) for dep in dependencies)
+
+
+def collect(version_data, package_name, platform):
+    """
+    Return the requirements on given package in the dependencies of a release,
+    or None if the release is unknown.
+    """
+    if version_data is None:
+        return None
+    return [
+        dependency['requirements']
+        for dependency in version_data['dependencies']
+        if dependency['name'] == package_name and dependency['platform'] == platform
+    ]
+
+
+class Dataset:
+    """
+    Report on the dependents of packages using the local datasets of an
+    ecosystem (see frames) instead of libraries.io. Dependencies are indexed
+    by target and releases by package once, so that each report only touches
+    the rows of the requested package and of its dependents. The labels of the
+    dataset are used as is, constraints are not parsed again.
+    """
+    
+    def __init__(self, platform, data_path=frames.DATA_PATH, cache=True):
+        self.platform = platform
+        self.versions = frames.versions(platform, data_path, cache)[['package', 'version', 'date']]
+        self.dependencies = frames.dependencies(platform, data_path, cache)[
+            ['package', 'version', 'target', 'constraint', 'allows_major', 'allows_minor', 'allows_patch', 'dev']
+        ]
+        self._targets = self.dependencies.groupby('target').indices
+        self._releases = self.versions.groupby('package').indices
+    
+    def has_dependents(self, package_name):
+        return package_name in self._targets
+    
+    def report(self, package_name):
+        """
+        Return a list of ((year, month), counts) pairs, from the most recent month,
+        where counts is the summary of the constraints on given package (see
+        summarize). Months are selected as in the online report: each dependent
+        contributes its release of the month, whether or not that release still
+        depends on given package.
+        """
+        if not self.has_dependents(package_name):
+            return []
+        
+        rows = self.dependencies.iloc[self._targets[package_name]]
+        packages = rows['package'].unique()
+        releases = self.versions.iloc[numpy.concatenate([self._releases[p] for p in packages if p in self._releases])]
+        releases = releases.dropna(subset=['date']).sort_values('date', ascending=False, kind='mergesort')
+        
+        year = releases['date'].dt.year.tolist()
+        month = releases['date'].dt.month.tolist()
+        # Same selection as group_by_month (the last occurrence wins)
+        selected = (
+            releases
+            .assign(year=year, month=month)
+            .drop_duplicates(['year', 'month', 'package'], keep='last')
+            .merge(rows.drop(columns='target'), how='left', on=['package', 'version'])
+        )
+        
+        months = OrderedDict(((y, m), (0, 0, 0, 0)) for y, m in zip(year, month))
+        constrained = selected.dropna(subset=['constraint']).astype({
+            'allows_major': bool, 'allows_minor': bool, 'allows_patch': bool, 'dev': bool,
+        })
+        counts = (
+            constrained
+            .assign(total=True, **{name: frames.COMPLIANCE[name] for name in ['compliant', 'permissive', 'restrictive']})
+            .groupby(['year', 'month'])
+            [['total', 'compliant', 'permissive', 'restrictive']]
+            .sum()
+        )
+        for key, row in zip(counts.index, counts.itertuples(index=False)):
+            months[tuple(int(x) for x in key)] = tuple(int(x) for x in row)
+        
+        return list(months.items())
 
 
 if __name__ == '__main__':
     argparser = argparse.ArgumentParser(description='Version constraint usage')
-    argparser.add_argument('package_name', type=str, nargs=1, help='Name of the package')
+    argparser.add_argument('package_name', type=str, nargs='+', help='Name of the package (or of several packages)')
     argparser.add_argument('--platform', choices=['NPM', 'Cargo', 'Packagist', 'Rubygems'], required=True, help='platform where package is hosted')
-    argparser.add_argument('--key', type=str, required=True, help='API key for libraries.io')
+    argparser.add_argument('--key', type=str, required=False, help='API key for libraries.io (required unless --offline or --dataset)')
+    argparser.add_argument('--concurrency', type=int, default=fetch.CONCURRENCY, help='maximal number of concurrent requests')
+    argparser.add_argument('--cache', type=str, default=CACHE_PATH, help='directory of the response cache (default to {})'.format(CACHE_PATH))
+    argparser.add_argument('--no-cache', action='store_true', help='do not use the response cache')
+    argparser.add_argument('--offline', action='store_true', help='only use responses from the cache')
+    argparser.add_argument('--checkpoint', type=str, default=CHECKPOINT_PATH, help='directory of the crawl checkpoints (default to {})'.format(CHECKPOINT_PATH))
+    argparser.add_argument('--no-checkpoint', action='store_true', help='do not resume nor checkpoint the crawl')
+    argparser.add_argument('--dataset', action='store_true', help='use the local datasets instead of libraries.io')
+    argparser.add_argument('--data', type=str, default=frames.DATA_PATH, help='directory of the datasets (default to {})'.format(frames.DATA_PATH))
+    argparser.add_argument('--impact', type=str, metavar='VERSION', help='with --dataset, count the packages that would receive this release, directly or transitively')
+    argparser.add_argument('--table', action='store_true', help='output a single CSV table for all the packages')
     argparser.add_argument('--debug', action='store_true', required=False, help='Display debug information')
     
     args = argparser.parse_args()
     
+    if args.impact and not args.dataset:
+        argparser.error('--impact requires --dataset')
+    if args.impact:
+        main_impact(args.platform, args.package_name, args.impact, args.data)
+        sys.exit()
+    if args.dataset:
+        main_dataset(args.platform, args.package_name, args.data, args.table)
+        sys.exit()
+    
+    if args.offline and args.no_cache:
+        argparser.error('--offline requires the cache')
+    if args.key is None and not args.offline:
+        argparser.error('--key is required unless --offline or --dataset is set')
+    
     if args.debug:
         logger.setLevel(logging.DEBUG)
+        fetch.logger.setLevel(logging.DEBUG)
     
-    main(args.platform, args.package_name[0], args.key)
+    main(
+        args.platform, args.package_name, args.key, args.concurrency,
+        cache_path=None if args.no_cache else args.cache,
+        offline=args.offline,
+        checkpoint_path=None if args.no_checkpoint else args.checkpoint,
+        table=args.table,
+    )
@@ -7,6 +7,7 @@ and [ECO]-dependencies.csv.gz.
 import pandas
 import subprocess
 import os
+import sys
 
 
 ECOSYSTEMS = ['Cargo', 'Packagist', 'NPM', 'Rubygems']
@@ -34,23 +35,24 @@ KINDS = {
 
 
 if __name__ == '__main__':
-    for ecosystem in ECOSYSTEMS:
+    # Ecosystems can be restricted from the command line, e.g. python convert.py Cargo
+    for ecosystem in (sys.argv[1:] or ECOSYSTEMS):
         if os.path.isfile('{}-versions.csv.gz'.format(ecosystem)) and os.path.isfile('{}-dependencies.csv.gz'.format(ecosystem)):
             print('Skipping {}'.format(ecosystem))
             continue
             
         print('Extracting data for {}'.format(ecosystem))
-        with open('temp-versions.csv', 'w') as out:
+        with open('temp-{}-versions.csv'.format(ecosystem), 'w') as out:
             subprocess.call(['head', '-1', 'versions.csv'], stdout=out)
             subprocess.call(['grep', ',{},'.format(ecosystem), 'versions.csv'], stdout=out)
 
-        with open('temp-dependencies.csv', 'w') as out:
+        with open('temp-{}-dependencies.csv'.format(ecosystem), 'w') as out:
             subprocess.call(['head', '-1', 'dependencies.csv'], stdout=out)
             subprocess.call(['grep', ',{},'.format(ecosystem), 'dependencies.csv'], stdout=out)
 
         print('Loading data in memory')
         df_versions = pandas.read_csv(
-            'temp-versions.csv',
+            'temp-{}-versions.csv'.format(ecosystem),
             index_col=False,
             engine='c',
             low_memory=False,
@@ -58,7 +60,7 @@ if __name__ == '__main__':
         ).rename(columns=VERSIONS).query('platform == "{}"'.format(ecosystem))
         
         df_deps = pandas.read_csv(
-            'temp-dependencies.csv',
+            'temp-{}-dependencies.csv'.format(ecosystem),
             index_col=False,
             engine='c',
             low_memory=False,
@@ -89,6 +91,6 @@ if __name__ == '__main__':
             compression='gzip',
         )
         print('Deleting temporary files')
-        subprocess.call(['rm', 'temp-versions.csv'])
-        subprocess.call(['rm', 'temp-dependencies.csv'])
+        subprocess.call(['rm', 'temp-{}-versions.csv'.format(ecosystem)])
+        subprocess.call(['rm', 'temp-{}-dependencies.csv'.format(ecosystem)])
         print()
@@ -10,6 +10,7 @@ from constraints.parser import (
     parse_or_empty,
 )
 from constraints import constraints as analyzer
+from constraints import instrument
 
 ECOSYSTEMS = ['Cargo', 'NPM', 'Packagist', 'Rubygems']
 PARSERS = {
@@ -23,58 +24,99 @@ DEPS_INPUT_PATH = '../data-raw/{}-dependencies.csv.gz'
 OUTPUT_PATH = './{}-dependencies.csv.gz'
 
 
-if __name__ == '__main__':
+def load(ecosystem, versions_path=VERSIONS_INPUT_PATH, dependencies_path=DEPS_INPUT_PATH, progress=False):
+    if progress:
+        print('Loading versions for {}'.format(ecosystem))
+    df_versions = pandas.read_csv(versions_path.format(ecosystem))
     
-    for ecosystem in ECOSYSTEMS:
-        if os.path.isfile(OUTPUT_PATH.format(ecosystem)):
-            print('Skipping {}'.format(ecosystem))
-            continue
+    if progress:
+        print('Loading dependencies data for {}'.format(ecosystem))
+    return df_versions, pandas.read_csv(dependencies_path.format(ecosystem))
 
-        print('Loading versions for {}'.format(ecosystem))
-        df_versions = pandas.read_csv(VERSIONS_INPUT_PATH.format(ecosystem))
 
-        print('Loading dependencies data for {}'.format(ecosystem))
-        df_dependencies = pandas.read_csv(DEPS_INPUT_PATH.format(ecosystem))
-                
-        print('Filtering dependencies')
-
-        df_dependencies = (
-            df_dependencies
-            .merge(
-                df_versions[['package', 'version']],
-                how='inner',
-                on=['package', 'version'],
-            )
+def filter_dependencies(df_dependencies, df_versions):
+    """
+    Keep the dependencies of the selected releases.
+    """
+    return (
+        df_dependencies
+        .merge(
+            df_versions[['package', 'version']],
+            how='inner',
+            on=['package', 'version'],
         )
+    )
 
-        print('Converting constraints to intervals')
+
+def convert_constraints(df_dependencies, ecosystem, progress=False):
+    """
+    Return the distinct constraints of given dependencies, with their interval.
+    """
+    if progress:
         print('.. drop duplicates')
-        df_constraints = df_dependencies[['constraint']].drop_duplicates()
-        
+    df_constraints = df_dependencies[['constraint']].drop_duplicates()
+    
+    if progress:
         print('.. convert constraints')
-        
-        def _func(c): return parse_or_empty(PARSERS[ecosystem], c)
-        df_constraints['interval'] = df_constraints['constraint'].apply(_func)
-        
-        print('.. analyse intervals')
-        for label in ['empty', 'dev', 'allows_major', 'allows_minor', 'allows_patch', 'allows_compatible', 'allows_incompatible', 'allows_all_compatible', 'allows_compatible_only', 'allows_all_compatible_only', 'upper_bounded', 'lower_bounded', 'strict']:
-            df_constraints[label] = df_constraints['interval'].apply(getattr(analyzer, label))
-        
-        print('.. merge results')
-        df_dependencies = (
-            df_dependencies
-            .merge(
-                df_constraints,
-                how='left',
-                on=['constraint']
-            )
-        )
-        
-        print('Saving data')
-        df_dependencies.to_csv(
-            OUTPUT_PATH.format(ecosystem),
-            index=False,
-            compression='gzip',
+    
+    def _func(c): return parse_or_empty(PARSERS[ecosystem], c)
+    df_constraints['interval'] = df_constraints['constraint'].apply(_func)
+    return df_constraints
+
+
+def analyse_intervals(df_constraints):
+    df_constraints = df_constraints.copy()
+    for label in analyzer.LABELS:
+        df_constraints[label] = df_constraints['interval'].apply(getattr(analyzer, label))
+    return df_constraints
+
+
+def merge_results(df_dependencies, df_constraints):
+    return (
+        df_dependencies
+        .merge(
+            df_constraints,
+            how='left',
+            on=['constraint']
         )
+    )
+
+
+if __name__ == '__main__':
+    
+    # Ecosystems can be restricted from the command line, e.g. python dependencies.py Cargo
+    for ecosystem in (sys.argv[1:] or ECOSYSTEMS):
+        if os.path.isfile(OUTPUT_PATH.format(ecosystem)):
+            print('Skipping {}'.format(ecosystem))
+            continue
+
+        with instrument.Run('dependencies', ecosystem) as run:
+            with run.stage('load') as stage:
+                df_versions, df_dependencies = load(ecosystem, progress=True)
+                stage.output(df_dependencies)
+                    
+            print('Filtering dependencies')
+            with run.stage('filter_dependencies', df_dependencies) as stage:
+                df_dependencies = stage.output(filter_dependencies(df_dependencies, df_versions))
+
+            print('Converting constraints to intervals')
+            with run.stage('convert_constraints', df_dependencies) as stage:
+                df_constraints = stage.output(convert_constraints(df_dependencies, ecosystem, progress=True))
+            
+            print('.. analyse intervals')
+            with run.stage('analyse_intervals', df_constraints) as stage:
+                df_constraints = stage.output(analyse_intervals(df_constraints))
+            
+            print('.. merge results')
+            with run.stage('merge_results', df_dependencies) as stage:
+                df_dependencies = stage.output(merge_results(df_dependencies, df_constraints))
+            
+            print('Saving data')
+            with run.stage('save', df_dependencies) as stage:
+                df_dependencies.to_csv(
+                    OUTPUT_PATH.format(ecosystem),
+                    index=False,
+                    compression='gzip',
+                )
         
         print()
@@ -1,6 +1,11 @@
 import pandas
 import tqdm
 import os
+import sys
+
+sys.path.append('..')
+
+from constraints import instrument
 
 
 ECOSYSTEMS = ['Cargo', 'NPM', 'Packagist', 'Rubygems']
@@ -11,77 +16,112 @@ OUTPUT_PATH = './{}-versions.csv.gz'
 RE_SEMVER = r'^(?:v|V)?(?P<major>\d+)\.(?P<minor>\d+)\.(?P<patch>\d+)(?P<misc>.*)$'
 
 
+def load(ecosystem, path=INPUT_PATH):
+    return pandas.read_csv(path.format(ecosystem)).dropna()
+
+
+def remove_spam(df_versions):
+    """
+    Remove spam packages from NPM.
+    """
+    exclude_prefixes = ('@ryancavanaugh/pkg', 'all-packages-', 'cool-', 'neat-', 'wowdude-', 'npmdoc-', 'npmtest-', 'npm-ghost-',)
+    exclude_suffixes = ('-cdn',)
+    exclude_ghost = r'^ghost-\d+$'
+
+    return (
+        df_versions
+        [lambda d: ~d['package'].str.startswith(exclude_prefixes)]
+        [lambda d: ~d['package'].str.endswith(exclude_suffixes)]
+        [lambda d: ~d['package'].str.match(exclude_ghost)]
+    )
+
+
+def extract_components(df_versions, progress=False):
+    """
+    Identify semver components, and convert them.
+    """
+    df_versions = df_versions.copy()
+    df_versions[['major', 'minor', 'patch', 'misc']] = (
+        df_versions['version'].str.extract(RE_SEMVER, expand=True)
+    )
+    
+    if progress:
+        print('Converting components')
+    for component in ['major', 'minor', 'patch']:
+        df_versions[component] = df_versions[component].astype(float)
+    return df_versions
+
+
+def compute_ranks(df_versions, progress=False):
+    """
+    Compute release order and release type.
+    """
+    data = []
+    for name, group in tqdm.tqdm(df_versions.groupby('package', sort=False), disable=not progress):
+        group = (
+            group
+            .sort_values(['major', 'minor', 'patch', 'date'])
+            # Remove pre-releases by only keeping the latest "misc".
+            .drop_duplicates(['major', 'minor', 'patch'], keep='last')
+            .assign(
+                rank=lambda d: d.assign(N=1).N.cumsum(),
+                # previous_date=lambda d: d['date'].shift(1),
+                # next_date=lambda d: d['date'].shift(-1),
+                is_initial=lambda d: d['major'].shift(1).isnull(),
+                is_major=lambda d: (d['major'] - d['major'].shift(1)).clip(0, 1).astype(bool),
+                is_minor=lambda d: (d['minor'] - d['minor'].shift(1)).clip(0, 1).astype(bool),
+                is_patch=lambda d: (d['patch'] - d['patch'].shift(1)).clip(0, 1).astype(bool),
+            )
+        )
+        data.append(group)
+    
+    if progress:
+        print('Grouping results into a dataframe')
+    return (
+        pandas.concat(data)
+        .assign(type=lambda d: d[['is_initial', 'is_major', 'is_minor', 'is_patch']].idxmax(axis=1))
+        .drop(columns=['is_initial', 'is_major', 'is_minor', 'is_patch'])
+        .replace({'type': {
+            'is_initial': 'initial',
+            'is_major': 'major',
+            'is_minor': 'minor',
+            'is_patch': 'patch',
+        }})
+        .drop_duplicates()
+    )
+
+
 if __name__ == '__main__':
     
-    for ecosystem in ECOSYSTEMS:
+    # Ecosystems can be restricted from the command line, e.g. python versions.py Cargo
+    for ecosystem in (sys.argv[1:] or ECOSYSTEMS):
         if os.path.isfile(OUTPUT_PATH.format(ecosystem)):
             print('Skipping {}'.format(ecosystem))
             continue
         
-        print('Loading data for {}'.format(ecosystem))
-        df_versions = pandas.read_csv(INPUT_PATH.format(ecosystem)).dropna()
-        
-        # Remove spam packages from NPM
-        if ecosystem == 'NPM':
-            exclude_prefixes = ('@ryancavanaugh/pkg', 'all-packages-', 'cool-', 'neat-', 'wowdude-', 'npmdoc-', 'npmtest-', 'npm-ghost-',)
-            exclude_suffixes = ('-cdn',)
-            exclude_ghost = r'^ghost-\d+$'
-
-            df_versions = (
-                df_versions
-                [lambda d: ~d['package'].str.startswith(exclude_prefixes)]
-                [lambda d: ~d['package'].str.endswith(exclude_suffixes)]
-                [lambda d: ~d['package'].str.match(exclude_ghost)]
-            )
-        
-        print('Identifying semver components')
-        df_versions[['major', 'minor', 'patch', 'misc']] = (
-            df_versions['version'].str.extract(RE_SEMVER, expand=True)
-        )
-        
-        print('Converting components')
-        for component in ['major', 'minor', 'patch']:
-            df_versions[component] = df_versions[component].astype(float)
-        
-        print('Computing release order and release type')
-        data = []
-        for name, group in tqdm.tqdm(df_versions.groupby('package', sort=False)):
-            group = (
-                group
-                .sort_values(['major', 'minor', 'patch', 'date'])
-                # Remove pre-releases by only keeping the latest "misc".
-                .drop_duplicates(['major', 'minor', 'patch'], keep='last')
-                .assign(
-                    rank=lambda d: d.assign(N=1).N.cumsum(),
-                    # previous_date=lambda d: d['date'].shift(1),
-                    # next_date=lambda d: d['date'].shift(-1),
-                    is_initial=lambda d: d['major'].shift(1).isnull(),
-                    is_major=lambda d: (d['major'] - d['major'].shift(1)).clip(0, 1).astype(bool),
-                    is_minor=lambda d: (d['minor'] - d['minor'].shift(1)).clip(0, 1).astype(bool),
-                    is_patch=lambda d: (d['patch'] - d['patch'].shift(1)).clip(0, 1).astype(bool),
+        with instrument.Run('versions', ecosystem) as run:
+            print('Loading data for {}'.format(ecosystem))
+            with run.stage('load') as stage:
+                df_versions = stage.output(load(ecosystem))
+            
+            if ecosystem == 'NPM':
+                with run.stage('remove_spam', df_versions) as stage:
+                    df_versions = stage.output(remove_spam(df_versions))
+            
+            print('Identifying semver components')
+            with run.stage('extract_components', df_versions) as stage:
+                df_versions = stage.output(extract_components(df_versions, progress=True))
+            
+            print('Computing release order and release type')
+            with run.stage('compute_ranks', df_versions) as stage:
+                df_semver = stage.output(compute_ranks(df_versions, progress=True))
+            
+            print('Saving data')
+            with run.stage('save', df_semver) as stage:
+                df_semver.to_csv(
+                    OUTPUT_PATH.format(ecosystem),
+                    index=False,
+                    compression='gzip',
                 )
-            )
-            data.append(group)
-        
-        print('Grouping results into a dataframe')
-        df_semver = (
-            pandas.concat(data)
-            .assign(type=lambda d: d[['is_initial', 'is_major', 'is_minor', 'is_patch']].idxmax(axis=1))
-            .drop(columns=['is_initial', 'is_major', 'is_minor', 'is_patch'])
-            .replace({'type': {
-                'is_initial': 'initial',
-                'is_major': 'major',
-                'is_minor': 'minor',
-                'is_patch': 'patch',
-            }})
-            .drop_duplicates()
-        )
-        
-        print('Saving data')
-        df_semver.to_csv(
-            OUTPUT_PATH.format(ecosystem),
-            index=False,
-            compression='gzip',
-        )
         
         print()